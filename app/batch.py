@@ -0,0 +1,151 @@
+# Usage:
+#   python batch.py --token /home/dev/.token --results results.jsonl ../test-data/config.yaml manifest.jsonl
+#
+# Example of manifest (JSONL, relative paths are relative to the manifest):
+#   {"type": "hide", "key": "secret-key", "needle": "needle.txt", "haystack": "haystack.txt", "output": "output.txt"}
+#   {"type": "reveal", "key": "secret-key", "murmur": "output.txt", "output": "message.txt"}
+#
+# The jobs run concurrently, but a job waits for the previous jobs that write its input files (here, the
+# reveal starts once the hide has written "output.txt").
+
+from typing import Optional
+import argparse
+import json
+from pathlib import Path
+import sys
+import os
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.whisperer import Params
+from whisper.config import Config, load_config
+from whisper.rewriter import BACKENDS
+from whisper.params import FORMATS, FORMAT_CHAINED
+from whisper.jobs import JobManager
+from whisper.batch import load_manifest, run_batch
+import whisper.api_tools
+
+def get_script_dir() -> Path:
+    """Returns the path to the directory containing the script."""
+    return Path(__file__).resolve().parent
+
+if __name__ == '__main__':
+    script_dir: Path = get_script_dir()
+    default_tokens_path: str = script_dir.joinpath(".token").__str__()
+
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description='Execute a manifest of hide and reveal jobs in a single process.')
+    parser.add_argument('--verbose',
+                        dest='verbose_flag',
+                        action='store_true',
+                        help='activate verbose output')
+    parser.add_argument('--dry-run',
+                        dest='dry_run_flag',
+                        action='store_true',
+                        help='dry-run flag')
+    parser.add_argument('--token',
+                        dest='token',
+                        type=str,
+                        required=False,
+                        default=default_tokens_path,
+                        help='path to the file containing the token to use for ChatGPT API (default: "{}")'.format(default_tokens_path))
+    parser.add_argument('--backend',
+                        dest='backend',
+                        type=str,
+                        required=False,
+                        choices=BACKENDS,
+                        default='chatgpt',
+                        help='rewriter used to reformulate the text sections (default: "chatgpt")')
+    parser.add_argument('--hedge',
+                        dest='hedge_percentile',
+                        type=float,
+                        required=False,
+                        default=None,
+                        help='send a duplicate LLM request when a request is slower than this percentile of the recent latencies (ex: 95)')
+    parser.add_argument('--rpm',
+                        dest='requests_per_minute',
+                        type=float,
+                        required=False,
+                        default=None,
+                        help='maximum number of LLM requests per minute, for all the jobs (default: no limit)')
+    parser.add_argument('--format',
+                        dest='format_version',
+                        type=int,
+                        required=False,
+                        choices=FORMATS,
+                        default=FORMAT_CHAINED,
+                        help='format of the murmur: 1 (chained, legacy), 2 (counter mode, parallel) or 3 (matrix embedding, fewer rewrites) (default: 1, can be overridden by each job)')
+    parser.add_argument('--jobs',
+                        dest='jobs',
+                        type=int,
+                        required=False,
+                        default=4,
+                        help='maximum number of jobs executed concurrently (default: 4)')
+    parser.add_argument('--hash-workers',
+                        dest='hash_workers',
+                        type=int,
+                        required=False,
+                        default=None,
+                        help='number of hashing workers (default: number of CPUs)')
+    parser.add_argument('--results',
+                        dest='results',
+                        type=str,
+                        required=False,
+                        default=None,
+                        help='path to the JSONL file that receives the result of each job (default: standard output)')
+    parser.add_argument('config',
+                        type=str,
+                        help='path to the YAML configuration file')
+    parser.add_argument('manifest',
+                        type=str,
+                        help='path to the manifest of jobs (JSONL or YAML)')
+
+    args = parser.parse_args()
+    verbose_flag: bool = args.verbose_flag
+    dry_run_flag: bool = args.dry_run_flag
+    token_path: str = args.token
+    backend: str = args.backend
+    hedge_percentile: Optional[float] = args.hedge_percentile
+    config_path: str = args.config
+    manifest_path: str = args.manifest
+    results_path: Optional[str] = args.results
+
+    # Load the API token (only required by the LLM backend)
+    token: Optional[str] = None
+    if backend == 'chatgpt':
+        try:
+            token = whisper.api_tools.load_token(token_path)
+        except Exception as e:
+            print('Error loading token file "{}": {}'.format(token_path, str(e)))
+            exit(1)
+
+    # Load the configuration and the manifest
+    try:
+        config: Config = load_config(config_path)
+    except Exception as e:
+        print('Error loading configuration file "{}": {}'.format(config_path, str(e)))
+        exit(1)
+    try:
+        jobs = load_manifest(manifest_path)
+    except Exception as e:
+        print('Error loading manifest "{}": {}'.format(manifest_path, str(e)))
+        exit(1)
+
+    params: Params = Params(token, None, verbose_flag, dry_run_flag, backend, hedge_percentile, args.format_version)
+    manager: JobManager = JobManager(params, config, max_jobs=args.jobs, hash_workers=args.hash_workers,
+                                     requests_per_minute=args.requests_per_minute)
+    try:
+        executed, summary = run_batch(manager, jobs)
+    finally:
+        manager.close()
+
+    lines: list[str] = [json.dumps(job.to_dict()) for job in executed]
+    if results_path is None:
+        print('\n'.join(lines))
+    else:
+        with open(results_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+    print(json.dumps(summary))
+    exit(0 if summary['failed'] == 0 else 1)
@@ -0,0 +1,137 @@
+# Usage:
+#
+#   Start the daemon:
+#      python daemon.py --token /home/dev/.token ../test-data/config.yaml
+#   Submit jobs (paths are paths on the host of the daemon):
+#      curl -X POST -d '{"key": "secret-key", "needle": "needle.txt", "haystack": "haystack.txt", "output": "output.txt"}' http://127.0.0.1:8765/hide
+#      curl -X POST -d '{"key": "secret-key", "murmur": "output.txt", "output": "message.txt"}' http://127.0.0.1:8765/reveal
+#   The optional argument "format" (1, 2 or 3) selects the format of the murmur of a job.
+#   Get the status of the jobs:
+#      curl http://127.0.0.1:8765/jobs
+#      curl http://127.0.0.1:8765/jobs/1
+#      curl http://127.0.0.1:8765/stats
+
+from typing import Optional
+import argparse
+from pathlib import Path
+import sys
+import os
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.whisperer import Params
+from whisper.config import Config, load_config
+from whisper.rewriter import BACKENDS
+from whisper.params import FORMATS, FORMAT_CHAINED
+from whisper.daemon import JobManager, DaemonServer, DEFAULT_HOST, DEFAULT_PORT
+import whisper.api_tools
+
+def get_script_dir() -> Path:
+    """Returns the path to the directory containing the script."""
+    return Path(__file__).resolve().parent
+
+if __name__ == '__main__':
+    script_dir: Path = get_script_dir()
+    default_tokens_path: str = script_dir.joinpath(".token").__str__()
+
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description='Run a local service that executes hide and reveal jobs.')
+    parser.add_argument('--verbose',
+                        dest='verbose_flag',
+                        action='store_true',
+                        help='activate verbose output')
+    parser.add_argument('--dry-run',
+                        dest='dry_run_flag',
+                        action='store_true',
+                        help='dry-run flag')
+    parser.add_argument('--token',
+                        dest='token',
+                        type=str,
+                        required=False,
+                        default=default_tokens_path,
+                        help='path to the file containing the token to use for ChatGPT API (default: "{}")'.format(default_tokens_path))
+    parser.add_argument('--backend',
+                        dest='backend',
+                        type=str,
+                        required=False,
+                        choices=BACKENDS,
+                        default='chatgpt',
+                        help='rewriter used to reformulate the text sections (default: "chatgpt")')
+    parser.add_argument('--hedge',
+                        dest='hedge_percentile',
+                        type=float,
+                        required=False,
+                        default=None,
+                        help='send a duplicate LLM request when a request is slower than this percentile of the recent latencies (ex: 95)')
+    parser.add_argument('--format',
+                        dest='format_version',
+                        type=int,
+                        required=False,
+                        choices=FORMATS,
+                        default=FORMAT_CHAINED,
+                        help='format of the murmur: 1 (chained, legacy), 2 (counter mode, parallel) or 3 (matrix embedding, fewer rewrites) (default: 1, can be overridden by each job)')
+    parser.add_argument('--jobs',
+                        dest='jobs',
+                        type=int,
+                        required=False,
+                        default=4,
+                        help='maximum number of jobs executed concurrently (default: 4)')
+    parser.add_argument('--hash-workers',
+                        dest='hash_workers',
+                        type=int,
+                        required=False,
+                        default=None,
+                        help='number of hashing workers (default: number of CPUs)')
+    parser.add_argument('--host',
+                        dest='host',
+                        type=str,
+                        required=False,
+                        default=DEFAULT_HOST,
+                        help='address to listen to (default: "{}")'.format(DEFAULT_HOST))
+    parser.add_argument('--port',
+                        dest='port',
+                        type=int,
+                        required=False,
+                        default=DEFAULT_PORT,
+                        help='port to listen to (default: {})'.format(DEFAULT_PORT))
+    parser.add_argument('config',
+                        type=str,
+                        help='path to the YAML configuration file')
+
+    args = parser.parse_args()
+    verbose_flag: bool = args.verbose_flag
+    dry_run_flag: bool = args.dry_run_flag
+    token_path: str = args.token
+    backend: str = args.backend
+    hedge_percentile: Optional[float] = args.hedge_percentile
+    config_path: str = args.config
+
+    # Load the API token (only required by the LLM backend)
+    token: Optional[str] = None
+    if backend == 'chatgpt':
+        try:
+            token = whisper.api_tools.load_token(token_path)
+        except Exception as e:
+            print('Error loading token file "{}": {}'.format(token_path, str(e)))
+            exit(1)
+
+    # Load the configuration
+    try:
+        config: Config = load_config(config_path)
+    except Exception as e:
+        print('Error loading configuration file "{}": {}'.format(config_path, str(e)))
+        exit(1)
+
+    params: Params = Params(token, None, verbose_flag, dry_run_flag, backend, hedge_percentile, args.format_version)
+    manager: JobManager = JobManager(params, config, max_jobs=args.jobs, hash_workers=args.hash_workers)
+    server: DaemonServer = DaemonServer(manager, args.host, args.port, verbose_flag)
+    print('Listening on http://{}:{}'.format(args.host, args.port), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.close()
@@ -26,8 +26,9 @@ algo: str = args.algo
 with open(input_path, "r") as f:
     content = f.read()
 
-hasher = Hasher(algo)
-h, bit = hasher.get_parity(algo, content)
+# The hash does not depend on any secret key: no key derivation is needed.
+h: bytes = Hasher.hash(algo, content)
+bit: int = Hasher.parity(h)
 print("hash: {}".format(h.hex()))
 print("bit:  {}\n".format(bit))
 
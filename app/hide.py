@@ -4,6 +4,15 @@
 #      python hide.py --debug --dry-run --verbose --token /home/dev/.token ../test-data/config.yaml secret-key ../test-data/needle.txt ../test-data/haystack.txt output.txt
 #   NORMAL-RUN:
 #      python hide.py --debug --verbose --token /home/dev/.token ../test-data/config.yaml secret-key ../test-data/needle.txt ../test-data/haystack.txt output.txt
+#   OFFLINE-RUN (local rule-based rewriter, no LLM):
+#      python hide.py --backend local ../test-data/config.yaml secret-key ../test-data/needle.txt ../test-data/haystack.txt output.txt
+#   RECORD / REPLAY (the replay does not access the network):
+#      python hide.py --token /home/dev/.token --record llm.jsonl.gz ../test-data/config.yaml secret-key ../test-data/needle.txt ../test-data/haystack.txt output.txt
+#      python hide.py --replay llm.jsonl.gz ../test-data/config.yaml secret-key ../test-data/needle.txt ../test-data/haystack.txt output.txt
+#   INCREMENTAL (after editing the needle, reuse the sections of the previous output):
+#      python hide.py --previous output.txt --token /home/dev/.token ../test-data/config.yaml secret-key ../test-data/needle.txt ../test-data/haystack.txt output-2.txt
+#   DISTRIBUTED (the sections are rewritten by the workers sharing the task store, see worker.py):
+#      python hide.py --task-store tasks.sqlite ../test-data/config.yaml secret-key ../test-data/needle.txt ../test-data/haystack.txt output.txt
 
 from typing import Optional
 import argparse
@@ -19,8 +28,13 @@ SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
 print("Set search path: {}".format(SEARCH_PATH))
 sys.path.insert(0, SEARCH_PATH)
 
-from whisper.whisperer import Whisperer, Params
+from whisper.whisperer import Whisperer, Params, MAX_ATTEMPTS
 from whisper.config import Config, load_config
+from whisper.incremental import PreviousSection, load_previous
+from whisper.rewriter import BACKENDS
+from whisper.params import FORMATS, FORMAT_CHAINED, MATRIX_GROUP_SIZE
+from whisper.disk_list import MEMORY_BUDGET
+from whisper.task_store import STALL_TIMEOUT
 import whisper.api_tools
 
 def get_script_dir() -> Path:
@@ -72,6 +86,106 @@ if __name__ == '__main__':
                         required=False,
                         default=default_tokens_path,
                         help='path to the file containing the token to use for ChatGPT API (default: "{}")'.format(default_tokens_path))
+    parser.add_argument('--backend',
+                        dest='backend',
+                        type=str,
+                        required=False,
+                        choices=BACKENDS,
+                        default='chatgpt',
+                        help='rewriter used to reformulate the text sections (default: "chatgpt")')
+    parser.add_argument('--hedge',
+                        dest='hedge_percentile',
+                        type=float,
+                        required=False,
+                        default=None,
+                        help='send a duplicate LLM request when a request is slower than this percentile of the recent latencies (ex: 95)')
+    parser.add_argument('--format',
+                        dest='format_version',
+                        type=int,
+                        required=False,
+                        choices=FORMATS,
+                        default=FORMAT_CHAINED,
+                        help='format of the murmur: 1 (chained, legacy), 2 (counter mode, parallel) or 3 (matrix embedding, fewer rewrites) (default: 1)')
+    parser.add_argument('--concurrency',
+                        dest='concurrency',
+                        type=int,
+                        required=False,
+                        default=8,
+                        help='maximum number of sections rewritten concurrently (default: 8)')
+    parser.add_argument('--boundary-concurrency',
+                        dest='boundary_concurrency',
+                        type=int,
+                        required=False,
+                        default=3,
+                        help='number of concurrent requests for the last section of each block, for the format 1 (default: 3)')
+    parser.add_argument('--batch-size',
+                        dest='batch_size',
+                        type=int,
+                        required=False,
+                        default=1,
+                        help='maximum number of sections sent to the LLM in a single request (default: 1)')
+    parser.add_argument('--batch-tokens',
+                        dest='batch_tokens',
+                        type=int,
+                        required=False,
+                        default=None,
+                        help='maximum number of tokens of the sections sent to the LLM in a single request (default: no limit)')
+    parser.add_argument('--max-attempts',
+                        dest='max_attempts',
+                        type=int,
+                        required=False,
+                        default=MAX_ATTEMPTS,
+                        help='maximum number of reformulations of a section before the hide fails (default: {})'.format(MAX_ATTEMPTS))
+    parser.add_argument('--group-size',
+                        dest='group_size',
+                        type=int,
+                        required=False,
+                        default=MATRIX_GROUP_SIZE,
+                        help='number of sections per group of 3 bits, for the format 3 (default: {})'.format(MATRIX_GROUP_SIZE))
+    parser.add_argument('--no-recombination',
+                        dest='recombination',
+                        action='store_false',
+                        help='do not mix the sentences of the sections and of their reformulations before sending another request')
+    parser.add_argument('--record',
+                        dest='record_path',
+                        type=str,
+                        required=False,
+                        default=None,
+                        help='record the responses of the LLM in this cassette (JSONL, compressed if the name ends with ".gz")')
+    parser.add_argument('--replay',
+                        dest='replay_path',
+                        type=str,
+                        required=False,
+                        default=None,
+                        help='serve the responses recorded in this cassette instead of calling the LLM')
+    parser.add_argument('--replay-latency',
+                        dest='replay_latency',
+                        action='store_true',
+                        help='delay the replayed responses by their recorded latencies')
+    parser.add_argument('--previous',
+                        dest='previous_path',
+                        type=str,
+                        required=False,
+                        default=None,
+                        help='previous output (or database from the debug directory) generated from the same haystack, whose sections are reused when possible')
+    parser.add_argument('--task-store',
+                        dest='task_store',
+                        type=str,
+                        required=False,
+                        default=None,
+                        help='shared task store (SQLite): the sections are rewritten by the workers (see worker.py) instead of this process')
+    parser.add_argument('--task-timeout',
+                        dest='task_timeout',
+                        type=float,
+                        required=False,
+                        default=STALL_TIMEOUT,
+                        help='delay (in seconds) after which the hide fails if the workers make no progress (default: {})'.format(STALL_TIMEOUT))
+    parser.add_argument('--memory-budget',
+                        dest='memory_budget',
+                        type=int,
+                        required=False,
+                        default=MEMORY_BUDGET // (1024 * 1024),
+                        help='size (in MiB) above which the sections are spilled to disk (default: {})'.format(MEMORY_BUDGET // (1024 * 1024)))
     parser.add_argument('config',
                         type=str,
                         help='path to the YAML configuration file')
@@ -99,13 +213,30 @@ if __name__ == '__main__':
     haystack_path: str = args.haystack
     output_path: str = args.output
     token_path: str = args.token
+    backend: str = args.backend
+    record_path: Optional[str] = args.record_path
+    replay_path: Optional[str] = args.replay_path
+    hedge_percentile: Optional[float] = args.hedge_percentile
+    format_version: int = args.format_version
+    concurrency: int = args.concurrency
+    batch_size: int = args.batch_size
+    group_size: int = args.group_size
+    recombination: bool = args.recombination
+    boundary_concurrency: int = args.boundary_concurrency
+    task_store: Optional[str] = args.task_store
 
-    # Load the API token
-    try:
-        token: str = whisper.api_tools.load_token(token_path)
-    except Exception as e:
-        print('Error loading token file "{}": {}'.format(token_path, str(e)))
-        exit(1)
+    # With a task store, the LLM is only called by the workers.
+    if task_store is not None:
+        backend = 'local'
+
+    # Load the API token (only required by the LLM backend)
+    token: Optional[str] = None
+    if backend == 'chatgpt' and replay_path is None:
+        try:
+            token = whisper.api_tools.load_token(token_path)
+        except Exception as e:
+            print('Error loading token file "{}": {}'.format(token_path, str(e)))
+            exit(1)
 
     # Load the configuration
     try:
@@ -115,16 +246,33 @@ if __name__ == '__main__':
         exit(1)
 
 
+    # Load the previous hide (before the debug directory is cleaned)
+    previous: Optional[dict[int, PreviousSection]] = None
+    if args.previous_path is not None:
+        try:
+            previous = load_previous(args.previous_path)
+        except Exception as e:
+            print('Error loading previous output "{}": {}'.format(args.previous_path, str(e)))
+            exit(1)
+
     # Initialize the environment
     init_env(Path(debug_dir))
 
     try:
-        params: Params = Params(token, debug_dir if debug_flag else None, verbose_flag, dry_run_flag)
+        params: Params = Params(token, debug_dir if debug_flag else None, verbose_flag, dry_run_flag, backend, hedge_percentile,
+                                format_version, concurrency, batch_size=batch_size, group_size=group_size,
+                                recombination=recombination, boundary_concurrency=boundary_concurrency,
+                                record_path=record_path, replay_path=replay_path, replay_latency=args.replay_latency,
+                                task_store=task_store, task_timeout=args.task_timeout, memory_budget=args.memory_budget * 1024 * 1024,
+                                batch_tokens=args.batch_tokens, max_attempts=args.max_attempts)
         w: Whisperer = Whisperer(params, config)
-    except ValueError as e:
+    except (ValueError, OSError) as e:
         print('Error initializing Whisperer: {}'.format(str(e)))
         exit(1)
-    w.hide(needle_path, haystack_path, key, output_path)
+    try:
+        w.hide(needle_path, haystack_path, key, output_path, previous)
+    finally:
+        w.close()
 
 
 
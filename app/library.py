@@ -0,0 +1,86 @@
+# Usage:
+#
+#   Index the haystacks of a library (the parities of the sections are computed for all the algorithms):
+#      python library.py index library.sqlite ../test-data/haystack.txt haystacks/*.txt
+#   Find the haystacks that need the fewest rewrites to hide a needle with a given key (no section is hashed):
+#      python library.py rank --format 2 --top 5 library.sqlite secret-key ../test-data/needle.txt
+
+import argparse
+import time
+import sys
+import os
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.library import HaystackLibrary
+from whisper.hash_pool import HashPool
+from whisper.message import Message
+from whisper.params import FORMATS, FORMAT_CHAINED, MATRIX_GROUP_SIZE
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Index a library of haystacks, and rank them by cost for a given key and needle')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = commands.add_parser('index', help='index (or re-index) haystacks')
+    index_parser.add_argument('--force',
+                              dest='force',
+                              action='store_true',
+                              help='index the haystacks even if they did not change since their last indexing')
+    index_parser.add_argument('library',
+                              type=str,
+                              help='path to the index of the library (SQLite)')
+    index_parser.add_argument('haystacks',
+                              type=str,
+                              nargs='+',
+                              help='paths to the haystacks')
+
+    rank_parser = commands.add_parser('rank', help='rank the indexed haystacks by number of rewrites and tokens')
+    rank_parser.add_argument('--format',
+                             dest='format_version',
+                             type=int,
+                             required=False,
+                             choices=FORMATS,
+                             default=FORMAT_CHAINED,
+                             help='format of the murmur (default: 1)')
+    rank_parser.add_argument('--group-size',
+                             dest='group_size',
+                             type=int,
+                             required=False,
+                             default=MATRIX_GROUP_SIZE,
+                             help='number of sections per group of 3 bits, for the format 3 (default: {})'.format(MATRIX_GROUP_SIZE))
+    rank_parser.add_argument('--top',
+                             dest='top',
+                             type=int,
+                             required=False,
+                             default=10,
+                             help='number of haystacks to print (default: 10)')
+    rank_parser.add_argument('library',
+                             type=str,
+                             help='path to the index of the library (SQLite)')
+    rank_parser.add_argument('key',
+                             type=str,
+                             help='secret key to use for hiding the text file')
+    rank_parser.add_argument('needle',
+                             type=str,
+                             help='path to the text file to hide')
+    args = parser.parse_args()
+
+    with HaystackLibrary(args.library) as library:
+        if args.command == 'index':
+            with HashPool() as pool:
+                for haystack in args.haystacks:
+                    start: float = time.monotonic()
+                    indexed: bool = library.index(haystack, pool, args.force)
+                    print('%-60s %s' % (haystack, '%.1fs' % (time.monotonic() - start) if indexed else 'unchanged'))
+        else:
+            bits = Message.load_text_file_as_vector(args.needle, length=16)
+            start = time.monotonic()
+            ranking = library.rank(list(bits), args.key, args.format_version, args.group_size)
+            duration: float = time.monotonic() - start
+            print('%10s %10s %10s  %s' % ('sections', 'rewrites', 'tokens', 'haystack'))
+            for path, p in ranking[:args.top]:
+                print('%10s %10s %10d  %s%s' % ('{}/{}'.format(p.sections, p.available), ('%d' if p.exact else '~%.1f') % p.rewrites,
+                                              p.tokens, path, '' if p.feasible() else '  (too short)'))
+            print('{} haystacks ranked in {:.1f} ms'.format(len(ranking), duration * 1000))
@@ -0,0 +1,58 @@
+# Usage:
+#
+#   python plan.py secret-key ../test-data/needle.txt ../test-data/haystack.txt
+#
+#   Print, for each format, the number of sections needed to hide the needle, and the number of
+#   sections that need to be rewritten (no LLM request is sent).
+
+import argparse
+import sys
+import os
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.planner import Plan, plan
+from whisper.hash_pool import HashPool
+from whisper.message import Message
+from whisper.params import FORMATS, MATRIX_GROUP_SIZE
+from whisper.text_file_tool import read_sections_from_file
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compute the number of rewrites needed to hide a text file, for each format')
+    parser.add_argument('--format',
+                        dest='format_version',
+                        type=int,
+                        required=False,
+                        choices=FORMATS,
+                        default=None,
+                        help='only compute the plan of this format (default: all the formats)')
+    parser.add_argument('--group-size',
+                        dest='group_size',
+                        type=int,
+                        required=False,
+                        default=MATRIX_GROUP_SIZE,
+                        help='number of sections per group of 3 bits, for the format 3 (default: {})'.format(MATRIX_GROUP_SIZE))
+    parser.add_argument('key',
+                        type=str,
+                        help='secret key to use for hiding the text file')
+    parser.add_argument('needle',
+                        type=str,
+                        help='path to the text file to hide')
+    parser.add_argument('haystack',
+                        type=str,
+                        help='path to the text file used as a "haystack" for hiding')
+
+    args = parser.parse_args()
+    formats: list[int] = FORMATS if args.format_version is None else [args.format_version]
+    bits = Message.load_text_file_as_vector(args.needle, length=16)
+    texts: list[str] = list(read_sections_from_file(args.haystack))
+
+    print('%-8s %8s %10s %10s %10s %10s' % ('format', 'bits', 'sections', 'rewrites', 'calls', 'tokens'))
+    with HashPool() as pool:
+        for format_version in formats:
+            p: Plan = plan(list(bits), texts, args.key, format_version, args.group_size, pool)
+            print('%-8d %8d %10s %10s %10.1f %10d%s' % (p.format_version, p.bits, '{}/{}'.format(p.sections, p.available),
+                                                       ('%d' if p.exact else '~%.1f') % p.rewrites, p.expected_calls(), p.tokens,
+                                                       '' if p.feasible() else '  (haystack too short)'))
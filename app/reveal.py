@@ -1,5 +1,7 @@
 # Usage:
 #   python -u reveal.py --verbose secret-key ../test-data/output.txt message.txt
+#   Find the murmur within a larger document (the murmur may start after other paragraphs):
+#   python -u reveal.py --scan secret-key document.txt message.txt
 
 import argparse
 import sys
@@ -10,7 +12,13 @@ CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
 SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
 sys.path.insert(0, SEARCH_PATH)
 
-from whisper.whisperer import Revealer, Config
+from typing import Optional
+from whisper.revealer import Revealer
+from whisper.locator import MurmurLocator, Location
+from whisper.library import HaystackLibrary, IndexedHaystack
+from whisper.text_file_tool import read_sections_from_file
+from whisper.params import FORMATS, FORMAT_CHAINED, MATRIX_GROUP_SIZE
+from whisper.disk_list import MEMORY_BUDGET
 
 def get_script_dir() -> Path:
     """Returns the path to the directory containing the script."""
@@ -25,6 +33,41 @@ if __name__ == '__main__':
                         dest='verbose_flag',
                         action='store_true',
                         help='activate verbose output')
+    parser.add_argument('--format',
+                        dest='format_version',
+                        type=int,
+                        required=False,
+                        choices=FORMATS,
+                        default=FORMAT_CHAINED,
+                        help='format of the murmur: 1 (chained, legacy), 2 (counter mode, parallel) or 3 (matrix embedding, fewer rewrites) (default: 1)')
+    parser.add_argument('--group-size',
+                        dest='group_size',
+                        type=int,
+                        required=False,
+                        default=MATRIX_GROUP_SIZE,
+                        help='number of sections per group of 3 bits, for the format 3 (default: {})'.format(MATRIX_GROUP_SIZE))
+    parser.add_argument('--memory-budget',
+                        dest='memory_budget',
+                        type=int,
+                        required=False,
+                        default=MEMORY_BUDGET // (1024 * 1024),
+                        help='size (in MiB) above which the sections are spilled to disk (default: {})'.format(MEMORY_BUDGET // (1024 * 1024)))
+    parser.add_argument('--scan',
+                        dest='scan_flag',
+                        action='store_true',
+                        help='search the murmur within the file (it may not start at the first section)')
+    parser.add_argument('--length',
+                        dest='length',
+                        type=int,
+                        required=False,
+                        default=None,
+                        help='length (in bytes) of the hidden text, if known, for the scan')
+    parser.add_argument('--library',
+                        dest='library',
+                        type=str,
+                        required=False,
+                        default=None,
+                        help='index of a library (see library.py) that contains the file: the scan does not hash its sections')
     parser.add_argument('secret_key',
                         type=str,
                         help='the secret key used to hide the text file')
@@ -46,7 +89,26 @@ if __name__ == '__main__':
         print('output:     "{}"'.format(output_path))
         print('secret key: "{}"\n'.format(secret_key))
 
-    revealer = Revealer(murmur_path, output_path, secret_key, verbose_flag)
+    if args.scan_flag:
+        indexed: Optional[IndexedHaystack] = None
+        if args.library is not None:
+            with HaystackLibrary(args.library) as library:
+                indexed = library.get(murmur_path)
+        locator = MurmurLocator(secret_key, args.format_version, args.group_size, expected_length=args.length,
+                                verbose=verbose_flag)
+        locations: list[Location] = locator.locate(list(read_sections_from_file(murmur_path)), indexed)
+        if len(locations) == 0:
+            print('No murmur found in "{}".'.format(murmur_path))
+            exit(1)
+        for location in locations:
+            print('murmur found at section {} ({} sections, {} bytes)'.format(location.offset + 1, location.sections,
+                                                                             len(location.message)))
+        with open(output_path, 'w') as f:
+            f.write(str(locations[0].message, 'ascii'))
+        exit(0)
+
+    revealer = Revealer(murmur_path, output_path, secret_key, verbose_flag, format_version=args.format_version,
+                        group_size=args.group_size, memory_budget=args.memory_budget * 1024 * 1024)
     revealer.reveal()
 
 
@@ -0,0 +1,156 @@
+# Usage:
+#
+#   Hide a needle across several haystacks (one stripe per haystack, hidden concurrently):
+#      python stripe.py hide --token /home/dev/.token ../test-data/config.yaml secret-key ../test-data/needle.txt manifest.json haystack-1.txt haystack-2.txt
+#   Reveal the needle from the manifest (the murmurs are "manifest.0.txt", "manifest.1.txt"... next to the manifest):
+#      python stripe.py reveal secret-key manifest.json message.txt
+
+from typing import Optional
+import argparse
+from pathlib import Path
+import sys
+import os
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.whisperer import Params
+from whisper.config import Config, load_config
+from whisper.rewriter import BACKENDS
+from whisper.params import FORMATS, FORMAT_CHAINED, MATRIX_GROUP_SIZE
+from whisper.striping import hide_striped, reveal_striped
+import whisper.api_tools
+
+def get_script_dir() -> Path:
+    """Returns the path to the directory containing the script."""
+    return Path(__file__).resolve().parent
+
+if __name__ == '__main__':
+    script_dir: Path = get_script_dir()
+    default_tokens_path: str = script_dir.joinpath(".token").__str__()
+
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description='Hide a text file across several haystacks, or reveal it from a stripe manifest')
+    parser.add_argument('--verbose',
+                        dest='verbose_flag',
+                        action='store_true',
+                        help='activate verbose output')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    hide_parser = commands.add_parser('hide', help='split the needle into stripes, and hide them concurrently')
+    hide_parser.add_argument('--dry-run',
+                             dest='dry_run_flag',
+                             action='store_true',
+                             help='dry-run flag')
+    hide_parser.add_argument('--token',
+                             dest='token',
+                             type=str,
+                             required=False,
+                             default=default_tokens_path,
+                             help='path to the file containing the token to use for ChatGPT API (default: "{}")'.format(default_tokens_path))
+    hide_parser.add_argument('--backend',
+                             dest='backend',
+                             type=str,
+                             required=False,
+                             choices=BACKENDS,
+                             default='chatgpt',
+                             help='rewriter used to reformulate the text sections (default: "chatgpt")')
+    hide_parser.add_argument('--format',
+                             dest='format_version',
+                             type=int,
+                             required=False,
+                             choices=FORMATS,
+                             default=FORMAT_CHAINED,
+                             help='format of the murmurs: 1 (chained, legacy), 2 (counter mode, parallel) or 3 (matrix embedding, fewer rewrites) (default: 1)')
+    hide_parser.add_argument('--group-size',
+                             dest='group_size',
+                             type=int,
+                             required=False,
+                             default=MATRIX_GROUP_SIZE,
+                             help='number of sections per group of 3 bits, for the format 3 (default: {})'.format(MATRIX_GROUP_SIZE))
+    hide_parser.add_argument('--concurrency',
+                             dest='concurrency',
+                             type=int,
+                             required=False,
+                             default=8,
+                             help='maximum number of sections of a stripe rewritten concurrently (default: 8)')
+    hide_parser.add_argument('--record',
+                             dest='record_path',
+                             type=str,
+                             required=False,
+                             default=None,
+                             help='record the responses of the LLM in this cassette (JSONL, compressed if the name ends with ".gz")')
+    hide_parser.add_argument('--replay',
+                             dest='replay_path',
+                             type=str,
+                             required=False,
+                             default=None,
+                             help='serve the responses recorded in this cassette instead of calling the LLM')
+    hide_parser.add_argument('config',
+                             type=str,
+                             help='path to the YAML configuration file')
+    hide_parser.add_argument('key',
+                             type=str,
+                             help='secret key to use for hiding the text file')
+    hide_parser.add_argument('needle',
+                             type=str,
+                             help='path to the text file to hide')
+    hide_parser.add_argument('manifest',
+                             type=str,
+                             help='path to the manifest of the stripes (JSON)')
+    hide_parser.add_argument('haystacks',
+                             type=str,
+                             nargs='+',
+                             help='paths to the haystacks (one stripe per haystack)')
+
+    reveal_parser = commands.add_parser('reveal', help='reveal the stripes of a manifest concurrently')
+    reveal_parser.add_argument('key',
+                               type=str,
+                               help='the secret key used to hide the text file')
+    reveal_parser.add_argument('manifest',
+                               type=str,
+                               help='path to the manifest of the stripes (JSON)')
+    reveal_parser.add_argument('output',
+                               type=str,
+                               help='path to the output file')
+    args = parser.parse_args()
+    verbose_flag: bool = args.verbose_flag
+
+    if args.command == 'reveal':
+        try:
+            needle: bytes = reveal_striped(args.manifest, args.key, verbose=verbose_flag)
+        except (ValueError, OSError) as e:
+            print('Error revealing stripes "{}": {}'.format(args.manifest, str(e)))
+            exit(1)
+        with open(args.output, 'w') as f:
+            f.write(needle.decode('ascii'))
+        exit(0)
+
+    # Load the API token (only required by the LLM backend)
+    token: Optional[str] = None
+    if args.backend == 'chatgpt' and args.replay_path is None:
+        try:
+            token = whisper.api_tools.load_token(args.token)
+        except Exception as e:
+            print('Error loading token file "{}": {}'.format(args.token, str(e)))
+            exit(1)
+
+    # Load the configuration
+    try:
+        config: Config = load_config(args.config)
+    except Exception as e:
+        print('Error loading configuration file "{}": {}'.format(args.config, str(e)))
+        exit(1)
+
+    with open(args.needle, 'rb') as f:
+        data: bytes = f.read()
+    params: Params = Params(token, None, verbose_flag, args.dry_run_flag, args.backend, None, args.format_version,
+                            args.concurrency, group_size=args.group_size, record_path=args.record_path,
+                            replay_path=args.replay_path)
+    try:
+        calls: int = hide_striped(data, args.haystacks, args.key, args.manifest, params, config)
+    except (ValueError, OSError) as e:
+        print('Error hiding stripes: {}'.format(str(e)))
+        exit(1)
+    print('{} stripes hidden ({} calls to the rewriter), manifest: "{}"'.format(len(args.haystacks), calls, args.manifest))
@@ -0,0 +1,136 @@
+# Usage:
+#   python worker.py --token /home/dev/.token ../test-data/config.yaml tasks.sqlite
+#
+# The worker rewrites the sections of the hides started with "hide.py --task-store tasks.sqlite".
+# Several workers (on several hosts, if the task store is on a shared file system) can share the same store.
+
+from typing import Optional
+import argparse
+from pathlib import Path
+import signal
+import sys
+import os
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.whisperer import Whisperer, Params
+from whisper.config import Config, load_config
+from whisper.rewriter import BACKENDS
+from whisper.task_store import TaskStore
+from whisper.worker import Worker, LEASE_DURATION
+import whisper.api_tools
+
+def get_script_dir() -> Path:
+    """Returns the path to the directory containing the script."""
+    return Path(__file__).resolve().parent
+
+if __name__ == '__main__':
+    script_dir: Path = get_script_dir()
+    default_tokens_path: str = script_dir.joinpath(".token").__str__()
+
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description='Rewrite the text sections of the hides that share a task store.')
+    parser.add_argument('--verbose',
+                        dest='verbose_flag',
+                        action='store_true',
+                        help='activate verbose output')
+    parser.add_argument('--dry-run',
+                        dest='dry_run_flag',
+                        action='store_true',
+                        help='dry-run flag')
+    parser.add_argument('--token',
+                        dest='token',
+                        type=str,
+                        required=False,
+                        default=default_tokens_path,
+                        help='path to the file containing the token to use for ChatGPT API (default: "{}")'.format(default_tokens_path))
+    parser.add_argument('--backend',
+                        dest='backend',
+                        type=str,
+                        required=False,
+                        choices=BACKENDS,
+                        default='chatgpt',
+                        help='rewriter used to reformulate the text sections (default: "chatgpt")')
+    parser.add_argument('--hedge',
+                        dest='hedge_percentile',
+                        type=float,
+                        required=False,
+                        default=None,
+                        help='send a duplicate LLM request when a request is slower than this percentile of the recent latencies (ex: 95)')
+    parser.add_argument('--concurrency',
+                        dest='concurrency',
+                        type=int,
+                        required=False,
+                        default=8,
+                        help='maximum number of sections rewritten concurrently (default: 8)')
+    parser.add_argument('--boundary-concurrency',
+                        dest='boundary_concurrency',
+                        type=int,
+                        required=False,
+                        default=3,
+                        help='number of concurrent requests for the last section of each block, for the format 1 (default: 3)')
+    parser.add_argument('--no-recombination',
+                        dest='recombination',
+                        action='store_false',
+                        help='do not mix the sentences of the sections and of their reformulations before sending another request')
+    parser.add_argument('--name',
+                        dest='name',
+                        type=str,
+                        required=False,
+                        default=None,
+                        help='name of the worker, recorded in the leases (default: host name and process ID)')
+    parser.add_argument('--lease',
+                        dest='lease_duration',
+                        type=float,
+                        required=False,
+                        default=LEASE_DURATION,
+                        help='duration of the leases, in seconds: the tasks of a dead worker are leased again after this delay (default: {})'.format(LEASE_DURATION))
+    parser.add_argument('--exit-when-idle',
+                        dest='exit_when_idle',
+                        action='store_true',
+                        help='exit when there is no task left, instead of waiting for new tasks')
+    parser.add_argument('config',
+                        type=str,
+                        help='path to the YAML configuration file')
+    parser.add_argument('store',
+                        type=str,
+                        help='path to the task store (SQLite)')
+    args = parser.parse_args()
+
+    # Load the API token (only required by the LLM backend)
+    token: Optional[str] = None
+    if args.backend == 'chatgpt':
+        try:
+            token = whisper.api_tools.load_token(args.token)
+        except Exception as e:
+            print('Error loading token file "{}": {}'.format(args.token, str(e)))
+            exit(1)
+
+    # Load the configuration
+    try:
+        config: Config = load_config(args.config)
+    except Exception as e:
+        print('Error loading configuration file "{}": {}'.format(args.config, str(e)))
+        exit(1)
+
+    try:
+        params: Params = Params(token, None, args.verbose_flag, args.dry_run_flag, args.backend, args.hedge_percentile,
+                                concurrency=args.concurrency, recombination=args.recombination,
+                                boundary_concurrency=args.boundary_concurrency)
+        # The database of the Whisperer is not used by the worker.
+        w: Whisperer = Whisperer(params, config, db_path=':memory:')
+        worker: Worker = Worker(TaskStore(args.store), w, args.name, args.lease_duration)
+    except (ValueError, OSError) as e:
+        print('Error initializing worker: {}'.format(str(e)))
+        exit(1)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    try:
+        worker.run(args.exit_when_idle)
+    except KeyboardInterrupt:
+        worker.stop()
+    finally:
+        w.close()
+        print(worker.stats())
@@ -1,5 +1,5 @@
 from .types import Bit, Int64, Int16, Vector, T
-from .params import KEY_LENGTH
+from .params import KEY_LENGTH, FORMAT_CHAINED, FORMAT_COUNTER, FORMAT_MATRIX, FORMATS, MATRIX_BITS, MATRIX_GROUP_SIZE
 
 __all__ = [
     "Bit",
@@ -8,4 +8,10 @@ __all__ = [
     "Vector",
     "T",
     "KEY_LENGTH",
+    "FORMAT_CHAINED",
+    "FORMAT_COUNTER",
+    "FORMAT_MATRIX",
+    "FORMATS",
+    "MATRIX_BITS",
+    "MATRIX_GROUP_SIZE",
 ]
\ No newline at end of file
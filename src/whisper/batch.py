@@ -0,0 +1,87 @@
+import os
+import json
+import time
+from pathlib import Path
+from typing import Any
+from .jobs import Job, JobManager, JOB_ARGUMENTS
+
+# Job arguments that are paths (relative paths are relative to the manifest).
+PATH_ARGUMENTS: list[str] = ['needle', 'haystack', 'murmur', 'output']
+
+# Job arguments that are files read by the job (the other path, "output", is written by the job).
+INPUT_ARGUMENTS: list[str] = ['needle', 'haystack', 'murmur']
+
+def load_manifest(path: str) -> list[dict[str, Any]]:
+    """Load a manifest of jobs.
+
+    The manifest is either a JSONL file (one job per line), or a YAML file (a list of jobs, or a
+    dictionary with the key "jobs"). Each job is a dictionary that contains the key "type" ("hide" or
+    "reveal") and the arguments of the job (see whisper.jobs.JOB_ARGUMENTS). Relative paths are
+    relative to the directory of the manifest.
+    """
+    manifest_path: Path = Path(path)
+    jobs: Any
+    if manifest_path.suffix in ['.yaml', '.yml']:
+        import yaml
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            jobs = yaml.safe_load(f)
+        if isinstance(jobs, dict):
+            jobs = jobs.get('jobs')
+    else:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            jobs = [json.loads(line) for line in f if line.strip() != '']
+
+    if not isinstance(jobs, list):
+        raise ValueError("The manifest must contain a list of jobs.")
+    for index, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            raise ValueError("Job #{} must be a dictionary.".format(index + 1))
+        if job.get('type') not in JOB_ARGUMENTS:
+            raise ValueError("Job #{}: invalid type '{}' (must be one of {}).".format(index + 1, job.get('type'), ', '.join(JOB_ARGUMENTS)))
+        for name in JOB_ARGUMENTS[job['type']]:
+            if name not in job:
+                raise ValueError("Job #{}: the argument '{}' is missing.".format(index + 1, name))
+            job[name] = str(job[name])
+            if name in PATH_ARGUMENTS:
+                job[name] = str(manifest_path.parent.joinpath(job[name]))
+    return jobs
+
+def dependencies(jobs: list[dict[str, Any]]) -> list[list[int]]:
+    """Return, for each job of a manifest, the indexes of the previous jobs that it must wait for: the jobs
+    that write one of its input files, and the jobs that read or write its output file."""
+    def paths(job: dict[str, Any], names: list[str]) -> set[str]:
+        return {os.path.normpath(job[name]) for name in names if name in job}
+
+    result: list[list[int]] = []
+    for index, job in enumerate(jobs):
+        inputs: set[str] = paths(job, INPUT_ARGUMENTS)
+        outputs: set[str] = paths(job, ['output'])
+        result.append([i for i, previous in enumerate(jobs[:index])
+                       if paths(previous, ['output']) & (inputs | outputs) or paths(previous, INPUT_ARGUMENTS) & outputs])
+    return result
+
+def run_batch(manager: JobManager, jobs: list[dict[str, Any]]) -> tuple[list[Job], dict[str, Any]]:
+    """Execute the jobs of a manifest. Return the executed jobs and a summary.
+    The jobs are executed concurrently, except that a job waits for the previous jobs of the manifest that
+    produce its input files (for example, a reveal waits for the hide of its murmur, see dependencies)."""
+    start: float = time.monotonic()
+    submitted: list[Job] = []
+    for job, after in zip(jobs, dependencies(jobs)):
+        submitted.append(manager.submit(job['type'], job, [submitted[i] for i in after]))
+    manager.wait()
+    elapsed: float = time.monotonic() - start
+    calls: int = sum(job.calls for job in submitted)
+
+    summary: dict[str, Any] = {
+        'jobs': len(submitted),
+        'done': sum(1 for job in submitted if job.status == 'done'),
+        'failed': sum(1 for job in submitted if job.status == 'failed'),
+        'calls': calls,
+        'input_tokens': sum(job.input_tokens for job in submitted),
+        'output_tokens': sum(job.output_tokens for job in submitted),
+        'duplicate_rate': round(sum(job.duplicates for job in submitted) / calls, 3) if calls > 0 else None,
+        'elapsed': round(elapsed, 3),
+        'jobs_per_minute': round(60.0 * len(submitted) / elapsed, 3) if elapsed > 0 else None,
+        'hash_pool': manager.hash_pool.stats(),
+    }
+    return submitted, summary
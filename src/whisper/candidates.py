@@ -0,0 +1,73 @@
+import re
+from typing import Optional
+
+# Classification of a candidate (see CandidateHistory.add):
+#  - NEW: a text never seen for the section.
+#  - VARIANT: a text that only differs from a seen text by its whitespace. Its hash differs, so it is a valid
+#             candidate, but it does not add anything to the history given to the LLM.
+#  - DUPLICATE: a text already seen for the section. Its hash (and thus its parity) is already known.
+NEW: str = 'new'
+VARIANT: str = 'variant'
+DUPLICATE: str = 'duplicate'
+
+# Maximum number of rejected reformulations given back to the LLM (the most recent ones).
+MAX_HISTORY: int = 5
+
+WHITESPACE = re.compile(r'\s+')
+
+def normalize(text: str) -> str:
+    return WHITESPACE.sub(' ', text).strip()
+
+class CandidateHistory:
+    """The candidates already tried for a section, with a given algorithm.
+
+    A candidate seen before cannot get a new parity: it is not hashed again, and its combinations with the
+    section (see whisper.recombination) are not tried again. The original text of the section is a known
+    candidate, since it is rewritten because its parity is not the expected one.
+    """
+
+    def __init__(self, original_text: Optional[str] = None) -> None:
+        self.texts: set[str] = set()
+        self.normalized: set[str] = set()
+        # Rejected reformulations, in the order of arrival: they are distinct (after normalization), except the
+        # duplicates received again (see repeat).
+        self.rejected: list[str] = []
+        self.rejected_keys: set[str] = set()
+        # Number of candidates added (including the duplicates and the variants), and number of duplicates.
+        self.attempts: int = 0
+        self.duplicates: int = 0
+        if original_text is not None:
+            self.texts.add(original_text)
+            self.normalized.add(normalize(original_text))
+            self.rejected_keys.add(normalize(original_text))
+
+    def add(self, text: str) -> str:
+        """Add a candidate, and return its classification (NEW, VARIANT or DUPLICATE)."""
+        self.attempts += 1
+        if text in self.texts:
+            self.duplicates += 1
+            return DUPLICATE
+        self.texts.add(text)
+        key: str = normalize(text)
+        if key in self.normalized:
+            return VARIANT
+        self.normalized.add(key)
+        return NEW
+
+    def reject(self, text: str) -> None:
+        """Record a candidate that does not have the expected parity (the variants of a rejected reformulation,
+        or of the original text, are not kept)."""
+        key: str = normalize(text)
+        if key not in self.rejected_keys:
+            self.rejected_keys.add(key)
+            self.rejected.append(text)
+
+    def repeat(self, text: str) -> None:
+        """Record a duplicate, so that the next request differs from the one that got it: the text is appended
+        (again) to the rejected reformulations given to the LLM."""
+        self.rejected.append(text)
+        self.rejected_keys.add(normalize(text))
+
+    def history(self, size: int = MAX_HISTORY) -> list[str]:
+        """Return the most recent rejected reformulations."""
+        return self.rejected[-size:]
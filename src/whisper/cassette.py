@@ -0,0 +1,109 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from typing import Any, IO, Iterator, Optional
+from .rewriter import Rewriter
+
+def request_key(messages: list[dict[str, str]]) -> str:
+    """Return the key of a request in a cassette (the requests themselves are not recorded)."""
+    document: str = json.dumps(messages, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()[:32]
+
+def open_cassette(path: str, mode: str) -> IO[str]:
+    """Open a cassette file (compressed if its name ends with ".gz")."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def read_cassette(path: str) -> Iterator[tuple[str, int, dict[str, Any]]]:
+    """Yield the key, the occurrence and the record of each request of a cassette. The records without
+    occurrence (older cassettes) are numbered in the order of the file."""
+    counts: dict[str, int] = {}
+    with open_cassette(path, 'r') as f:
+        for line in f:
+            if line.strip() == '':
+                continue
+            record: dict[str, Any] = json.loads(line)
+            key: str = record['key']
+            occurrence: int = int(record.get('occurrence', counts.get(key, 0)))
+            counts[key] = max(counts.get(key, 0), occurrence + 1)
+            yield key, occurrence, record
+
+class RecordingRewriter(Rewriter):
+    """Rewriter that records the responses (and the latencies) of another rewriter in a cassette.
+
+    A cassette is a JSONL file: one record `{"key": ..., "occurrence": ..., "response": ..., "latency": ...}`
+    per request, where "key" identifies the request (see request_key) and "occurrence" counts the previous
+    identical requests that succeeded. A request that fails is not recorded, and does not use an occurrence:
+    the replay, which does not fail, would otherwise miss it. Records are appended to an existing cassette
+    (after the occurrences it already contains).
+    """
+
+    def __init__(self, rewriter: Rewriter, path: str) -> None:
+        self.rewriter: Rewriter = rewriter
+        self.path: str = path
+        self.occurrences: dict[str, int] = {}
+        if os.path.exists(path):
+            for key, occurrence, _ in read_cassette(path):
+                self.occurrences[key] = max(self.occurrences.get(key, 0), occurrence + 1)
+        self.file: IO[str] = open_cassette(path, 'a')
+        self.lock: threading.Lock = threading.Lock()
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        key: str = request_key(messages)
+        start: float = time.monotonic()
+        response: str = self.rewriter.call(messages, max_tokens)
+        latency: float = round(time.monotonic() - start, 3)
+        with self.lock:
+            occurrence: int = self.occurrences.get(key, 0)
+            self.occurrences[key] = occurrence + 1
+            record: dict[str, Any] = {'key': key, 'occurrence': occurrence, 'response': response, 'latency': latency}
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return response
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+
+
+class ReplayRewriter(Rewriter):
+    """Rewriter that serves the responses recorded in a cassette, without any network access.
+
+    The n-th identical request receives the response recorded for the n-th occurrence of this request, so
+    that the replay does not depend on the order in which the responses were recorded. A KeyError is raised
+    for a request that is not in the cassette, or that is sent more often than it was recorded. If "latency"
+    is True, each response is delayed by its recorded latency, otherwise responses are served at full speed.
+    """
+
+    def __init__(self, path: str, latency: bool = False) -> None:
+        self.path: str = path
+        self.latency: bool = latency
+        self.responses: dict[tuple[str, int], tuple[str, float]] = {}
+        self.recorded: dict[str, int] = {}
+        self.occurrences: dict[str, int] = {}
+        self.lock: threading.Lock = threading.Lock()
+        for key, occurrence, record in read_cassette(path):
+            self.responses[(key, occurrence)] = (record['response'], float(record.get('latency', 0.0)))
+            self.recorded[key] = self.recorded.get(key, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        key: str = request_key(messages)
+        with self.lock:
+            if key not in self.recorded:
+                raise KeyError("The request {} is not in the cassette {}.".format(key, self.path))
+            occurrence: int = self.occurrences.get(key, 0)
+            self.occurrences[key] = occurrence + 1
+            found: Optional[tuple[str, float]] = self.responses.get((key, occurrence))
+        if found is None:
+            raise KeyError("The request {} is sent more often than it was recorded in the cassette {} ({} times).".format(
+                key, self.path, self.recorded[key]))
+        response, latency = found
+        if self.latency:
+            time.sleep(latency)
+        return response
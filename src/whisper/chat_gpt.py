@@ -1,4 +1,4 @@
-from typing import Union, Optional, cast
+from typing import Any, Union, Optional, cast
 from openai import OpenAI
 from openai.types.chat import (
     ChatCompletionSystemMessageParam,
@@ -6,15 +6,52 @@ from openai.types.chat import (
     ChatCompletionAssistantMessageParam,
     ChatCompletion
 )
+from .rewriter import Rewriter
 
-class ChatGPT:
+# Schema of the responses (see "Structured Outputs" in the OpenAI documentation).
+# The result is a list of strings for the requests that contain several text sections.
+RESPONSE_FORMAT: dict[str, Any] = {
+    'type': 'json_schema',
+    'json_schema': {
+        'name': 'reformulation',
+        'strict': True,
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'result': {
+                    'anyOf': [
+                        {'type': 'string'},
+                        {'type': 'array', 'items': {'type': 'string'}}
+                    ]
+                }
+            },
+            'required': ['result'],
+            'additionalProperties': False
+        }
+    }
+}
 
-    def __init__(self, model: str, token: str, options: Optional[dict[str, str]]=None):
+# Prefixes of the reasoning models: their output budget also contains the reasoning tokens, which are not part
+# of the response.
+REASONING_MODELS: tuple[str, ...] = ('o1', 'o3', 'o4', 'gpt-5')
+
+# Number of tokens added to the output budget of a request for the reasoning of a reasoning model.
+REASONING_TOKENS: int = 4096
+
+def is_reasoning_model(model: str) -> bool:
+    return model.startswith(REASONING_MODELS)
+
+class ChatGPT(Rewriter):
+
+    def __init__(self, model: str, token: str, options: Optional[dict[str, str]]=None, structured_output: bool = True):
+        """If "structured_output" is True, the model is constrained to respond with a JSON document
+        that conforms to RESPONSE_FORMAT. Set it to False for the models that do not support it."""
         if options is None:
             options = {}
         self.model: str = model
         self.token: str = token
         self.options: dict[str, str] = options if options is not None else {}
+        self.structured_output: bool = structured_output
         self.client = OpenAI(api_key=token, **self.options)
 
     @staticmethod
@@ -33,10 +70,17 @@ class ChatGPT:
                 raise ValueError(f"Invalid role: {message['role']}")
         return result
 
-    def call(self, messages: list[dict[str, str]]) -> str:
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        kwargs: dict[str, Any] = {}
+        if self.structured_output:
+            kwargs['response_format'] = RESPONSE_FORMAT
+        if max_tokens is not None:
+            # "max_tokens" is rejected by the reasoning models ("max_completion_tokens" is accepted by all the models).
+            kwargs['max_completion_tokens'] = max_tokens + (REASONING_TOKENS if is_reasoning_model(self.model) else 0)
         response: ChatCompletion = self.client.chat.completions.create(
             model=self.model,
-            messages=ChatGPT.list_to_chat_messages(messages)
+            messages=ChatGPT.list_to_chat_messages(messages),
+            **kwargs
         )
         if response is None:
             raise RuntimeError("ChatGPT response is None")
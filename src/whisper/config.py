@@ -1,6 +1,47 @@
 from typing import Optional
-from dataclasses import dataclass
-import yaml
+from pathlib import Path
+from dataclasses import dataclass, field
+from .endpoint_pool import ROUTINGS
+
+# Strategies used to ask for another reformulation of a text section:
+#   - "prompt": a new system prompt ("system.next_requests") that contains the rejected reformulation.
+#   - "conversation": the rejected reformulation and the message "retry_request" are appended to the
+#                     first request, so that the beginning of the request never changes (this allows
+#                     the LLM providers to reuse their cache of the prompt prefix).
+RETRY_STRATEGIES: list[str] = ['prompt', 'conversation']
+
+DEFAULT_RETRY_REQUEST: str = ("Cette reformulation ne convient pas. Propose une autre reformulation, "
+                              "nouvelle et distincte des précédentes, en respectant les mêmes consignes.")
+
+# Default limits of the requests (see whisper.prompt_governor.PromptGovernor): number of tokens of the
+# reformulation embedded in the prompt of a retry, and ratio between the output tokens and the tokens of a section
+# (the output is not limited by default).
+DEFAULT_MAX_PREVIOUS_TOKENS: int = 128
+DEFAULT_OUTPUT_TOKEN_RATIO: Optional[float] = None
+
+# System prompt of the requests that contain several text sections (see Params.batch_size).
+DEFAULT_BATCH_REQUEST: str = """Tu es un écrivain professionnel. Tu dois reformuler chacun des textes du tableau JSON ci-après, en conservant fidèlement le sens.
+
+1. La sortie finale doit être STRICTEMENT un JSON valide, qui contient une reformulation par texte, dans le même ordre:
+
+{
+  "result": ["...", "..."]
+}
+
+2. Chaque reformulation doit se composer d’un seul paragraphe.
+
+3. Aucun commentaire, aucun texte explicatif, aucun Markdown, aucun texte supplémentaire.
+
+4. Même si un texte a déjà été reformulé, produire une reformulation nouvelle et distincte."""
+
+@dataclass
+class EndpointConfig:
+    """An OpenAI-compatible endpoint. By default, the endpoint uses the URL of OpenAI, the model of the
+    configuration and the token given on the command line."""
+    name: str
+    base_url: Optional[str] = None
+    token_file: Optional[str] = None
+    model: Optional[str] = None
 
 @dataclass
 class Config:
@@ -10,6 +51,34 @@ class Config:
     system: dict[str, str]
     assistant: Optional[str]
     user: str
+    structured_output: bool = True
+    retry_strategy: str = 'conversation'
+    retry_request: str = DEFAULT_RETRY_REQUEST
+    endpoints: list[EndpointConfig] = field(default_factory=list)
+    routing: str = 'least-outstanding'
+    max_previous_tokens: Optional[int] = DEFAULT_MAX_PREVIOUS_TOKENS
+    output_token_ratio: Optional[float] = DEFAULT_OUTPUT_TOKEN_RATIO
+
+def load_endpoints(conf: object, base_path: Path) -> list[EndpointConfig]:
+    """Validate the optional key 'endpoints': a list of dictionaries with the optional keys 'name', 'base_url',
+    'token_file' (relative to the configuration file) and 'model'."""
+    if not isinstance(conf, list):
+        raise ValueError("'endpoints' must be a list.")
+    endpoints: list[EndpointConfig] = []
+    for index, endpoint in enumerate(conf):
+        if not isinstance(endpoint, dict):
+            raise ValueError("'endpoints[{}]' must be a dictionary.".format(index))
+        for key in endpoint:
+            if key not in ['name', 'base_url', 'token_file', 'model']:
+                raise ValueError("'endpoints[{}]' contains an invalid key: '{}'.".format(index, key))
+            if not isinstance(endpoint[key], str):
+                raise ValueError("'endpoints[{}].{}' must be a string.".format(index, key))
+        token_file: Optional[str] = endpoint.get('token_file')
+        if token_file is not None:
+            token_file = str(base_path.joinpath(token_file))
+        endpoints.append(EndpointConfig(endpoint.get('name', endpoint.get('base_url', 'endpoint-{}'.format(index))),
+                                        endpoint.get('base_url'), token_file, endpoint.get('model')))
+    return endpoints
 
 def load_config(file_path: str) -> Config:
     """
@@ -22,6 +91,8 @@ def load_config(file_path: str) -> Config:
     :return: A Config object populated with data from the file.
     :raises ValueError: If the file content is not a dictionary or if required keys are missing.
     """
+    import yaml
+
     conf: dict
     with open(file_path) as stream:
         conf = yaml.safe_load(stream)
@@ -49,6 +120,22 @@ def load_config(file_path: str) -> Config:
         raise ValueError("'assistant' must be a string or null.")
     if not isinstance(conf['user'], str):
         raise ValueError("'user' must be a string (got '{}' instead).".format(conf['user']))
+    # Optional keys
+    if not isinstance(conf.get('structured_output', True), bool):
+        raise ValueError("'structured_output' must be a boolean.")
+    if conf.get('retry_strategy', 'conversation') not in RETRY_STRATEGIES:
+        raise ValueError("'retry_strategy' must be one of {}.".format(', '.join(RETRY_STRATEGIES)))
+    if not isinstance(conf.get('retry_request', DEFAULT_RETRY_REQUEST), str):
+        raise ValueError("'retry_request' must be a string.")
+    if conf.get('routing', 'least-outstanding') not in ROUTINGS:
+        raise ValueError("'routing' must be one of {}.".format(', '.join(ROUTINGS)))
+    max_previous_tokens: object = conf.get('max_previous_tokens', DEFAULT_MAX_PREVIOUS_TOKENS)
+    if max_previous_tokens is not None and (not isinstance(max_previous_tokens, int) or max_previous_tokens < 1):
+        raise ValueError("'max_previous_tokens' must be a positive integer or null.")
+    output_token_ratio: object = conf.get('output_token_ratio', DEFAULT_OUTPUT_TOKEN_RATIO)
+    if output_token_ratio is not None and (not isinstance(output_token_ratio, (int, float)) or output_token_ratio <= 0):
+        raise ValueError("'output_token_ratio' must be a positive number or null.")
+    endpoints: list[EndpointConfig] = load_endpoints(conf.get('endpoints', []), Path(file_path).parent)
 
     # Check second level keys
     expected_keys: list[str] = ['first_request', 'next_requests']
@@ -58,10 +145,16 @@ def load_config(file_path: str) -> Config:
         if not isinstance(conf['system'][key], str):
             raise ValueError("'system.{}' must be a string.".format(key))
         conf['system'][key] = conf['system'][key].strip()
+    if not isinstance(conf['system'].get('batch_request', DEFAULT_BATCH_REQUEST), str):
+        raise ValueError("'system.batch_request' must be a string.")
+    conf['system']['batch_request'] = conf['system'].get('batch_request', DEFAULT_BATCH_REQUEST).strip()
 
-    for key in ['model', 'assistant', 'user']:
-        if isinstance(conf[key], str):
+    for key in ['model', 'assistant', 'user', 'retry_request']:
+        if isinstance(conf.get(key), str):
             conf[key] = conf[key].strip()
 
     # Create the config object and return it
-    return Config(conf["model"], conf["temperature"], conf["top_p"], conf["system"], conf["assistant"], conf["user"])
+    return Config(conf["model"], conf["temperature"], conf["top_p"], conf["system"], conf["assistant"], conf["user"],
+                  conf.get("structured_output", True), conf.get("retry_strategy", "conversation"),
+                  conf.get("retry_request", DEFAULT_RETRY_REQUEST), endpoints, conf.get("routing", "least-outstanding"),
+                  max_previous_tokens, float(output_token_ratio) if output_token_ratio is not None else None)
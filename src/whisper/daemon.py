@@ -0,0 +1,72 @@
+import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Optional
+from .jobs import Job, JobManager, JOB_ARGUMENTS
+
+DEFAULT_HOST: str = '127.0.0.1'
+DEFAULT_PORT: int = 8765
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """JSON API of the daemon:
+      - POST /hide    {"key": ..., "needle": ..., "haystack": ..., "output": ...}
+      - POST /reveal  {"key": ..., "murmur": ..., "output": ...}
+      - GET  /jobs
+      - GET  /jobs/<id>
+      - GET  /stats
+    The paths given in the jobs are paths on the host of the daemon.
+    """
+
+    server: 'DaemonServer'
+
+    def send_json(self, status: int, content: Any) -> None:
+        body: bytes = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        manager: JobManager = self.server.manager
+        parts: list[str] = [p for p in self.path.split('/') if p != '']
+        if parts == ['jobs']:
+            self.send_json(200, [job.to_dict() for job in manager.list()])
+        elif len(parts) == 2 and parts[0] == 'jobs' and parts[1].isdigit():
+            job: Optional[Job] = manager.get(int(parts[1]))
+            if job is None:
+                self.send_json(404, {'error': 'Unknown job: {}'.format(parts[1])})
+            else:
+                self.send_json(200, job.to_dict())
+        elif parts == ['stats']:
+            self.send_json(200, manager.stats())
+        else:
+            self.send_json(404, {'error': 'Unknown path: {}'.format(self.path)})
+
+    def do_POST(self) -> None:
+        manager: JobManager = self.server.manager
+        parts: list[str] = [p for p in self.path.split('/') if p != '']
+        if len(parts) != 1 or parts[0] not in JOB_ARGUMENTS:
+            self.send_json(404, {'error': 'Unknown path: {}'.format(self.path)})
+            return
+        try:
+            length: int = int(self.headers.get('Content-Length', '0'))
+            arguments: Any = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(arguments, dict):
+                raise ValueError("The body of the request must be a JSON object.")
+            job: Job = manager.submit(parts[0], arguments)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(202, job.to_dict())
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class DaemonServer(ThreadingHTTPServer):
+
+    def __init__(self, manager: JobManager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, verbose: bool = False) -> None:
+        super().__init__((host, port), DaemonRequestHandler)
+        self.manager: JobManager = manager
+        self.verbose: bool = verbose
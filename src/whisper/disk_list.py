@@ -1,12 +1,26 @@
-from typing import Optional
+from typing import Any, Iterable, Iterator, Optional, Union
+from collections import OrderedDict
 from .rand_tools import RandTools
 import os
 import sqlite3
 from pathlib import Path
 
+# Default memory budget (in bytes): above it, the sections of a haystack are spilled to disk.
+MEMORY_BUDGET: int = 256 * 1024 * 1024
+
 
 class DiskList:
-    def __init__(self, db_path: Optional[str] = None):
+    """List stored in a SQLite database, for sequences that do not fit in memory.
+
+    The values (strings, integers or bytes) are written by groups: the appended and modified values are kept
+    in memory until "buffer_size" of them are pending (or until flush is called), and then written within a
+    single transaction. The values are read by pages of "page_size" consecutive values, and the last
+    "cache_pages" pages are kept in memory (LRU).
+
+    The list can be used as a context manager: the database is destroyed on exit.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, buffer_size: int = 1000, page_size: int = 256, cache_pages: int = 64):
         if db_path is None:
             db_path = 'disk-list-' + RandTools.random_string(10) + '.sqlite'
         self.db_file_path: Path = Path(db_path)
@@ -14,9 +28,24 @@ class DiskList:
         cursor: sqlite3.Cursor = self.db.cursor()
         try:
             cursor.execute("CREATE TABLE IF NOT EXISTS t (idx INTEGER PRIMARY KEY, value BLOB)")
+            self.stored: int = cursor.execute("SELECT COUNT(*) FROM t").fetchone()[0]
         finally:
             cursor.close()
         self.db.commit()
+        self.buffer_size: int = buffer_size
+        self.page_size: int = page_size
+        self.cache_pages: int = cache_pages
+        # Values appended after the last flush (their indexes start at "stored").
+        self.appended: list[Any] = []
+        # Stored values modified after the last flush (index -> value).
+        self.updated: dict[int, Any] = {}
+        self.pages: OrderedDict[int, list[Any]] = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.destroy()
 
     def destroy(self) -> None:
         if not self.db_file_path.exists():
@@ -28,13 +57,36 @@ class DiskList:
             print("Unable to remove file: " + str(self.db_file_path), flush=True)
         self.db = None
 
-    def append(self, value: str) -> None:
+    def flush(self) -> None:
+        """Write the pending values (group commit)."""
+        if len(self.appended) == 0 and len(self.updated) == 0:
+            return
         cursor: sqlite3.Cursor = self.db.cursor()
         try:
-            cursor.execute("INSERT INTO t(value) VALUES (?)", (value,))
+            cursor.executemany("INSERT INTO t(idx, value) VALUES (?, ?)",
+                               ((self.stored + i + 1, value) for i, value in enumerate(self.appended)))
+            cursor.executemany("UPDATE t SET value=? WHERE idx=?", ((value, index + 1) for index, value in self.updated.items()))
         finally:
             cursor.close()
         self.db.commit()
+        if len(self.appended) > 0 and self.stored % self.page_size != 0:
+            # The last page was partial: it is read again with the appended values.
+            self.pages.pop(self.stored // self.page_size, None)
+        self.stored += len(self.appended)
+        self.appended = []
+        self.updated = {}
+
+    def pending(self) -> int:
+        return len(self.appended) + len(self.updated)
+
+    def append(self, value: Any) -> None:
+        self.appended.append(value)
+        if self.pending() >= self.buffer_size:
+            self.flush()
+
+    def extend(self, values: Iterable[Any]) -> None:
+        for value in values:
+            self.append(value)
 
     def reset(self) -> None:
         cursor: sqlite3.Cursor = self.db.cursor()
@@ -42,31 +94,95 @@ class DiskList:
             cursor.execute("DELETE FROM t")
         finally:
             cursor.close()
+        self.db.commit()
+        self.stored = 0
+        self.appended = []
+        self.updated = {}
+        self.pages.clear()
 
-    def __getitem__(self, index: int) -> str:
+    def page(self, number: int) -> list[Any]:
+        """Return the stored values of a page (including the pending modifications)."""
+        values: Optional[list[Any]] = self.pages.get(number)
+        if values is not None:
+            self.pages.move_to_end(number)
+            return values
         cursor: sqlite3.Cursor = self.db.cursor()
         try:
-            row = cursor.execute("SELECT value FROM t WHERE idx=?", (index+1,)).fetchone()
-            if row is None:
-                raise IndexError(index)
+            start: int = number * self.page_size
+            values = [row[0] for row in cursor.execute("SELECT value FROM t WHERE idx>? AND idx<=? ORDER BY idx",
+                                                       (start, start + self.page_size))]
         finally:
             cursor.close()
-        return row[0]
+        # The cached pages stay valid after the next flush.
+        for i in range(len(values)):
+            if start + i in self.updated:
+                values[i] = self.updated[start + i]
+        self.pages[number] = values
+        if len(self.pages) > self.cache_pages:
+            self.pages.popitem(last=False)
+        return values
+
+    def get(self, index: int) -> Any:
+        if index >= self.stored:
+            return self.appended[index - self.stored]
+        if index in self.updated:
+            return self.updated[index]
+        return self.page(index // self.page_size)[index % self.page_size]
 
-    def __setitem__(self, index: int, value: str) -> None:
+    def normalize(self, index: int) -> int:
+        length: int = len(self)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError(index)
+        return index
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self.get(i) for i in range(*index.indices(len(self)))]
+        return self.get(self.normalize(index))
+
+    def __setitem__(self, index: int, value: Any) -> None:
+        index = self.normalize(index)
+        if index >= self.stored:
+            self.appended[index - self.stored] = value
+            return
+        self.updated[index] = value
+        values: Optional[list[Any]] = self.pages.get(index // self.page_size)
+        if values is not None:
+            values[index % self.page_size] = value
+        if self.pending() >= self.buffer_size:
+            self.flush()
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over the values, page by page (the pages are not cached)."""
+        self.flush()
         cursor: sqlite3.Cursor = self.db.cursor()
         try:
-            cur = cursor.execute("UPDATE t SET value=? WHERE idx=?", (value, index+1))
-            if cur.rowcount == 0:
-                raise IndexError(index)
+            cursor.execute("SELECT value FROM t ORDER BY idx")
+            while True:
+                rows: list[Any] = cursor.fetchmany(self.page_size)
+                if len(rows) == 0:
+                    break
+                for row in rows:
+                    yield row[0]
         finally:
             cursor.close()
-        self.db.commit()
 
     def __len__(self) -> int:
-        cursor: sqlite3.Cursor = self.db.cursor()
-        try:
-            count: int = cursor.execute("SELECT COUNT(*) FROM t").fetchone()[0]
-        finally:
-            cursor.close()
-        return count
+        return self.stored + len(self.appended)
+
+def spill(values: Iterable[Any], size: int, memory_budget: Optional[int] = MEMORY_BUDGET) -> Union[list[Any], DiskList]:
+    """Return the values as a list, or as a DiskList if their size (in bytes) exceeds the memory budget (no budget:
+    always a list). The caller must destroy the DiskList."""
+    if memory_budget is None or size <= memory_budget:
+        return values if isinstance(values, list) else list(values)
+    values_list: DiskList = DiskList()
+    values_list.extend(values)
+    values_list.flush()
+    return values_list
+
+def release(values: Union[list[Any], DiskList]) -> None:
+    """Destroy the values returned by spill, if they have been spilled to disk."""
+    if isinstance(values, DiskList):
+        values.destroy()
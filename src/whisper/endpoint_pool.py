@@ -0,0 +1,136 @@
+import time
+import threading
+from typing import Any, Optional
+from .rewriter import Rewriter
+
+# Routing strategies:
+#   - "least-outstanding": the endpoint with the fewest requests in progress (ties are broken by latency).
+#   - "latency": the endpoint with the lowest expected completion time ((requests in progress + 1) x latency).
+ROUTINGS: list[str] = ['least-outstanding', 'latency']
+
+# Weight of the last observed latency in the moving average of the latencies of an endpoint.
+LATENCY_ALPHA: float = 0.2
+
+# HTTP statuses caused by the configuration of an endpoint (its API key, its model or its base URL), rather than
+# by the request: 401 (unauthorized), 403 (forbidden) and 404 (not found), and 429 (rate limit).
+ENDPOINT_STATUSES: list[int] = [401, 403, 404, 429]
+
+def is_endpoint_error(error: Exception) -> bool:
+    """Return True if the error is due to the endpoint (transport error, rate limit, server error, or invalid key,
+    model or base URL) rather than to the request: another endpoint may succeed. The errors of the OpenAI client
+    are recognized by their HTTP status code, or by their class (connection errors and timeouts)."""
+    status: Optional[int] = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status in ENDPOINT_STATUSES or status >= 500
+    return isinstance(error, OSError) or any(c.__name__ == 'APIConnectionError' for c in type(error).__mro__)
+
+class Endpoint:
+    """An endpoint of the pool, and its usage."""
+
+    def __init__(self, name: str, rewriter: Rewriter) -> None:
+        self.name: str = name
+        self.rewriter: Rewriter = rewriter
+        self.outstanding: int = 0
+        self.requests: int = 0
+        self.errors: int = 0
+        self.failures: int = 0
+        self.latency: Optional[float] = None
+        self.ejected_until: float = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def cost(self, routing: str) -> tuple[float, float]:
+        latency: float = self.latency if self.latency is not None else 0.0
+        if routing == 'latency':
+            return (self.outstanding + 1) * latency, self.outstanding
+        return self.outstanding, latency
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        return {'name': self.name, 'requests': self.requests, 'errors': self.errors, 'outstanding': self.outstanding,
+                'latency': round(self.latency, 6) if self.latency is not None else None, 'healthy': self.healthy(now)}
+
+
+class EndpointPool(Rewriter):
+    """Rewriter that spreads the requests across several rewriters (typically, several OpenAI-compatible
+    endpoints, or several API keys), so that the throughput is not limited by the quota of a single account.
+
+    An endpoint that fails (see is_endpoint_error) is ejected from the pool for "cooldown" seconds (doubled after each
+    consecutive failure, up to "max_cooldown" seconds), and the request is sent to another endpoint. If all the
+    endpoints are ejected, the one that has been ejected for the longest time is used. A RuntimeError is raised
+    once all the endpoints have failed. The other errors (for example, an invalid request) are raised at once,
+    without ejecting the endpoint, since all the endpoints would fail.
+    """
+
+    def __init__(self, endpoints: list[Endpoint], routing: str = 'least-outstanding', cooldown: float = 30.0,
+                 max_cooldown: float = 300.0) -> None:
+        if len(endpoints) == 0:
+            raise ValueError("The pool must contain at least one endpoint.")
+        if routing not in ROUTINGS:
+            raise ValueError("Invalid routing: {} (must be one of {}).".format(routing, ', '.join(ROUTINGS)))
+        self.endpoints: list[Endpoint] = endpoints
+        self.routing: str = routing
+        self.cooldown: float = cooldown
+        self.max_cooldown: float = max_cooldown
+        self.lock: threading.Lock = threading.Lock()
+
+    def select(self, excluded: list[Endpoint]) -> Optional[Endpoint]:
+        """Select an endpoint (that is not excluded), and count the request as outstanding."""
+        with self.lock:
+            now: float = time.monotonic()
+            candidates: list[Endpoint] = [e for e in self.endpoints if e not in excluded]
+            if len(candidates) == 0:
+                return None
+            healthy: list[Endpoint] = [e for e in candidates if e.healthy(now)]
+            endpoint: Endpoint
+            if len(healthy) > 0:
+                endpoint = min(healthy, key=lambda e: e.cost(self.routing))
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: Optional[float], eject: bool = True) -> None:
+        """Record the outcome of a request (the latency is None if the request failed, and the endpoint is
+        ejected if "eject" is True)."""
+        with self.lock:
+            endpoint.outstanding -= 1
+            if latency is None and not eject:
+                endpoint.errors += 1
+            elif latency is None:
+                endpoint.errors += 1
+                endpoint.failures += 1
+                delay: float = min(self.max_cooldown, self.cooldown * 2 ** (endpoint.failures - 1))
+                endpoint.ejected_until = time.monotonic() + delay
+            else:
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+                endpoint.latency = latency if endpoint.latency is None else \
+                    LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * endpoint.latency
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        tried: list[Endpoint] = []
+        error: Optional[Exception] = None
+        while True:
+            endpoint: Optional[Endpoint] = self.select(tried)
+            if endpoint is None:
+                raise RuntimeError("All the endpoints failed (last error: {}).".format(str(error)))
+            tried.append(endpoint)
+            start: float = time.monotonic()
+            try:
+                response: str = endpoint.rewriter.call(messages, max_tokens)
+            except Exception as e:
+                if not is_endpoint_error(e):
+                    self.release(endpoint, None, eject=False)
+                    raise
+                self.release(endpoint, None)
+                error = e
+                continue
+            self.release(endpoint, time.monotonic() - start)
+            return response
+
+    def stats(self) -> list[dict[str, Any]]:
+        with self.lock:
+            now: float = time.monotonic()
+            return [endpoint.to_dict(now) for endpoint in self.endpoints]
@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Optional, Tuple
+from .hasher import Hasher
+
+# Default maximum number of hashes kept in the cache.
+CACHE_SIZE: int = 65536
+
+class HashPool:
+    """Pool of workers that compute hashes (see Hasher.hash), with a cache of the computed hashes.
+
+    Computing a hash is expensive (Argon2, 64 MiB). Since the hash of a text does not depend on the
+    secret key, the hashes are cached by (algorithm, text), and can be shared between jobs.
+
+    The workers are threads: the Argon2 implementation releases the GIL while hashing.
+
+    The hash function can be replaced (for example, by a cheap function in the unit tests): it must return
+    KEY_LENGTH bytes, like Hasher.hash.
+    """
+
+    def __init__(self, workers: Optional[int] = None, cache_size: int = CACHE_SIZE,
+                 hash_function: Callable[[str, str], bytes] = Hasher.hash) -> None:
+        self.hash_function: Callable[[str, str], bytes] = hash_function
+        self.workers: int = workers if workers is not None else (os.cpu_count() or 1)
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hash')
+        self.cache_size: int = cache_size
+        self.cache: OrderedDict[Tuple[str, str], bytes] = OrderedDict()
+        self.pending: dict[Tuple[str, str], Future] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def lookup(self, algo: str, text: str) -> Optional[bytes]:
+        with self.lock:
+            return self.cache.get((algo, text))
+
+    def compute(self, algo: str, text: str) -> bytes:
+        try:
+            h: bytes = self.hash_function(algo, text)
+            with self.lock:
+                self.cache[(algo, text)] = h
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            return h
+        finally:
+            with self.lock:
+                self.pending.pop((algo, text), None)
+
+    def submit(self, algo: str, text: str) -> Future:
+        """Compute a hash using the workers. Return a Future that holds the hash.
+        A hash that is being computed for another caller is not computed twice."""
+        key: Tuple[str, str] = (algo, text)
+        with self.lock:
+            h: Optional[bytes] = self.cache.get(key)
+            if h is not None:
+                self.hits += 1
+                self.cache.move_to_end(key)
+                future: Future = Future()
+                future.set_result(h)
+                return future
+            future = self.pending.get(key)
+            if future is not None:
+                self.hits += 1
+                return future
+            self.misses += 1
+            future = self.executor.submit(self.compute, algo, text)
+            self.pending[key] = future
+            return future
+
+    def hash(self, algo: str, text: str) -> bytes:
+        return self.submit(algo, text).result()
+
+    def hash_many(self, items: list[Tuple[str, str]]) -> list[bytes]:
+        """Compute the hashes of a list of (algorithm, text) in parallel."""
+        futures: list[Future] = [self.submit(algo, text) for algo, text in items]
+        return [f.result() for f in futures]
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {'workers': self.workers, 'cached': len(self.cache), 'hits': self.hits, 'misses': self.misses}
@@ -1,8 +1,12 @@
-from typing import Tuple, Optional
+from typing import Tuple, Optional, TYPE_CHECKING
+from functools import lru_cache
 import hashlib
-from .params import KEY_LENGTH
+from .params import KEY_LENGTH, FORMAT_CHAINED, FORMATS
 from argon2.low_level import hash_secret_raw, Type
 
+if TYPE_CHECKING:
+    from .hash_pool import HashPool
+
 ALGORITHMS: list[str] = ['md5', 'sha224', 'sha256', 'sha384', 'sha512', 'sha512_224', 'sha512_256', 'sha3_224', 'sha3_256', 'sha3_384', 'sha3_512']
 
 def xor_bytes(a: bytes, b: bytes) -> bytes:
@@ -10,28 +14,65 @@ def xor_bytes(a: bytes, b: bytes) -> bytes:
         raise ValueError("The 2 lists of bytes must have the same length ({} vs {}).".format(len(a), len(b)))
     return bytes(x ^ y for x, y in zip(a, b))
 
+@lru_cache(maxsize=32)
+def derive_key(secret_key: str) -> bytes:
+    """Generate 32 bytes long key from the password.
+    Please note that we are not using a salt here.
+
+    The keys are cached, so that long-running processes do not derive the same key twice.
+    """
+    return hash_secret_raw(
+        secret=secret_key.encode(),
+        salt=bytes(1024),
+        time_cost=3,
+        memory_cost=65536,
+        parallelism=1,
+        hash_len=KEY_LENGTH,
+        type=Type.ID
+    )
+
 class Hasher:
 
-    def __init__(self, secret_key: str, verbose: bool = False):
-        # Generate 32 bytes long key from the password.
-        # Please note that we are not using a salt here.
-        self.key: bytes = hash_secret_raw(
-            secret=secret_key.encode(),
-            salt=bytes(1024),
-            time_cost=3,
-            memory_cost=65536,
-            parallelism=1,
-            hash_len=KEY_LENGTH,
-            type=Type.ID
-        )
+    def __init__(self, secret_key: Optional[str], verbose: bool = False, hash_pool: Optional['HashPool'] = None, format_version: int = FORMAT_CHAINED):
+        """If a pool is given, the hashes are computed (and cached) by the pool.
+
+        The format version defines how the algorithm of each section is selected:
+          - FORMAT_CHAINED: the algorithms are given by the bytes of the key. Every KEY_LENGTH sections,
+                            the key is XORed with the hash of the last section.
+          - FORMAT_COUNTER: the algorithm of a section is derived from the key and from the position of
+                            the section (see algorithm_at). There is no dependency between sections.
+          - FORMAT_MATRIX: same algorithms as FORMAT_COUNTER.
+
+        Without a secret key, the hasher can only compute hashes (the algorithms must be given by the caller).
+        """
+        if format_version not in FORMATS:
+            raise ValueError("Invalid format version: {} (must be one of {}).".format(format_version, FORMATS))
+        self.key: Optional[bytes] = derive_key(secret_key) if secret_key is not None else None
         self.hash_algorithm_index: int = 0
+        self.position: int = 0
         self.verbose: bool = verbose
+        self.hash_pool: Optional['HashPool'] = hash_pool
+        self.format_version: int = format_version
 
     def update(self, last_hash: bytes) -> None:
         self.key = xor_bytes(self.key, last_hash)
         self.hash_algorithm_index = 0
 
+    def algorithm_at(self, position: int) -> str:
+        """Return the algorithm of the section at the given position (not available for FORMAT_CHAINED)."""
+        if self.key is None:
+            raise ValueError("The algorithms cannot be computed without a secret key.")
+        if self.format_version == FORMAT_CHAINED:
+            raise ValueError("The algorithm of a given position cannot be computed for the format {}.".format(FORMAT_CHAINED))
+        d: bytes = hashlib.blake2b(position.to_bytes(8, 'big'), key=self.key, digest_size=8).digest()
+        return ALGORITHMS[int.from_bytes(d, 'big') % len(ALGORITHMS)]
+
     def next_hash_algorithm(self, last_hash: Optional[bytes]) -> Optional[str]:
+        if self.format_version != FORMAT_CHAINED:
+            self.position += 1
+            return self.algorithm_at(self.position - 1)
+        if self.key is None:
+            raise ValueError("The algorithms cannot be computed without a secret key.")
         if self.hash_algorithm_index >= KEY_LENGTH:
             if last_hash is None:
                 raise ValueError("Unexpected last hash value (lash hash should not be None).")
@@ -54,10 +95,20 @@ class Hasher:
         )
         return key
 
+    @staticmethod
+    def parity(h: bytes) -> int:
+        return sum(c for c in h) % 2
+
+    def hash_many(self, items: list[Tuple[str, str]]) -> list[bytes]:
+        """Compute the hashes of a list of (algorithm, text), in parallel if a pool is available."""
+        if self.hash_pool is not None:
+            return self.hash_pool.hash_many(items)
+        return [self.hash(algo, data) for algo, data in items]
+
     def get_parity(self, algo: str, data: str) -> Tuple[bytes, int]:
-        h = self.hash(algo, data)
-        p: int = sum(c for c in h) % 2
+        h = self.hash_pool.hash(algo, data) if self.hash_pool is not None else self.hash(algo, data)
+        p: int = self.parity(h)
         if self.verbose:
-            print('%-10s: %s %s -> %d' %(algo, h.hex(), self.key.hex(), p))
+            print('%-10s: %s %s -> %d' %(algo, h.hex(), self.key.hex() if self.key is not None else '-', p))
         return h, p
 
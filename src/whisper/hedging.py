@@ -0,0 +1,150 @@
+import time
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, Tuple
+from .rewriter import Rewriter
+
+# Maximum number of sections for which unused responses are kept.
+MAX_SPARE_KEYS: int = 64
+
+class LatencyTracker:
+    """Keep track of the most recently observed latencies (in seconds)."""
+
+    def __init__(self, window: int = 100) -> None:
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.lock: threading.Lock = threading.Lock()
+
+    def add(self, latency: float) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+
+    def __len__(self) -> int:
+        return len(self.latencies)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile (0 <= p <= 100) of the observed latencies, or None if no latency has been observed."""
+        with self.lock:
+            values: list[float] = sorted(self.latencies)
+        if len(values) == 0:
+            return None
+        rank: float = (len(values) - 1) * p / 100.0
+        low: int = int(rank)
+        high: int = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class HedgedRewriter(Rewriter):
+    """Rewriter that hedges the requests sent to another rewriter.
+
+    If a request has not been answered within the given percentile of the recently observed
+    latencies, a duplicate request is sent. The first response that arrives is returned.
+
+    The other request is cancelled if it has not started yet. Otherwise, its response is kept
+    (as a "spare") and returned by the next call for the same text, without calling the backend:
+    since it is a new reformulation of the text, it is a new parity trial for the caller.
+
+    Hedging only starts once "min_samples" latencies have been observed.
+
+    The requests (and their duplicates) are sent by a pool of "max_workers" threads: it must be sized
+    for the number of concurrent callers, otherwise the requests are queued behind each other (see
+    Whisperer, which allows two requests per concurrent caller). The pool is released by close.
+    """
+
+    def __init__(self, rewriter: Rewriter, percentile: float = 95.0, window: int = 100, min_samples: int = 10, max_workers: int = 4) -> None:
+        if not 0 < percentile <= 100:
+            raise ValueError("Invalid percentile: {} (must be in ]0, 100]).".format(percentile))
+        self.rewriter: Rewriter = rewriter
+        self.percentile: float = percentile
+        self.min_samples: int = min_samples
+        self.latencies: LatencyTracker = LatencyTracker(window)
+        self.max_workers: int = max_workers
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers)
+        self.spares: OrderedDict[str, list[str]] = OrderedDict()
+        self.lock: threading.Lock = threading.Lock()
+        self.call_count: int = 0
+        self.hedge_count: int = 0
+        self.spare_count: int = 0
+
+    def close(self) -> None:
+        """Cancel the requests that have not started, and wait for the running ones."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def spare_key(messages: list[dict[str, str]]) -> str:
+        """Responses are reusable for any request about the same text (the first user message)."""
+        for message in messages:
+            if message['role'] == 'user':
+                return message['content']
+        return ''
+
+    def hedge_delay(self) -> Optional[float]:
+        if len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    def timed_call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        start: float = time.monotonic()
+        response: str = self.rewriter.call(messages, max_tokens)
+        self.latencies.add(time.monotonic() - start)
+        return response
+
+    def add_spare(self, key: str, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self.lock:
+            self.spares.setdefault(key, []).append(future.result())
+            self.spares.move_to_end(key)
+            while len(self.spares) > MAX_SPARE_KEYS:
+                self.spares.popitem(last=False)
+
+    def pop_spare(self, key: str) -> Optional[str]:
+        with self.lock:
+            spares: Optional[list[str]] = self.spares.get(key)
+            if not spares:
+                return None
+            self.spare_count += 1
+            return spares.pop(0)
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        key: str = self.spare_key(messages)
+        spare: Optional[str] = self.pop_spare(key)
+        if spare is not None:
+            return spare
+
+        with self.lock:
+            self.call_count += 1
+        futures: list[Future] = [self.executor.submit(self.timed_call, messages, max_tokens)]
+        delay: Optional[float] = self.hedge_delay()
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if len(done) == 0:
+                with self.lock:
+                    self.hedge_count += 1
+                futures.append(self.executor.submit(self.timed_call, messages, max_tokens))
+
+        winner, error = self.first_success(futures)
+        for future in futures:
+            if future is winner:
+                continue
+            if not future.cancel():
+                future.add_done_callback(lambda f: self.add_spare(key, f))
+        if winner is None:
+            raise error
+        return winner.result()
+
+    @staticmethod
+    def first_success(futures: list[Future]) -> Tuple[Optional[Future], Optional[BaseException]]:
+        """Wait for the first future that succeeds. If all futures fail, return the first error."""
+        pending: set[Future] = set(futures)
+        error: Optional[BaseException] = None
+        while len(pending) > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in futures:
+                if future not in done:
+                    continue
+                if future.exception() is None:
+                    return future, None
+                if error is None:
+                    error = future.exception()
+        return None, error
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from .stegano_db import SteganoDb
+from .text_file_tool import read_sections_from_file
+
+SQLITE_HEADER: bytes = b'SQLite format 3\x00'
+
+@dataclass
+class PreviousSection:
+    """A section of a previous murmur. The original text is None if it is unknown."""
+    original_text: Optional[str]
+    text: str
+
+def load_previous(path: str) -> dict[int, PreviousSection]:
+    """Load the sections of a previous hide, indexed by position. The file is either the database of the
+    previous hide (see SteganoDb, kept in the debug directory), or the previous murmur. A murmur must have
+    been generated from the same haystack, since the original texts of its sections are unknown."""
+    file_path: Path = Path(path)
+    if not file_path.is_file():
+        raise FileNotFoundError("File not found: {}".format(path))
+    with open(file_path, 'rb') as f:
+        is_db: bool = f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    if is_db:
+        # Note: leaving a "with" block would destroy the database.
+        db: SteganoDb = SteganoDb(path, init=False)
+        try:
+            return {section.position: PreviousSection(section.original_text, section.traduction)
+                    for section in db.get_sections() if section.traduction is not None}
+        finally:
+            db.close()
+    return {position: PreviousSection(None, text) for position, text in enumerate(read_sections_from_file(path))}
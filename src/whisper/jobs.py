@@ -0,0 +1,177 @@
+import time
+import threading
+import dataclasses
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Any, Optional, Tuple, TYPE_CHECKING
+from .config import Config
+from .hash_pool import HashPool
+from .rewriter import Rewriter, create_rewriter
+from .endpoint_pool import EndpointPool
+from .revealer import Revealer
+from .whisperer import Whisperer, Params
+from .params import FORMATS
+
+if TYPE_CHECKING:
+    from .hedging import HedgedRewriter
+
+# Mandatory arguments for each type of job.
+JOB_ARGUMENTS: dict[str, list[str]] = {
+    'hide': ['key', 'needle', 'haystack', 'output'],
+    'reveal': ['key', 'murmur', 'output'],
+}
+
+# Optional arguments, valid for all types of jobs.
+#  - format: the format of the murmur (see whisper.params.FORMATS). Default: the format given by the parameters.
+OPTIONAL_ARGUMENTS: list[str] = ['format']
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    arguments: dict[str, str]
+    status: str = 'queued'
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    duplicates: int = 0
+
+    def duration(self) -> Optional[float]:
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def to_dict(self) -> dict[str, Any]:
+        # Never report the secret key.
+        arguments: dict[str, str] = {k: v for k, v in self.arguments.items() if k != 'key'}
+        return {'id': self.id, 'kind': self.kind, 'arguments': arguments, 'status': self.status, 'error': self.error,
+                'submitted': self.submitted, 'started': self.started, 'finished': self.finished, 'calls': self.calls,
+                'input_tokens': self.input_tokens, 'output_tokens': self.output_tokens, 'duplicates': self.duplicates}
+
+
+class JobManager:
+    """Execute hide and reveal jobs, using resources that stay warm between jobs:
+      - a single rewriter (and thus a single HTTP client for the LLM), optionally rate limited,
+      - a pool of hashing workers and its cache of hashes,
+      - the cache of derived keys (see whisper.hasher.derive_key).
+
+    Jobs are queued and executed concurrently by "max_jobs" threads.
+    """
+
+    def __init__(self, params: Params, config: Config, max_jobs: int = 4, hash_workers: Optional[int] = None,
+                 rewriter: Optional[Rewriter] = None, requests_per_minute: Optional[float] = None) -> None:
+        if rewriter is None:
+            rewriter = create_rewriter(params.backend, config.model, params.token, config.structured_output,
+                                       config.endpoints, config.routing)
+        if requests_per_minute is not None:
+            from .rate_limiter import RateLimiter, RateLimitedRewriter
+            rewriter = RateLimitedRewriter(rewriter, RateLimiter(requests_per_minute / 60.0))
+        self.hedged: Optional['HedgedRewriter'] = None
+        if params.hedge_percentile is not None:
+            from .hedging import HedgedRewriter
+            # As in Whisperer: a request and its duplicate for each concurrent caller, in each concurrent job.
+            self.hedged = HedgedRewriter(rewriter, params.hedge_percentile,
+                                         max_workers=2 * max_jobs * (params.concurrency + params.boundary_concurrency))
+            rewriter = self.hedged
+        self.rewriter: Rewriter = rewriter
+        # The debug directory cannot be shared by concurrent jobs, and the hedging is already set up.
+        self.params: Params = dataclasses.replace(params, debug_path=None, hedge_percentile=None)
+        self.config: Config = config
+        self.hash_pool: HashPool = HashPool(hash_workers)
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='job')
+        self.jobs: dict[int, Job] = {}
+        self.futures: dict[int, Future] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        if self.hedged is not None:
+            self.hedged.close()
+        self.hash_pool.close()
+
+    def submit(self, kind: str, arguments: dict[str, Any], after: Optional[list[Job]] = None) -> Job:
+        """Queue a job. If jobs are given in "after" (jobs already submitted to this manager), the job only
+        starts once they are finished, and fails if one of them has failed."""
+        if kind not in JOB_ARGUMENTS:
+            raise ValueError("Invalid job type: {} (must be one of {}).".format(kind, ', '.join(JOB_ARGUMENTS)))
+        for name in JOB_ARGUMENTS[kind]:
+            if not isinstance(arguments.get(name), str):
+                raise ValueError("The argument '{}' is missing (or is not a string).".format(name))
+        job_arguments: dict[str, str] = {name: arguments[name] for name in JOB_ARGUMENTS[kind]}
+        format_version: Any = arguments.get('format', self.params.format_version)
+        if str(format_version) not in [str(f) for f in FORMATS]:
+            raise ValueError("Invalid format: {} (must be one of {}).".format(format_version, FORMATS))
+        job_arguments['format'] = str(format_version)
+        with self.lock:
+            job: Job = Job(len(self.jobs) + 1, kind, job_arguments)
+            self.jobs[job.id] = job
+            prerequisites: list[Tuple[Job, Future]] = [(j, self.futures[j.id]) for j in (after or [])]
+            self.futures[job.id] = self.executor.submit(self.run, job, prerequisites)
+        return job
+
+    def wait(self) -> None:
+        """Wait until all the submitted jobs are finished."""
+        with self.lock:
+            futures: list[Future] = list(self.futures.values())
+        wait(futures)
+
+    def run(self, job: Job, prerequisites: list[Tuple[Job, Future]]) -> None:
+        # The prerequisites were submitted before this job: they are already running, or ahead in the queue.
+        wait([future for _, future in prerequisites])
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            failed: list[str] = [str(j.id) for j, _ in prerequisites if j.status != 'done']
+            if len(failed) > 0:
+                raise RuntimeError("The job cannot start: the job(s) {} failed.".format(', '.join(failed)))
+            if job.kind == 'hide':
+                job.calls, job.input_tokens, job.output_tokens, job.duplicates = self.hide(job.arguments)
+            else:
+                self.reveal(job.arguments)
+            job.status = 'done'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+
+    def hide(self, arguments: dict[str, str]) -> Tuple[int, int, int, int]:
+        """Execute a hide job, and return the number of calls to the rewriter, the numbers of input and output tokens
+        and the number of duplicate reformulations."""
+        params: Params = dataclasses.replace(self.params, format_version=int(arguments['format']))
+        w: Whisperer = Whisperer(params, self.config, rewriter=self.rewriter, hash_pool=self.hash_pool)
+        try:
+            w.hide(arguments['needle'], arguments['haystack'], arguments['key'], arguments['output'])
+            return w.call_count, w.governor.input_tokens, w.governor.output_tokens, w.duplicate_count
+        finally:
+            w.close()
+            w.db.destroy()
+
+    def reveal(self, arguments: dict[str, str]) -> None:
+        revealer: Revealer = Revealer(arguments['murmur'], arguments['output'], arguments['key'], hash_pool=self.hash_pool,
+                                      format_version=int(arguments['format']), group_size=self.params.group_size)
+        revealer.reveal()
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        with self.lock:
+            return list(self.jobs.values())
+
+    def stats(self) -> dict[str, Any]:
+        counts: dict[str, int] = {}
+        for job in self.list():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        stats: dict[str, Any] = {'jobs': counts, 'hash_pool': self.hash_pool.stats()}
+        endpoints: Optional[Rewriter] = self.rewriter
+        while endpoints is not None and not isinstance(endpoints, EndpointPool):
+            endpoints = getattr(endpoints, 'rewriter', None)
+        if endpoints is not None:
+            stats['endpoints'] = endpoints.stats()
+        return stats
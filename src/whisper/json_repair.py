@@ -0,0 +1,117 @@
+import re
+import json
+from typing import Any, Optional
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)\s*(?:```|$)", re.DOTALL)
+RESULT_RE = re.compile(r'"result"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+
+def strip_fences(response: str) -> str:
+    """Remove the Markdown code fences around a response, if any."""
+    m: Optional[re.Match] = FENCE_RE.search(response)
+    return m.group(1) if m is not None else response
+
+def find_object(text: str) -> Optional[str]:
+    """Return the first balanced JSON object found in the text (or None)."""
+    start: int = text.find('{')
+    while start >= 0:
+        depth: int = 0
+        in_string: bool = False
+        escaped: bool = False
+        for i in range(start, len(text)):
+            c: str = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == '\\':
+                    escaped = True
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+        start = text.find('{', start + 1)
+    return None
+
+def valid_result(value: Any) -> Optional[str]:
+    """Return the value if it is a valid reformulation (a non-blank string on a single line, since each
+    section of a murmur is a line), or None."""
+    if isinstance(value, str) and value.strip() != '' and '\n' not in value and '\r' not in value:
+        return value
+    return None
+
+def get_result(document: Any) -> Optional[str]:
+    if isinstance(document, dict):
+        return valid_result(document.get('result'))
+    return None
+
+def extract_result(response: str) -> str:
+    """Extract the value of the key "result" from the response of an LLM.
+
+    The response is expected to be `{"result": "..."}`, but the following deviations are tolerated:
+      - the JSON document is wrapped in Markdown fences, or surrounded by text,
+      - the JSON document is broken after the value of "result" (ex: truncated, missing brace).
+
+    A truncated value of "result" is rejected, since it is not a complete reformulation, and so is
+    a blank or multi-line value (see valid_result).
+
+    :raises ValueError: If no result can be extracted from the response.
+    """
+    try:
+        result: Optional[str] = get_result(json.loads(response))
+        if result is not None:
+            return result
+    except ValueError:
+        pass
+
+    text: str = strip_fences(response)
+    candidate: Optional[str] = find_object(text)
+    if candidate is not None:
+        try:
+            result = get_result(json.loads(candidate))
+            if result is not None:
+                return result
+        except ValueError:
+            pass
+
+    # Broken document: take the (complete) string value of "result".
+    m: Optional[re.Match] = RESULT_RE.search(text)
+    if m is not None:
+        try:
+            result = valid_result(json.loads('"' + m.group(1) + '"'))
+        except ValueError:
+            result = None
+        if result is not None:
+            return result
+
+    raise ValueError("Unable to extract a result from the response: {}".format(response))
+
+def extract_result_list(response: str) -> list[Optional[str]]:
+    """Extract the list of results from the response of an LLM to a batch request.
+
+    The response is expected to be `{"result": ["...", "..."]}` (a bare JSON array is also accepted).
+    The JSON document may be wrapped in Markdown fences, or surrounded by text. The items that are
+    not valid reformulations (see valid_result) are returned as None.
+
+    :raises ValueError: If no list of results can be extracted from the response.
+    """
+    documents: list[str] = [response]
+    text: str = strip_fences(response)
+    candidate: Optional[str] = find_object(text)
+    if candidate is not None:
+        documents.append(candidate)
+    documents.append(text)
+    for document in documents:
+        try:
+            value: Any = json.loads(document)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            value = value.get('result')
+        if isinstance(value, list):
+            return [valid_result(item) for item in value]
+    raise ValueError("Unable to extract a list of results from the response: {}".format(response))
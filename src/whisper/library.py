@@ -0,0 +1,140 @@
+import hashlib
+import sqlite3
+from array import array
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional, Tuple, TYPE_CHECKING
+from .hasher import Hasher, ALGORITHMS
+from .params import KEY_LENGTH, FORMAT_CHAINED, MATRIX_GROUP_SIZE
+from .planner import Plan, make_plan, chained_parities, carriers_needed
+from .text_file_tool import read_sections_from_file
+from .types import Bit
+
+if TYPE_CHECKING:
+    from .hash_pool import HashPool
+
+@dataclass
+class IndexedHaystack:
+    """Parities of the original sections of a haystack, for all the ALGORITHMS.
+    The bit "i" of masks[position] is the parity of the section with ALGORITHMS[i]. The hashes of the last
+    section of each key block (for all the ALGORITHMS) are kept, since they define the algorithms of the
+    next block (FORMAT_CHAINED)."""
+    path: str
+    digest: str
+    masks: list[int]
+    lengths: list[int]
+    boundaries: dict[int, list[bytes]]
+
+    def parity(self, position: int, algorithm: str) -> int:
+        return (self.masks[position] >> ALGORITHMS.index(algorithm)) & 1
+
+    def plan(self, bits: list[Bit], secret_key: str, format_version: int, group_size: int = MATRIX_GROUP_SIZE,
+             algorithms: Optional[list[str]] = None) -> Plan:
+        """Compute the cost of hiding the bits in this haystack, without hashing any section (see whisper.planner.plan).
+        For the formats FORMAT_COUNTER and FORMAT_MATRIX, the algorithms of the carriers must be given."""
+        count: int = min(carriers_needed(len(bits), format_version, group_size), len(self.masks))
+        if format_version == FORMAT_CHAINED:
+            parities: list[int] = chained_parities(
+                secret_key, bits, count,
+                lambda start, algos: [self.parity(start + i, algorithm) for i, algorithm in enumerate(algos)],
+                lambda position, algorithm: self.boundaries[position][ALGORITHMS.index(algorithm)])
+        else:
+            parities = [self.parity(i, algorithm) for i, algorithm in enumerate(algorithms[:count])]
+        return make_plan(bits, parities, self.lengths, format_version, group_size)
+
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class HaystackLibrary:
+    """Index of a library of haystacks (SQLite).
+
+    The hashes of the original sections do not depend on the key: only the algorithm of each section does.
+    Thus, the parities of all the sections of all the haystacks are computed once, for all the ALGORITHMS
+    (see index). The haystack that needs the fewest rewrites for a given key and message is then found
+    without hashing any section (see rank).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.db: sqlite3.Connection = sqlite3.connect(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS haystacks ("path" TEXT PRIMARY KEY,
+                                                                 "digest" TEXT NOT NULL,
+                                                                 "masks" BLOB NOT NULL,
+                                                                 "lengths" BLOB NOT NULL,
+                                                                 "boundaries" BLOB NOT NULL)""")
+        self.db.commit()
+        self.haystacks: Optional[list[IndexedHaystack]] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def index(self, haystack: str, hash_pool: Optional['HashPool'] = None, force: bool = False) -> bool:
+        """Index a haystack (11 hashes per section). The haystacks that did not change since their last indexing
+        are skipped, unless "force" is set. Return True if the haystack has been indexed."""
+        path: str = str(Path(haystack).resolve())
+        digest: str = file_digest(path)
+        row: Optional[Tuple[str]] = self.db.execute('SELECT "digest" FROM haystacks WHERE "path"=?', (path,)).fetchone()
+        if row is not None and row[0] == digest and not force:
+            return False
+
+        texts: list[str] = list(read_sections_from_file(path))
+        hasher: Hasher = Hasher(None, hash_pool=hash_pool)
+        hashes: list[bytes] = hasher.hash_many([(algorithm, text) for text in texts for algorithm in ALGORITHMS])
+        masks: array = array('H')
+        boundaries: bytearray = bytearray()
+        for position in range(len(texts)):
+            section: list[bytes] = hashes[position * len(ALGORITHMS):(position + 1) * len(ALGORITHMS)]
+            masks.append(sum(Hasher.parity(h) << i for i, h in enumerate(section)))
+            if position % KEY_LENGTH == KEY_LENGTH - 1:
+                boundaries += b''.join(section)
+        lengths: array = array('I', [len(text) for text in texts])
+        self.db.execute('INSERT OR REPLACE INTO haystacks ("path", "digest", "masks", "lengths", "boundaries") VALUES (?, ?, ?, ?, ?)',
+                        (path, digest, masks.tobytes(), lengths.tobytes(), bytes(boundaries)))
+        self.db.commit()
+        self.haystacks = None
+        return True
+
+    def remove(self, haystack: str) -> None:
+        self.db.execute('DELETE FROM haystacks WHERE "path"=?', (str(Path(haystack).resolve()),))
+        self.db.commit()
+        self.haystacks = None
+
+    def load(self) -> list[IndexedHaystack]:
+        """Return the indexed haystacks (loaded once)."""
+        if self.haystacks is None:
+            self.haystacks = []
+            for path, digest, masks, lengths, boundaries in self.db.execute(
+                    'SELECT "path", "digest", "masks", "lengths", "boundaries" FROM haystacks ORDER BY "path"'):
+                size: int = len(ALGORITHMS) * KEY_LENGTH
+                self.haystacks.append(IndexedHaystack(
+                    path, digest, array('H', masks).tolist(), array('I', lengths).tolist(),
+                    {(i + 1) * KEY_LENGTH - 1: [boundaries[i * size + j * KEY_LENGTH:i * size + (j + 1) * KEY_LENGTH] for j in range(len(ALGORITHMS))]
+                     for i in range(len(boundaries) // size)}))
+        return self.haystacks
+
+    def get(self, haystack: str) -> Optional[IndexedHaystack]:
+        """Return the index of a haystack, or None if it is not indexed (or if it changed since its indexing)."""
+        path: str = str(Path(haystack).resolve())
+        for h in self.load():
+            if h.path == path:
+                return h if h.digest == file_digest(path) else None
+        return None
+
+    def rank(self, bits: list[Bit], secret_key: str, format_version: int, group_size: int = MATRIX_GROUP_SIZE) -> list[Tuple[str, Plan]]:
+        """Return the (path, plan) of all the haystacks, from the cheapest to the most expensive: the haystacks that are
+        too short come last, then the haystacks are sorted by number of rewrites, then by number of tokens."""
+        haystacks: list[IndexedHaystack] = self.load()
+        algorithms: Optional[list[str]] = None
+        if format_version != FORMAT_CHAINED:
+            # The algorithms of the formats FORMAT_COUNTER and FORMAT_MATRIX are the same for all the haystacks.
+            hasher: Hasher = Hasher(secret_key, format_version=format_version)
+            count: int = max([len(h.masks) for h in haystacks], default=0)
+            algorithms = [hasher.algorithm_at(i) for i in range(min(carriers_needed(len(bits), format_version, group_size), count))]
+        plans: list[Tuple[str, Plan]] = [(h.path, h.plan(bits, secret_key, format_version, group_size, algorithms)) for h in haystacks]
+        return sorted(plans, key=lambda item: (not item[1].feasible(), item[1].rewrites, item[1].tokens))
@@ -1,15 +1,58 @@
-import tiktoken
 import json
+import math
+from functools import lru_cache
+from typing import Any, Optional
 
-def calculate_tokens(prompt: str, model: str = "gpt-4") -> int:
-    """Calculate the number of tokens used by a prompt."""
-    encoding = tiktoken.encoding_for_model(model)
-    p: list[dict[str, str]] = json.loads(prompt)
-    total = 0
-    for m in p:
+# Rough number of characters per token, used when no tokenizer is available for the model.
+CHARS_PER_TOKEN: float = 4.0
+
+# Encoding used for the models unknown to tiktoken.
+DEFAULT_ENCODING: str = 'o200k_base'
+
+@lru_cache(maxsize=32)
+def get_encoding(model: str) -> Optional[Any]:
+    """Return the tiktoken encoding of the model (created once per model), or None if tiktoken is not installed
+    or if the encoding cannot be loaded (tiktoken downloads it on first use, which fails offline)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Return the number of tokens of a text (estimated from its length if no encoding is available, see get_encoding)."""
+    encoding: Optional[Any] = get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+def count_message_tokens(messages: list[dict[str, str]], model: str = "gpt-4") -> int:
+    """Return the number of tokens of a list of messages (OpenAI ChatCompletion format)."""
+    total: int = 0
+    for m in messages:
         total += 4
-        total += len(encoding.encode(m["content"]))
-        total += len(encoding.encode(m["role"]))
+        total += count_tokens(m["content"], model)
+        total += count_tokens(m["role"], model)
     total += 2
     return total
 
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4") -> str:
+    """Return the beginning of the text, limited to "max_tokens" tokens."""
+    encoding: Optional[Any] = get_encoding(model)
+    if encoding is None:
+        return text[:int(max_tokens * CHARS_PER_TOKEN)]
+    tokens: list[int] = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def calculate_tokens(prompt: str, model: str = "gpt-4") -> int:
+    """Calculate the number of tokens used by a prompt."""
+    return count_message_tokens(json.loads(prompt), model)
@@ -0,0 +1,376 @@
+import re
+import json
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from .rewriter import Rewriter, NoReformulationError
+
+# Groups of interchangeable words or expressions. Within a group, every element can replace
+# any other element without breaking the grammar of the sentence (same gender, same number).
+SYNONYMS: dict[str, list[Tuple[str, ...]]] = {
+    'fr': [
+        # Connectives.
+        ('cependant', 'toutefois', 'néanmoins', 'pourtant'),
+        ('ainsi', 'de cette manière', 'de cette façon'),
+        ('donc', 'par conséquent', 'dès lors'),
+        ('de plus', 'en outre', 'par ailleurs', 'qui plus est'),
+        ('en effet', 'de fait', 'effectivement'),
+        ('enfin', 'finalement', 'en définitive'),
+        ('alors que', 'tandis que'),
+        ('parce que', 'car', 'puisque'),
+        ('afin de', 'dans le but de'),
+        ('grâce à', 'à la faveur de'),
+        ('à travers', 'au travers de'),
+        ('en revanche', 'à l’inverse', 'au contraire'),
+        ('peu à peu', 'progressivement', 'graduellement'),
+        ('dès le début', 'dès l’abord', 'd’emblée'),
+        # Adverbs.
+        ('très', 'extrêmement'),
+        ('souvent', 'fréquemment'),
+        ('immédiatement', 'aussitôt', 'sur-le-champ'),
+        ('rapidement', 'vite', 'promptement'),
+        ('profondément', 'intensément'),
+        ('constamment', 'sans cesse', 'continuellement'),
+        ('également', 'aussi', 'de même'),
+        ('surtout', 'notamment', 'en particulier'),
+        ('seulement', 'uniquement', 'simplement'),
+        ('totalement', 'entièrement', 'complètement'),
+        ('clairement', 'nettement', 'manifestement'),
+        ('particulièrement', 'spécialement'),
+        ('potentiellement', 'éventuellement'),
+        # Verbs (same tense and person).
+        ('montre', 'révèle', 'dévoile'),
+        ('montrent', 'révèlent', 'dévoilent'),
+        ('semble', 'paraît'),
+        ('semblent', 'paraissent'),
+        ('permet', 'autorise'),
+        ('contribue', 'participe'),
+        ('souligne', 'met en évidence', 'met en lumière'),
+        ('soulignent', 'mettent en évidence', 'mettent en lumière'),
+        ('installe', 'instaure', 'établit'),
+        ('renforce', 'accentue', 'intensifie'),
+        ('renforcent', 'accentuent', 'intensifient'),
+        ('découvre', 'comprend', 'constate'),
+        ('devient', 'se transforme en'),
+        ('impose', 'dicte'),
+        ('façonne', 'modèle'),
+        ('façonnent', 'modèlent'),
+        ('décrit', 'dépeint'),
+        ('existe', 'subsiste'),
+        ('comprendre', 'saisir'),
+        ('dépend', 'relève'),
+        # Adjectives (invariable in gender, or same form).
+        ('pesante', 'lourde', 'écrasante'),
+        ('pesant', 'lourd', 'écrasant'),
+        ('inquiétant', 'troublant', 'alarmant'),
+        ('inquiétante', 'troublante', 'alarmante'),
+        ('immense', 'énorme', 'considérable'),
+        ('rapide', 'véloce'),
+        ('important', 'essentiel', 'majeur'),
+        ('importante', 'essentielle', 'majeure'),
+        ('difficile', 'pénible'),
+        ('étrange', 'bizarre', 'insolite'),
+        ('familier', 'habituel', 'coutumier'),
+        ('permanent', 'constant', 'continuel'),
+        ('permanente', 'constante', 'continuelle'),
+        ('simple', 'élémentaire'),
+        ('nécessaire', 'indispensable'),
+        ('fragile', 'vulnérable'),
+        ('invisible', 'imperceptible'),
+        # Nouns (same gender).
+        ('impression', 'sensation'),
+        ('atmosphère', 'ambiance'),
+        ('malaise', 'trouble'),
+        ('récit', 'texte'),
+        ('détail', 'élément'),
+        ('but', 'objectif'),
+        ('peur', 'crainte'),
+        ('façon', 'manière'),
+        ('sentiment', 'ressenti'),
+        ('outil', 'instrument'),
+        ('outils', 'instruments'),
+        ('citoyens', 'habitants'),
+        ('angoisse', 'anxiété'),
+        ('pression', 'contrainte'),
+        ('méfiance', 'défiance'),
+        ('banalité', 'trivialité'),
+        ('roman', 'livre'),
+    ],
+    'en': [
+        # Connectives.
+        ('however', 'nevertheless', 'nonetheless'),
+        ('therefore', 'thus', 'consequently', 'hence'),
+        ('moreover', 'furthermore', 'in addition', 'besides'),
+        ('in order to', 'so as to'),
+        ('although', 'even though', 'though'),
+        ('finally', 'eventually', 'ultimately'),
+        ('in fact', 'indeed', 'actually'),
+        ('for example', 'for instance'),
+        ('on the other hand', 'conversely', 'by contrast'),
+        ('gradually', 'progressively', 'little by little'),
+        # Adverbs.
+        ('very', 'highly', 'extremely'),
+        ('often', 'frequently'),
+        ('immediately', 'instantly', 'at once'),
+        ('quickly', 'rapidly', 'swiftly'),
+        ('deeply', 'profoundly'),
+        ('constantly', 'continually', 'endlessly'),
+        ('especially', 'particularly', 'notably'),
+        ('only', 'solely', 'merely'),
+        ('completely', 'entirely', 'totally', 'fully'),
+        ('clearly', 'plainly', 'evidently'),
+        # Verbs.
+        ('shows', 'reveals', 'demonstrates'),
+        ('show', 'reveal', 'demonstrate'),
+        ('seems', 'appears'),
+        ('seem', 'appear'),
+        ('allows', 'enables'),
+        ('becomes', 'grows'),
+        ('contributes', 'adds'),
+        ('highlights', 'underlines', 'emphasizes'),
+        ('highlight', 'underline', 'emphasize'),
+        ('creates', 'establishes', 'builds'),
+        ('reinforces', 'strengthens', 'intensifies'),
+        ('discovers', 'realizes', 'finds out'),
+        ('begins', 'starts'),
+        # Adjectives.
+        ('heavy', 'oppressive', 'weighty'),
+        ('disturbing', 'troubling', 'unsettling'),
+        ('huge', 'enormous', 'immense', 'vast'),
+        ('important', 'essential', 'significant'),
+        ('difficult', 'challenging'),
+        ('strange', 'odd', 'peculiar'),
+        ('familiar', 'usual', 'customary'),
+        ('permanent', 'constant', 'perpetual'),
+        ('daily', 'everyday'),
+        ('simple', 'basic', 'plain'),
+        ('big', 'large'),
+        # Nouns.
+        ('impression', 'feeling'),
+        ('atmosphere', 'mood', 'ambience'),
+        ('unease', 'discomfort'),
+        ('world', 'universe'),
+        ('story', 'narrative', 'tale'),
+        ('detail', 'element'),
+        ('way', 'manner'),
+        ('goal', 'aim', 'objective'),
+        ('fear', 'dread'),
+    ],
+}
+
+# Words used to guess the language of a text.
+STOP_WORDS: dict[str, set[str]] = {
+    'fr': {'le', 'la', 'les', 'de', 'des', 'du', 'un', 'une', 'et', 'est', 'dans', 'que', 'qui', 'pour', 'par', 'sur', 'au', 'aux', 'il', 'elle', 'ne', 'pas'},
+    'en': {'the', 'a', 'an', 'of', 'and', 'is', 'in', 'that', 'which', 'for', 'by', 'on', 'to', 'it', 'he', 'she', 'not', 'with', 'are', 'was'},
+}
+
+# Connectives that can be inserted at the beginning of a sentence, and the (lower case) words
+# that can start such a sentence. Only used when the number of possible variants of a text is too low.
+OPENERS: dict[str, list[str]] = {
+    'fr': ['De plus', 'Par ailleurs', 'En outre', 'Ainsi', 'En effet', 'Dès lors'],
+    'en': ['Moreover', 'In addition', 'Furthermore', 'Indeed', 'Thus', 'Likewise'],
+}
+OPENED_WORDS: dict[str, set[str]] = {
+    'fr': {'le', 'la', 'les', 'l', 'un', 'une', 'des', 'ce', 'cet', 'cette', 'ces', 'son', 'sa', 'ses', 'leur', 'leurs', 'il', 'ils', 'elle', 'elles', 'on', 'chaque', 'tout', 'toute', 'tous', 'toutes'},
+    'en': {'the', 'a', 'an', 'this', 'that', 'these', 'those', 'his', 'her', 'its', 'their', 'he', 'she', 'it', 'they', 'we', 'each', 'every'},
+}
+
+# Typographic variants, only used when the number of possible variants of a text is too low.
+TYPOGRAPHY: dict[str, str] = {'’': "'", "'": '’'}
+
+# Minimal number of possible variants of a text below which typographic (and then spacing) variants are used.
+MIN_VARIANTS: int = 64
+
+# Number of texts whose variants already returned are remembered (LRU).
+MAX_TEXTS: int = 1024
+
+# Number of random draws for a variant not returned yet, before the remaining variants are enumerated.
+MAX_DRAWS: int = 32
+
+# Coordinating conjunctions used to swap the order of two words ("A et B" -> "B et A").
+CONJUNCTIONS: dict[str, str] = {'fr': 'et', 'en': 'and'}
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class LocalRewriter(Rewriter):
+    """CPU-only rewriter that produces reformulations without calling any LLM.
+
+    The reformulations are obtained by applying a random subset of rule-based substitutions
+    on the original text:
+      - synonym and connective substitutions (see SYNONYMS),
+      - inversion of the order of two words linked by a coordinating conjunction,
+      - insertion of connectives at the beginning of sentences and typographic variants
+        (only if the text does not offer enough variants).
+
+    French and English texts are supported. Each call returns a new (random) variant of the
+    text given in the first user message, so that each call is a new parity trial: the variants already
+    returned for a text are not returned again. A NoReformulationError is raised when no new variant exists.
+    """
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.random: random.Random = random.Random(seed)
+        self.lock: threading.Lock = threading.Lock()
+        self.returned: OrderedDict[str, set[str]] = OrderedDict()
+        self.patterns: dict[str, re.Pattern] = {}
+        self.groups: dict[str, dict[str, Tuple[str, ...]]] = {}
+        for language, groups in SYNONYMS.items():
+            index: dict[str, Tuple[str, ...]] = {}
+            for group in groups:
+                for expression in group:
+                    index[expression] = group
+            expressions: list[str] = sorted(index.keys(), key=len, reverse=True)
+            self.groups[language] = index
+            self.patterns[language] = re.compile(r"(?<!\w)(" + "|".join(re.escape(e) for e in expressions) + r")(?!\w)", re.IGNORECASE)
+        self.swap_patterns: dict[str, re.Pattern] = {
+            language: re.compile(r"(?<!\w)([^\W\d_]{4,}) " + conjunction + r" ([^\W\d_]{4,})(?!\w)")
+            for language, conjunction in CONJUNCTIONS.items()
+        }
+
+    @staticmethod
+    def detect_language(text: str) -> str:
+        counts: dict[str, int] = {language: 0 for language in STOP_WORDS}
+        for word in WORD_RE.findall(text.lower()):
+            for language, words in STOP_WORDS.items():
+                if word in words:
+                    counts[language] += 1
+        return max(counts, key=lambda language: counts[language])
+
+    @staticmethod
+    def match_case(model: str, word: str) -> str:
+        if model.isupper() and len(model) > 1:
+            return word.upper()
+        if model[:1].isupper():
+            return word[:1].upper() + word[1:]
+        return word
+
+    def find_substitutions(self, text: str, language: str) -> list[Tuple[int, int, list[str]]]:
+        """Return the list of possible substitutions: (start, end, candidate replacements)."""
+        substitutions: list[Tuple[int, int, list[str]]] = []
+        for m in self.patterns[language].finditer(text):
+            found: str = m.group(1)
+            group: Tuple[str, ...] = self.groups[language][found.lower()]
+            candidates: list[str] = [self.match_case(found, e) for e in group if e != found.lower()]
+            substitutions.append((m.start(1), m.end(1), candidates))
+        taken: list[Tuple[int, int]] = [(s, e) for s, e, _ in substitutions]
+        for m in self.swap_patterns[language].finditer(text):
+            start, end = m.start(), m.end()
+            if any(s < end and start < e for s, e in taken):
+                continue
+            first, second = m.group(1), m.group(2)
+            if first.lower() in STOP_WORDS[language] or second.lower() in STOP_WORDS[language]:
+                continue
+            if first[:1].isupper() and second[:1].islower():
+                # The first word starts the sentence.
+                first, second = first[:1].lower() + first[1:], second[:1].upper() + second[1:]
+            swapped: str = '{} {} {}'.format(second, CONJUNCTIONS[language], first)
+            substitutions.append((start, end, [swapped]))
+        if self.count_variants(substitutions) < MIN_VARIANTS:
+            for m in re.finditer(r"(?:^|(?<=[.!?] ))(\w+)", text):
+                if m.group(1).lower() in OPENED_WORDS[language] and not any(s <= m.start() < e for s, e, _ in substitutions):
+                    word: str = m.group(1)
+                    substitutions.append((m.start(), m.end(), ['{}, {}'.format(opener, word[:1].lower() + word[1:]) for opener in OPENERS[language]]))
+        if self.count_variants(substitutions) < MIN_VARIANTS:
+            for m in re.finditer('|'.join(TYPOGRAPHY.keys()), text):
+                if not any(s <= m.start() < e for s, e, _ in substitutions):
+                    substitutions.append((m.start(), m.end(), [TYPOGRAPHY[m.group(0)]]))
+        if self.count_variants(substitutions) < MIN_VARIANTS:
+            # Last resort (short texts): a non-breaking space between two words.
+            for m in re.finditer(r"(?<=\w) (?=\w)", text):
+                if not any(s <= m.start() < e for s, e, _ in substitutions):
+                    substitutions.append((m.start(), m.end(), ['\u00a0']))
+        substitutions.sort(key=lambda s: s[0])
+        return substitutions
+
+    @staticmethod
+    def count_variants(substitutions: list[Tuple[int, int, list[str]]]) -> int:
+        count: int = 1
+        for _, _, candidates in substitutions:
+            count *= len(candidates) + 1
+        return count - 1
+
+    @staticmethod
+    def apply(text: str, substitutions: list[Tuple[int, int, list[str]]], choices: list[Optional[str]]) -> str:
+        """Apply the chosen replacements (None: the substitution is not applied)."""
+        result: list[str] = []
+        cursor: int = 0
+        for (start, end, _), choice in zip(substitutions, choices):
+            if choice is None:
+                continue
+            result.append(text[cursor:start])
+            result.append(choice)
+            cursor = end
+        result.append(text[cursor:])
+        return ''.join(result)
+
+    def draw(self, text: str, substitutions: list[Tuple[int, int, list[str]]]) -> str:
+        """Return a random variant: a random (non-empty) subset of the substitutions is applied."""
+        selected: list[bool] = [self.random.random() < 0.5 for _ in substitutions]
+        if not any(selected):
+            selected[self.random.randrange(len(substitutions))] = True
+        return self.apply(text, substitutions, [self.random.choice(candidates) if apply else None
+                                                for (_, _, candidates), apply in zip(substitutions, selected)])
+
+    def enumerate_variants(self, text: str, substitutions: list[Tuple[int, int, list[str]]], returned: set[str]) -> Optional[str]:
+        """Return a variant that has not been returned yet (the variants of a text with few substitutions are
+        enumerated), or None."""
+        choices: list[Optional[str]] = [None] * len(substitutions)
+
+        def search(i: int) -> Optional[str]:
+            if i == len(substitutions):
+                variant: str = self.apply(text, substitutions, choices)
+                return variant if variant not in returned else None
+            for choice in [None] + substitutions[i][2]:
+                choices[i] = choice
+                found: Optional[str] = search(i + 1)
+                if found is not None:
+                    return found
+            return None
+
+        return search(0)
+
+    def rewrite(self, text: str) -> str:
+        language: str = self.detect_language(text)
+        substitutions: list[Tuple[int, int, list[str]]] = self.find_substitutions(text, language)
+        if len(substitutions) == 0:
+            raise NoReformulationError("No local reformulation is possible for the text: {}".format(text))
+
+        with self.lock:
+            returned: set[str] = self.returned.setdefault(text, {text})
+            self.returned.move_to_end(text)
+            while len(self.returned) > MAX_TEXTS:
+                self.returned.popitem(last=False)
+            variant: Optional[str] = None
+            for _ in range(MAX_DRAWS):
+                variant = self.draw(text, substitutions)
+                if variant not in returned:
+                    break
+            else:
+                variant = self.enumerate_variants(text, substitutions, returned) if self.count_variants(substitutions) <= MIN_VARIANTS else None
+            if variant is None:
+                raise NoReformulationError("All the local reformulations of the text have been returned: {}".format(text))
+            returned.add(variant)
+            return variant
+
+    def rewrite_or_keep(self, text: str) -> str:
+        """Same as rewrite, but the text is returned unchanged if it has no new variant (in a batch response, the
+        Whisperer then treats it as a duplicate, and rewrites the section alone)."""
+        try:
+            return self.rewrite(text)
+        except NoReformulationError:
+            return text
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        texts: list[str] = [m['content'] for m in messages if m['role'] == 'user']
+        if len(texts) == 0:
+            raise ValueError("The request does not contain any user message.")
+        # A batch request contains a JSON array of texts.
+        if texts[0].startswith('['):
+            try:
+                batch: Any = json.loads(texts[0])
+            except ValueError:
+                batch = None
+            if isinstance(batch, list) and all(isinstance(text, str) for text in batch):
+                return json.dumps({'result': [self.rewrite_or_keep(text) for text in batch]}, ensure_ascii=False)
+        return json.dumps({'result': self.rewrite(texts[0])}, ensure_ascii=False)
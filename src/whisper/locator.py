@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, cast, TYPE_CHECKING
+from .hasher import Hasher
+from .params import FORMAT_CHAINED, FORMAT_MATRIX, MATRIX_GROUP_SIZE
+from .planner import carriers_needed
+from .revealer import Revealer
+from .conversion import Conversion
+from .types import Bit
+from . import matrix
+
+if TYPE_CHECKING:
+    from .hash_pool import HashPool
+    from .library import IndexedHaystack
+
+# Number of bits of the header of a murmur (the length of the message, in bytes).
+HEADER_BITS: int = 16
+
+@dataclass
+class Location:
+    """A murmur found in a document: the position of its first section, and the number of sections that
+    carry the message."""
+    offset: int
+    sections: int
+    message: bytes
+
+def header_algorithms(secret_key: str, format_version: int, group_size: int = MATRIX_GROUP_SIZE) -> list[str]:
+    """Return the algorithms of the sections that carry the header of a murmur. They only depend on the
+    position of the section in the murmur (the first block of FORMAT_CHAINED does not depend on any hash)."""
+    hasher: Hasher = Hasher(secret_key, format_version=format_version)
+    if format_version == FORMAT_CHAINED:
+        return [hasher.next_hash_algorithm(None) for _ in range(HEADER_BITS)]
+    return [hasher.algorithm_at(i) for i in range(carriers_needed(HEADER_BITS, format_version, group_size))]
+
+class MurmurLocator:
+    """Find the murmurs hidden with a key in a larger document (for example, a murmur quoted between other
+    paragraphs), without a full reveal for each possible start of the murmur.
+
+    Since the algorithms of the header only depend on the position of a section within the murmur, the
+    header of every candidate start ("offset") is decoded from the hashes of the (algorithm, section) pairs of
+    the document. There are at most len(ALGORITHMS) such pairs per section, whatever the number of offsets:
+    they are hashed at once by the pool (whose cache does not depend on the key), or read from the index of the
+    document if it is in a library (see whisper.library.HaystackLibrary.get).
+
+    The offsets whose header is implausible are pruned: an empty message, a message longer than the rest of
+    the document, or a length different from the expected one (if given). The remaining offsets are revealed
+    concurrently, and only the ASCII messages (see whisper.message.Message.bytes_to_vector) are kept.
+    """
+
+    def __init__(self, secret_key: str, format_version: int = FORMAT_CHAINED, group_size: int = MATRIX_GROUP_SIZE,
+                 hash_pool: Optional['HashPool'] = None, expected_length: Optional[int] = None, workers: Optional[int] = None,
+                 verbose: bool = False) -> None:
+        self.secret_key: str = secret_key
+        self.format_version: int = format_version
+        self.group_size: int = group_size
+        self.hash_pool: Optional['HashPool'] = hash_pool
+        self.expected_length: Optional[int] = expected_length
+        self.workers: Optional[int] = workers
+        self.verbose: bool = verbose
+        self.algorithms: list[str] = header_algorithms(secret_key, format_version, group_size)
+
+    def header_bits(self, parities: list[int]) -> list[Bit]:
+        if self.format_version == FORMAT_MATRIX:
+            size: int = self.group_size
+            return [b for g in range(0, len(parities), size) for b in matrix.decode(parities[g:g + size])][:HEADER_BITS]
+        return [cast(Bit, p) for p in parities]
+
+    def parities(self, texts: list[str], indexed: Optional['IndexedHaystack'] = None) -> dict[Tuple[str, int], int]:
+        """Return the parities of the (algorithm, position) pairs of the headers of all the offsets."""
+        count: int = len(self.algorithms)
+        pairs: list[Tuple[str, int]] = sorted({(algorithm, offset + j) for offset in range(len(texts) - count + 1)
+                                               for j, algorithm in enumerate(self.algorithms)})
+        if indexed is not None:
+            return {(algorithm, position): indexed.parity(position, algorithm) for algorithm, position in pairs}
+        hasher: Hasher = Hasher(None, hash_pool=self.hash_pool)
+        hashes: list[bytes] = hasher.hash_many([(algorithm, texts[position]) for algorithm, position in pairs])
+        return {pair: Hasher.parity(h) for pair, h in zip(pairs, hashes)}
+
+    def candidates(self, texts: list[str], indexed: Optional['IndexedHaystack'] = None) -> list[Tuple[int, int]]:
+        """Return the (offset, length of the message) whose header is plausible."""
+        if indexed is not None and len(indexed.masks) != len(texts):
+            raise ValueError('The index of "{}" does not match the document ({} sections instead of {}).'.format(
+                indexed.path, len(indexed.masks), len(texts)))
+        table: dict[Tuple[str, int], int] = self.parities(texts, indexed)
+        found: list[Tuple[int, int]] = []
+        for offset in range(len(texts) - len(self.algorithms) + 1):
+            bits: list[Bit] = self.header_bits([table[(algorithm, offset + j)] for j, algorithm in enumerate(self.algorithms)])
+            length: int = Conversion.bit_list_to_int16(bits)
+            if length == 0 or (self.expected_length is not None and length != self.expected_length):
+                continue
+            if offset + carriers_needed(HEADER_BITS + length * 8, self.format_version, self.group_size) > len(texts):
+                continue
+            found.append((offset, length))
+        if self.verbose:
+            print('{} plausible offsets out of {}'.format(len(found), max(len(texts) - len(self.algorithms) + 1, 0)))
+        return found
+
+    def reveal_at(self, texts: list[str], offset: int, length: int) -> Optional[bytes]:
+        """Return the message of the murmur starting at the offset, or None if it is not plausible."""
+        end: int = offset + carriers_needed(HEADER_BITS + length * 8, self.format_version, self.group_size)
+        revealer: Revealer = Revealer(None, None, self.secret_key, hash_pool=self.hash_pool, format_version=self.format_version,
+                                      group_size=self.group_size, memory_budget=None)
+        message: bytes = revealer.reveal_message(texts[offset:end])
+        return message if len(message) == length and message.isascii() else None
+
+    def locate(self, texts: list[str], indexed: Optional['IndexedHaystack'] = None) -> list[Location]:
+        """Return the murmurs found in the sections of the document, by offset."""
+        owned_pool: bool = self.hash_pool is None
+        if owned_pool:
+            from .hash_pool import HashPool
+            self.hash_pool = HashPool(self.workers)
+        try:
+            candidates: list[Tuple[int, int]] = self.candidates(texts, indexed)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                messages: list[Optional[bytes]] = list(executor.map(lambda c: self.reveal_at(texts, c[0], c[1]), candidates))
+        finally:
+            if owned_pool:
+                self.hash_pool.close()
+                self.hash_pool = None
+        return [Location(offset, carriers_needed(HEADER_BITS + length * 8, self.format_version, self.group_size), message)
+                for (offset, length), message in zip(candidates, messages) if message is not None]
@@ -0,0 +1,69 @@
+import re
+import mmap
+from array import array
+from typing import Generator, Optional, Tuple
+
+# A section is a maximal run of characters other than the line breaks (see text_file_tool.read_sections_from_file,
+# which reads the file with the universal newlines: "\r", "\n" and "\r\n" are all line breaks). The haystack is
+# encoded in UTF-8 (or ASCII), so that a line break is always a single byte.
+SECTION = re.compile(rb'[^\r\n]+')
+
+ENCODING: str = 'utf-8'
+
+class MappedHaystack:
+    """A haystack file mapped in memory, and the byte offsets of its sections.
+
+    The sections are the same as read_sections_from_file, but only their offsets are held in memory (16 bytes
+    per section): the text of a section is decoded from the mapped file when it is needed, and the unchanged
+    sections of a murmur are copied from the mapped file without being decoded (see view).
+
+    The file must not be modified while it is mapped.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.file = open(path, 'rb')
+        self.size: int = self.file.seek(0, 2)
+        # An empty file cannot be mapped.
+        self.map: Optional[mmap.mmap] = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size > 0 else None
+        self.starts: array = array('q')
+        self.ends: array = array('q')
+        if self.map is not None:
+            for match in SECTION.finditer(self.map):
+                self.starts.append(match.start())
+                self.ends.append(match.end())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, position: int) -> str:
+        """Return the text of a section."""
+        return self.text(self.starts[position], self.ends[position])
+
+    def __iter__(self) -> Generator[str, None, None]:
+        for position in range(len(self.starts)):
+            yield self[position]
+
+    def offsets(self) -> Generator[Tuple[int, int, int], None, None]:
+        """Yield the position, the start and the end (in bytes) of each section."""
+        for position in range(len(self.starts)):
+            yield position, self.starts[position], self.ends[position]
+
+    def text(self, start: int, end: int) -> str:
+        return self.map[start:end].decode(ENCODING)
+
+    def view(self, start: int, end: int) -> memoryview:
+        """Return the bytes of the haystack between the offsets, without copying them."""
+        return memoryview(self.map)[start:end]
@@ -0,0 +1,62 @@
+from typing import Optional, cast
+from .params import MATRIX_BITS, MATRIX_GROUP_SIZE
+from .types import Bit
+
+# Matrix embedding (syndrome coding) using the Hamming code [2^k - 1, 2^k - 1 - k] with k = MATRIX_BITS.
+#
+# The parities of a group of sections are multiplied by the parity check matrix of the code: the column
+# of the section "i" is the binary representation of (i mod COLUMNS) + 1. The resulting syndrome is the
+# value of the MATRIX_BITS bits carried by the group. Any value can be obtained by changing the parity of
+# at most one section. If the group contains more than COLUMNS sections, several sections share the same
+# column, and the cheapest of them can be chosen.
+
+COLUMNS: int = 2 ** MATRIX_BITS - 1
+
+def column(i: int) -> int:
+    return i % COLUMNS + 1
+
+def syndrome(parities: list[int]) -> int:
+    s: int = 0
+    for i, p in enumerate(parities):
+        if p:
+            s ^= column(i)
+    return s
+
+def bits_to_int(bits: list[Bit]) -> int:
+    value: int = 0
+    for b in bits:
+        value = (value << 1) | b
+    return value
+
+def decode(parities: list[int]) -> list[Bit]:
+    """Return the MATRIX_BITS bits carried by a group of sections (most significant bit first)."""
+    s: int = syndrome(parities)
+    return [cast(Bit, (s >> (MATRIX_BITS - 1 - k)) & 1) for k in range(MATRIX_BITS)]
+
+def encode(parities: list[int], bits: list[Bit], costs: Optional[list[int]] = None) -> list[Bit]:
+    """Return the parities that the sections of a group must have to carry the given bits.
+    At most one parity differs from the given ones: the one of the cheapest section (according to "costs")
+    among the sections whose column is suitable."""
+    if len(parities) < COLUMNS:
+        raise ValueError("A group must contain at least {} sections (got {}).".format(COLUMNS, len(parities)))
+    if len(bits) != MATRIX_BITS:
+        raise ValueError("A group carries exactly {} bits (got {}).".format(MATRIX_BITS, len(bits)))
+    result: list[Bit] = [cast(Bit, p) for p in parities]
+    d: int = syndrome(parities) ^ bits_to_int(bits)
+    if d != 0:
+        candidates: list[int] = [i for i in range(len(parities)) if column(i) == d]
+        i: int = min(candidates, key=lambda j: costs[j] if costs is not None else 0)
+        result[i] = cast(Bit, 1 - result[i])
+    return result
+
+def groups_needed(bit_count: int) -> int:
+    return -(-bit_count // MATRIX_BITS)
+
+def sections_needed(bit_count: int, group_size: int = MATRIX_GROUP_SIZE) -> int:
+    """Return the number of sections required to carry "bit_count" bits."""
+    return groups_needed(bit_count) * group_size
+
+def split_bits(bits: list[Bit]) -> list[list[Bit]]:
+    """Split the bits by groups of MATRIX_BITS bits (the last group is padded with zeros)."""
+    padded: list[Bit] = bits + [0] * (groups_needed(len(bits)) * MATRIX_BITS - len(bits))
+    return [padded[i:i + MATRIX_BITS] for i in range(0, len(padded), MATRIX_BITS)]
@@ -35,6 +35,15 @@ class Message:
         body = Conversion.bytes_to_bit_list(s.encode("ascii"))
         return v_length + body
 
+    @staticmethod
+    def bytes_to_vector(data: bytes, length: int = 64) -> Vector:
+        """Convert an ASCII text (given as bytes) to a vector (see string_to_vector)."""
+        try:
+            text: str = data.decode('ascii')
+        except UnicodeDecodeError as e:
+            raise ValueError("Invalid encoding for the message (must be ASCII).") from e
+        return Message.string_to_vector(text, length)
+
     @staticmethod
     def load_text_file(file_path: str) -> str:
         """
@@ -2,5 +2,19 @@
 
 KEY_LENGTH: int = 32
 
-__all__ = ['KEY_LENGTH']
+# Formats of murmurs:
+# - FORMAT_CHAINED: the key is updated with the hash of the last section of each block of KEY_LENGTH sections.
+# - FORMAT_COUNTER: the algorithm of a section only depends on the key and on the position of the section.
+# - FORMAT_MATRIX: same algorithms as FORMAT_COUNTER, but each group of sections carries MATRIX_BITS bits
+#                  (matrix embedding, see whisper.matrix).
+FORMAT_CHAINED: int = 1
+FORMAT_COUNTER: int = 2
+FORMAT_MATRIX: int = 3
+FORMATS: list[int] = [FORMAT_CHAINED, FORMAT_COUNTER, FORMAT_MATRIX]
+
+# Matrix embedding: number of bits carried by a group, and default number of sections per group.
+MATRIX_BITS: int = 3
+MATRIX_GROUP_SIZE: int = 7
+
+__all__ = ['KEY_LENGTH', 'FORMAT_CHAINED', 'FORMAT_COUNTER', 'FORMAT_MATRIX', 'FORMATS', 'MATRIX_BITS', 'MATRIX_GROUP_SIZE']
 
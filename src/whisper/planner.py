@@ -0,0 +1,118 @@
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Optional, TYPE_CHECKING
+from .hasher import Hasher
+from .params import KEY_LENGTH, FORMAT_CHAINED, FORMAT_MATRIX, MATRIX_GROUP_SIZE
+from .types import Bit
+from .llm import CHARS_PER_TOKEN
+from . import matrix
+
+if TYPE_CHECKING:
+    from .hash_pool import HashPool
+
+# Average number of LLM calls per rewrite (a reformulation has the expected parity with a probability of 1/2).
+CALLS_PER_REWRITE: int = 2
+
+@dataclass
+class Plan:
+    """Cost of hiding a message in a haystack, for a given format.
+
+    The number of rewrites is exact for the formats FORMAT_COUNTER and FORMAT_MATRIX, since the parities
+    of the original sections can be computed in advance. With the format FORMAT_CHAINED, the algorithms
+    of a key block depend on the hash of the last section of the previous block: the number of rewrites
+    is exact until the first block whose last section must be rewritten, and estimated (half of the bits)
+    after it.
+
+    The number of tokens is estimated from the length of the rewritten sections: each LLM call sends
+    the section and receives a reformulation of about the same length (the prompts are not counted).
+    """
+    format_version: int
+    bits: int
+    sections: int
+    available: int
+    rewrites: float
+    exact: bool
+    tokens: float = 0.0
+
+    def feasible(self) -> bool:
+        return self.sections <= self.available
+
+    def expected_calls(self) -> float:
+        return self.rewrites * CALLS_PER_REWRITE
+
+    def to_dict(self) -> dict[str, Any]:
+        d: dict[str, Any] = asdict(self)
+        d['expected_calls'] = self.expected_calls()
+        return d
+
+def carriers_needed(bit_count: int, format_version: int, group_size: int = MATRIX_GROUP_SIZE) -> int:
+    """Return the number of sections that carry "bit_count" bits."""
+    return matrix.sections_needed(bit_count, group_size) if format_version == FORMAT_MATRIX else bit_count
+
+def chained_parities(secret_key: str, bits: list[Bit], count: int, parities_at: Callable[[int, list[str]], list[int]],
+                     hash_at: Callable[[int, str], bytes]) -> list[int]:
+    """Return the parities of the first original sections, with the algorithms of the format FORMAT_CHAINED.
+    "parities_at(start, algorithms)" returns the parities of the sections from "start", and "hash_at(position,
+    algorithm)" returns the hash of a section. The parities are only known until the end of the first block
+    whose last section must be rewritten (the hash of its reformulation is not known in advance)."""
+    hasher: Hasher = Hasher(secret_key)
+    parities: list[int] = []
+    last_hash: Optional[bytes] = None
+    for start in range(0, count, KEY_LENGTH):
+        algorithms: list[str] = [hasher.next_hash_algorithm(last_hash) for _ in range(min(KEY_LENGTH, count - start))]
+        parities += parities_at(start, algorithms)
+        end: int = start + len(algorithms) - 1
+        if end + 1 >= count or parities[end] != bits[end]:
+            break
+        last_hash = hash_at(end, algorithms[-1])
+    return parities
+
+def make_plan(bits: list[Bit], parities: list[int], lengths: list[int], format_version: int,
+              group_size: int = MATRIX_GROUP_SIZE) -> Plan:
+    """Compute the cost of hiding the given bits (including the length header) in sections whose lengths are given.
+    "parities" are the parities of the first original sections (see chained_parities for the format FORMAT_CHAINED);
+    the carriers whose parity is unknown are rewritten with a probability of 1/2."""
+    sections: int = carriers_needed(len(bits), format_version, group_size)
+    rewrites: float = 0
+    length: float = 0
+    if format_version == FORMAT_MATRIX:
+        for g, group_bits in enumerate(matrix.split_bits(bits)):
+            group: list[int] = parities[g * group_size:(g + 1) * group_size]
+            if len(group) < group_size:
+                break
+            expected: list[Bit] = matrix.encode(group, group_bits, lengths[g * group_size:(g + 1) * group_size])
+            for i, (p, e) in enumerate(zip(group, expected)):
+                if p != e:
+                    rewrites += 1
+                    length += lengths[g * group_size + i]
+    else:
+        for i, (p, b) in enumerate(zip(parities, bits)):
+            if p != b:
+                rewrites += 1
+                length += lengths[i]
+    exact: bool = True
+    if format_version == FORMAT_CHAINED and len(parities) < len(bits):
+        rewrites += (len(bits) - len(parities)) / 2
+        length += sum(lengths[len(parities):len(bits)]) / 2
+        exact = False
+    tokens: float = 2 * length / CHARS_PER_TOKEN * CALLS_PER_REWRITE
+    return Plan(format_version, len(bits), sections, len(lengths), rewrites, exact, tokens)
+
+def plan(bits: list[Bit], texts: list[str], secret_key: str, format_version: int, group_size: int = MATRIX_GROUP_SIZE,
+         hash_pool: Optional['HashPool'] = None) -> Plan:
+    """Compute the cost of hiding the given bits (including the length header) in the given sections."""
+    count: int = min(carriers_needed(len(bits), format_version, group_size), len(texts))
+    lengths: list[int] = [len(text) for text in texts]
+    if format_version == FORMAT_CHAINED:
+        hasher: Hasher = Hasher(secret_key, hash_pool=hash_pool)
+
+        def parities_at(start: int, algorithms: list[str]) -> list[int]:
+            return [Hasher.parity(h) for h in hasher.hash_many([(algorithm, texts[start + i]) for i, algorithm in enumerate(algorithms)])]
+
+        def hash_at(position: int, algorithm: str) -> bytes:
+            return hasher.hash_many([(algorithm, texts[position])])[0]
+
+        return make_plan(bits, chained_parities(secret_key, bits, count, parities_at, hash_at), lengths, format_version, group_size)
+
+    hasher = Hasher(secret_key, hash_pool=hash_pool, format_version=format_version)
+    parities: list[int] = [Hasher.parity(h) for h in hasher.hash_many([(hasher.algorithm_at(i), text) for i, text in enumerate(texts[:count])])]
+    return make_plan(bits, parities, lengths, format_version, group_size)
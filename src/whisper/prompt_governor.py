@@ -0,0 +1,60 @@
+import math
+import threading
+from typing import Any, Optional
+from .llm import count_tokens, count_message_tokens, truncate_tokens
+
+# Number of tokens of the JSON envelope of a response (`{"result": "..."}`), and of each item of a batch response.
+RESPONSE_OVERHEAD: int = 16
+ITEM_OVERHEAD: int = 4
+
+class PromptGovernor:
+    """Measure and bound the requests sent to the rewriter.
+
+      - The reformulation embedded in the prompt of a retry (see Config.system['next_requests']) is limited to
+        "max_previous_tokens" tokens: it only tells the LLM what not to produce, and could otherwise double the
+        size of each retry.
+      - The maximum number of output tokens of a request is derived from the length of its sections: a
+        reformulation may be at most "output_ratio" times longer than its section (see max_output_tokens).
+        No limit is set if "output_ratio" is None.
+      - The input and output tokens of all the requests are counted (see record).
+
+    The tokens are counted with the tokenizer of the model (tiktoken), or estimated if tiktoken is not installed.
+    """
+
+    def __init__(self, model: str, max_previous_tokens: Optional[int] = None, output_ratio: Optional[float] = None) -> None:
+        self.model: str = model
+        self.max_previous_tokens: Optional[int] = max_previous_tokens
+        self.output_ratio: Optional[float] = output_ratio
+        self.lock: threading.Lock = threading.Lock()
+        self.requests: int = 0
+        self.input_tokens: int = 0
+        self.output_tokens: int = 0
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def count_messages(self, messages: list[dict[str, str]]) -> int:
+        return count_message_tokens(messages, self.model)
+
+    def previous(self, reformulation: str) -> str:
+        """Return the reformulation to embed in the prompt of a retry."""
+        if self.max_previous_tokens is None:
+            return reformulation
+        return truncate_tokens(reformulation, self.max_previous_tokens, self.model)
+
+    def max_output_tokens(self, texts: list[str]) -> Optional[int]:
+        """Return the maximum number of output tokens of a request for the given sections."""
+        if self.output_ratio is None:
+            return None
+        tokens: int = sum(math.ceil(self.count(text) * self.output_ratio) + ITEM_OVERHEAD for text in texts)
+        return RESPONSE_OVERHEAD + tokens
+
+    def record(self, input_tokens: int, output_tokens: int) -> None:
+        with self.lock:
+            self.requests += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            return {'requests': self.requests, 'input_tokens': self.input_tokens, 'output_tokens': self.output_tokens}
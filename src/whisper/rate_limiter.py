@@ -0,0 +1,41 @@
+import time
+import threading
+from typing import Optional
+from .rewriter import Rewriter
+
+class RateLimiter:
+    """Token bucket: allow "rate" operations per second on average, with bursts of "burst" operations."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0:
+            raise ValueError("Invalid rate: {} (must be positive).".format(rate))
+        self.rate: float = rate
+        self.burst: int = max(1, burst)
+        self.tokens: float = float(self.burst)
+        self.last: float = time.monotonic()
+        self.lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until an operation is allowed."""
+        while True:
+            with self.lock:
+                now: float = time.monotonic()
+                self.tokens = min(float(self.burst), self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                delay: float = (1.0 - self.tokens) / self.rate
+            time.sleep(delay)
+
+class RateLimitedRewriter(Rewriter):
+    """Rewriter that limits the rate of the requests sent to another rewriter.
+    The limiter can be shared by several rewriters."""
+
+    def __init__(self, rewriter: Rewriter, limiter: RateLimiter) -> None:
+        self.rewriter: Rewriter = rewriter
+        self.limiter: RateLimiter = limiter
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        self.limiter.acquire()
+        return self.rewriter.call(messages, max_tokens)
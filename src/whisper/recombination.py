@@ -0,0 +1,37 @@
+import re
+import itertools
+
+# Maximum number of combinations generated from a reformulation (2^-16 chance that none of them,
+# nor the reformulation, has the expected parity).
+MAX_COMBINATIONS: int = 15
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?…»])\s+')
+
+def split_sentences(text: str) -> list[str]:
+    return [sentence for sentence in SENTENCE_END_RE.split(text.strip()) if sentence != '']
+
+def combinations(original: str, reformulation: str, limit: int = MAX_COMBINATIONS) -> list[str]:
+    """Return the texts obtained by mixing the sentences of a text and the sentences of its reformulation.
+
+    The sentences are matched by position, so the two texts must contain the same number of sentences
+    (otherwise, there is no combination). A text of s sentences gives 2^s - 2 combinations (the original
+    text and the reformulation are excluded). The combinations that contain the most reformulated
+    sentences come first.
+    """
+    originals: list[str] = split_sentences(original)
+    reformulations: list[str] = split_sentences(reformulation)
+    count: int = len(originals)
+    if count < 2 or count != len(reformulations):
+        return []
+    result: list[str] = []
+    seen: set[str] = {original.strip(), reformulation.strip()}
+    # Keep 1, 2... original sentences.
+    for kept in range(1, count):
+        for indexes in itertools.combinations(range(count), kept):
+            text: str = ' '.join(originals[i] if i in indexes else reformulations[i] for i in range(count))
+            if text not in seen:
+                seen.add(text)
+                result.append(text)
+                if len(result) >= limit:
+                    return result
+    return result
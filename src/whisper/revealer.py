@@ -0,0 +1,166 @@
+from typing import Optional, Iterable, Iterator, TypeVar, Union, cast, TYPE_CHECKING
+from pathlib import Path
+from .hasher import Hasher
+from .params import KEY_LENGTH, FORMAT_CHAINED, FORMAT_COUNTER, FORMAT_MATRIX, MATRIX_GROUP_SIZE
+from .text_file_tool import read_sections_from_file, read_sections_from_text
+from .conversion import Conversion
+from .types import Bit, Int16
+from .disk_list import DiskList, MEMORY_BUDGET, spill, release
+from . import matrix
+
+if TYPE_CHECKING:
+    from .hash_pool import HashPool
+
+T = TypeVar('T')
+
+def read_blocks(items: Iterable[T], size: int = KEY_LENGTH) -> Iterator[list[T]]:
+    """Group the text sections (or the Section objects) by blocks of "size" sections (the last block may be shorter)."""
+    block: list[T] = []
+    for item in items:
+        block.append(item)
+        if len(block) == size:
+            yield block
+            block = []
+    if len(block) > 0:
+        yield block
+
+class Revealer:
+
+    def __init__(self, murmur: Optional[str], reveal_path: Optional[str], secret_key: str, verbose: bool = False, hash_pool: Optional['HashPool'] = None,
+                 format_version: int = FORMAT_CHAINED, group_size: int = MATRIX_GROUP_SIZE,
+                 memory_budget: Optional[int] = MEMORY_BUDGET) -> None:
+        """If a pool is given, the sections of each block are hashed in parallel.
+        For the formats FORMAT_COUNTER and FORMAT_MATRIX, the blocks do not depend on each other, and all the
+        sections are hashed in parallel. The size of the groups is only used by the format FORMAT_MATRIX.
+        The sections of a murmur larger than the memory budget (in bytes) are spilled to disk (see whisper.disk_list.spill).
+        The paths of the murmur and of the output are only used by reveal (they may be None if reveal_text is used)."""
+        self.murmur: Optional[str] = murmur
+        self.reveal_path: Optional[str] = reveal_path
+        self.verbose: bool = verbose
+        self.secret_key: str = secret_key
+        self.hash_pool: Optional['HashPool'] = hash_pool
+        self.format_version: int = format_version
+        self.group_size: int = group_size
+        self.memory_budget: Optional[int] = memory_budget
+
+    def reveal_range(self, texts: list[str], start: int) -> list[Bit]:
+        """Return the parities of the given sections, the first one being at position "start".
+        Only the formats FORMAT_COUNTER and FORMAT_MATRIX allow decoding a range of sections independently
+        of the others."""
+        format_version: int = FORMAT_MATRIX if self.format_version == FORMAT_MATRIX else FORMAT_COUNTER
+        hasher: Hasher = Hasher(self.secret_key, hash_pool=self.hash_pool, format_version=format_version)
+        hashes: list[bytes] = hasher.hash_many([(hasher.algorithm_at(start + i), text) for i, text in enumerate(texts)])
+        return [cast(Bit, Hasher.parity(h)) for h in hashes]
+
+    def reveal(self) -> None:
+        body: bytes = self.reveal_file()
+        with open(self.reveal_path, 'w') as f:
+            f.write(str(body, 'ascii'))
+
+    def reveal_file(self) -> bytes:
+        """Return the message hidden in the murmur file."""
+        if self.format_version in (FORMAT_COUNTER, FORMAT_MATRIX):
+            texts: Union[list[str], DiskList] = spill(read_sections_from_file(self.murmur), Path(self.murmur).stat().st_size,
+                                                      self.memory_budget)
+            try:
+                return self.reveal_message(texts)
+            finally:
+                release(texts)
+        return self.reveal_message(read_sections_from_file(self.murmur))
+
+    def reveal_text(self, murmur: str) -> bytes:
+        """Return the message hidden in the murmur (see whisper.text_api). The murmur is never written to disk."""
+        return self.reveal_message(read_sections_from_text(murmur))
+
+    def reveal_message(self, texts: Iterable[str]) -> bytes:
+        """Return the message carried by the sections of a murmur."""
+        if self.format_version in (FORMAT_COUNTER, FORMAT_MATRIX):
+            return self.message(self.reveal_counter(texts if isinstance(texts, (list, DiskList)) else list(texts)))
+        return self.message(self.reveal_chained(texts))
+
+    def reveal_chained(self, texts: Iterable[str]) -> list[Bit]:
+        hasher: Hasher = Hasher(self.secret_key, hash_pool=self.hash_pool)
+        last_hash: Optional[bytes] = None
+        bits: list[Bit] = []
+        needed: Optional[int] = None
+
+        # The algorithms of a block only depend on the hash of the last section of the previous block.
+        # Thus, all the sections of a block can be hashed at once.
+        count: int = 0
+        for block in read_blocks(texts):
+            algorithms: list[str] = [hasher.next_hash_algorithm(last_hash) for _ in block]
+            hashes: list[bytes] = hasher.hash_many(list(zip(algorithms, block)))
+            for algorithm, text, h in zip(algorithms, block, hashes):
+                count += 1
+                bit: int = Hasher.parity(h)
+                if self.verbose:
+                    print("%-4d algorithm: %s" % (count, algorithm))
+                    print("     hash: {}".format(h.hex()))
+                    print("     bit:  {}\n\n".format(bit))
+                    print("{}\n\n".format(text))
+                bits.append(cast(Bit, bit))
+            last_hash = hashes[-1]
+
+            # The remaining sections do not carry any bit of the message.
+            if needed is None and len(bits) >= 16:
+                needed = 16 + Conversion.bit_list_to_int16(bits[:16]) * 8
+            if needed is not None and len(bits) >= needed:
+                break
+        return bits
+
+    def reveal_counter(self, texts: Union[list[str], DiskList]) -> list[Bit]:
+        owned_pool: bool = self.hash_pool is None
+        if owned_pool:
+            from .hash_pool import HashPool
+            self.hash_pool = HashPool()
+        try:
+            if self.format_version == FORMAT_MATRIX:
+                bits: list[Bit] = self.reveal_matrix(texts)
+            else:
+                bits = self.reveal_range(texts[:16], 0)
+                if len(bits) == 16:
+                    # Only hash the sections that carry the message.
+                    length: int = Conversion.bit_list_to_int16(bits)
+                    bits += self.reveal_range(texts[16:16 + length * 8], 16)
+        finally:
+            if owned_pool:
+                self.hash_pool.close()
+                self.hash_pool = None
+        if self.verbose and self.format_version != FORMAT_MATRIX:
+            for i, text in enumerate(texts[:len(bits)]):
+                print("%-4d bit:  %d\n\n%s\n\n" % (i + 1, bits[i], text))
+        return bits
+
+    def reveal_matrix(self, texts: Union[list[str], DiskList]) -> list[Bit]:
+        """Return the bits carried by the groups of sections (FORMAT_MATRIX)."""
+        size: int = self.group_size
+
+        def decode(start: int, end: int) -> list[Bit]:
+            # Only complete groups carry bits.
+            end = min(end, len(texts) // size * size)
+            if end <= start:
+                return []
+            parities: list[Bit] = self.reveal_range(texts[start:end], start)
+            return [b for g in range(0, len(parities), size) for b in matrix.decode(parities[g:g + size])]
+
+        # Only hash the sections that carry the message.
+        header_end: int = matrix.sections_needed(16, size)
+        bits: list[Bit] = decode(0, header_end)
+        if len(bits) >= 16:
+            length: int = Conversion.bit_list_to_int16(bits[:16])
+            bits += decode(header_end, matrix.sections_needed(16 + length * 8, size))
+        return bits
+
+    def message(self, bits: list[Bit]) -> bytes:
+        # Make sure that the number of bits is greater than 64.
+        if len(bits) < 16:
+            raise ValueError("The murmur must contain at least 16 sentences!")
+        length_vector: list[Bit] = bits[:16]
+        if self.verbose:
+            print("Number of bits: {}".format(len(bits)))
+            print("Length vector: {}".format(length_vector))
+
+
+        length: Int16 = Conversion.bit_list_to_int16(length_vector)
+        body_vector: list[Bit] = bits[16:16+length*8]
+        return Conversion.bit_list_to_bytes(body_vector)
@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config import EndpointConfig
+
+BACKENDS: list[str] = ['chatgpt', 'local']
+
+# Backends that call an LLM (the tokens of their requests are counted, see whisper.prompt_governor).
+LLM_BACKENDS: list[str] = ['chatgpt']
+
+class NoReformulationError(ValueError):
+    """Raised by a rewriter that cannot produce any new reformulation of a text (see Whisperer.rewrite_section)."""
+
+class Rewriter(ABC):
+    """Backend used by the Whisperer to obtain reformulations of text sections.
+
+    A rewriter receives a list of messages expressed using the OpenAI ChatCompletion
+    format (`{'role': ..., 'content': ...}`) and returns the raw response of the backend.
+    The response is expected to be a JSON document such as `{"result": "..."}`, or
+    `{"result": ["...", "..."]}` if the request contains a JSON array of texts (batch request).
+    If "max_tokens" is given, the backends that support it limit the length of the response.
+    """
+
+    @abstractmethod
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        pass
+
+def create_rewriter(backend: str, model: str, token: Optional[str], structured_output: bool = True,
+                    endpoints: Optional[list['EndpointConfig']] = None, routing: str = 'least-outstanding') -> Rewriter:
+    """Create the rewriter identified by its name (see BACKENDS).
+
+    If "structured_output" is True, the backends that support it are asked to produce
+    JSON documents that conform to the expected schema.
+
+    If endpoints are given, the requests sent to the "chatgpt" backend are spread across these
+    endpoints (see whisper.endpoint_pool.EndpointPool). The model and the token of an endpoint
+    default to the given ones.
+
+    The backend modules are imported on demand, so that the dependencies of a backend
+    are only loaded if this backend is used.
+    """
+    if backend == 'chatgpt':
+        from .chat_gpt import ChatGPT
+        if endpoints:
+            from .endpoint_pool import Endpoint, EndpointPool
+            from .api_tools import load_token
+            pool: list[Endpoint] = []
+            for endpoint in endpoints:
+                options: dict[str, str] = {'base_url': endpoint.base_url} if endpoint.base_url is not None else {}
+                rewriter: Rewriter = ChatGPT(endpoint.model if endpoint.model is not None else model,
+                                             load_token(endpoint.token_file) if endpoint.token_file is not None else token,
+                                             options, structured_output=structured_output)
+                pool.append(Endpoint(endpoint.name, rewriter))
+            return EndpointPool(pool, routing)
+        return ChatGPT(model, token, structured_output=structured_output)
+    if backend == 'local':
+        from .local_rewriter import LocalRewriter
+        return LocalRewriter()
+    raise ValueError("Invalid backend: {} (must be one of {}).".format(backend, ', '.join(BACKENDS)))
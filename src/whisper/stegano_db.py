@@ -1,11 +1,22 @@
-from typing import Optional, Generator
+from typing import Optional, Generator, Tuple, Union
 import os
 import sqlite3
 from pathlib import Path
 from dataclasses import dataclass
+from .mapped_haystack import MappedHaystack, ENCODING
 from .rand_tools import RandTools
 from .types import Bit
 
+# Path of a database held in memory (see sqlite3.connect).
+MEMORY_DB: str = ':memory:'
+
+# Separator written after each section of a murmur.
+SEPARATOR: bytes = b'\n\n'
+
+# Columns of a section (the columns "start", "end" and "unchanged" do not exist in the databases created by
+# the previous versions: they are read as NULL).
+COLUMNS: list[str] = ['position', 'original_text', 'expected_bit', 'traduction', 'algo', 'hash', 'start', 'end', 'unchanged']
+
 @dataclass
 class Section:
     position: int
@@ -16,25 +27,45 @@ class Section:
     hash: Optional[str] = None
 
 class SteganoDb:
+    """The sections of a hide.
+
+    The sections of a haystack file are stored as byte offsets into the memory-mapped haystack (see attach):
+    their original texts are only decoded when they are read, and the sections that are not rewritten are only
+    flagged as unchanged (see set_unchanged). Thus, the text of the haystack is neither duplicated in the
+    database nor held in memory, and the murmur is assembled by copying the unchanged byte ranges of the
+    haystack (see get_output). The sections of a haystack held in memory are stored as texts (see add_original_text).
+    """
 
     def __init__(self, db_path: Optional[str] = None, init: bool = True):
         if db_path is None:
             db_path = 'file-db-' + RandTools.random_string(10) + '.sqlite'
         self.db_file_path: Path = Path(db_path)
         self.db = sqlite3.connect(db_path)
-        if init:
-            cursor = self.db.cursor()
-            try:
+        self.haystack: Optional[MappedHaystack] = None
+        cursor = self.db.cursor()
+        try:
+            if init:
                 cursor.execute("""CREATE TABLE IF NOT EXISTS t ("idx" INTEGER PRIMARY KEY,
                                                                 "position" INTEGER NOT NULL,
-                                                                "original_text" TEXT NOT NULL,
+                                                                "original_text" TEXT DEFAULT NULL,
                                                                 "expected_bit" integer DEFAULT NULL,
                                                                 "traduction" TEXT DEFAULT NULL,
                                                                 "algo" TEXT DEFAULT NULL,
-                                                                "hash" TEXT DEFAULT NULL)
+                                                                "hash" TEXT DEFAULT NULL,
+                                                                "start" INTEGER DEFAULT NULL,
+                                                                "end" INTEGER DEFAULT NULL,
+                                                                "unchanged" INTEGER NOT NULL DEFAULT 0)
                                """)
-            finally:
-                cursor.close()
+                cursor.execute("""CREATE TABLE IF NOT EXISTS haystack ("path" TEXT NOT NULL, "size" INTEGER NOT NULL)""")
+            columns: set[str] = {row[1] for row in cursor.execute('PRAGMA table_info(t)')}
+            self.select: str = ', '.join('"{}"'.format(c) if c in columns else 'NULL' for c in COLUMNS)
+            # The haystack of an existing database is mapped again, unless it was modified.
+            if not init and 'haystack' in {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")}:
+                row = cursor.execute('SELECT "path", "size" FROM haystack').fetchone()
+                if row is not None and Path(row[0]).is_file() and Path(row[0]).stat().st_size == row[1]:
+                    self.haystack = MappedHaystack(row[0])
+        finally:
+            cursor.close()
         self.db.commit()
 
     def __enter__(self):
@@ -44,10 +75,12 @@ class SteganoDb:
         self.destroy()
 
     def close(self) -> None:
+        self.detach()
         self.db.close()
         self.db = None
 
     def destroy(self) -> None:
+        self.detach()
         if not self.db_file_path.exists():
             return
         self.db.close()
@@ -57,6 +90,25 @@ class SteganoDb:
             print("Unable to remove file: " + str(self.db_file_path), flush=True)
         self.db = None
 
+    def attach(self, path: str) -> MappedHaystack:
+        """Map the haystack file in memory, and add its sections (as offsets)."""
+        self.detach()
+        self.haystack = MappedHaystack(path)
+        cursor = self.db.cursor()
+        try:
+            cursor.execute('DELETE FROM haystack')
+            cursor.execute('INSERT INTO haystack ("path", "size") VALUES (?, ?)', (str(Path(path).resolve()), self.haystack.size))
+            cursor.executemany('INSERT INTO t ("position", "start", "end") VALUES (?, ?, ?)', self.haystack.offsets())
+        finally:
+            cursor.close()
+        self.db.commit()
+        return self.haystack
+
+    def detach(self) -> None:
+        if self.haystack is not None:
+            self.haystack.close()
+            self.haystack = None
+
     def add_original_text(self, position: int, original_text: str) -> None:
         cursor = self.db.cursor()
         try:
@@ -76,20 +128,47 @@ class SteganoDb:
     def set_traduction(self, position: int, traduction: str, algo: str, h: bytes) -> None:
         cursor = self.db.cursor()
         try:
-            cursor.execute('UPDATE t SET "traduction"=?, "algo"=?, "hash"=? WHERE "position"=?', (traduction, algo, h.hex(), position,))
+            cursor.execute('UPDATE t SET "traduction"=?, "algo"=?, "hash"=?, "unchanged"=0 WHERE "position"=?', (traduction, algo, h.hex(), position,))
+        finally:
+            cursor.close()
+        self.db.commit()
+
+    def set_unchanged(self, position: int, algo: str, h: bytes) -> None:
+        """Keep the original text of the section (it is read as the traduction of the section)."""
+        cursor = self.db.cursor()
+        try:
+            cursor.execute('UPDATE t SET "traduction"=NULL, "algo"=?, "hash"=?, "unchanged"=1 WHERE "position"=?', (algo, h.hex(), position,))
         finally:
             cursor.close()
         self.db.commit()
 
+    def set_unchanged_from(self, position: int) -> None:
+        """Keep the original text of all the sections from the position (the extra sections, which carry no bit).
+        They are not hashed: their algorithm and hash are NULL."""
+        cursor = self.db.cursor()
+        try:
+            cursor.execute('UPDATE t SET "traduction"=NULL, "algo"=NULL, "hash"=NULL, "unchanged"=1 WHERE "position">=?', (position,))
+        finally:
+            cursor.close()
+        self.db.commit()
+
+    def to_section(self, row: Tuple) -> Section:
+        position, original_text, expected_bit, traduction, algo, h, start, end, unchanged = row
+        if original_text is None and start is not None and self.haystack is not None:
+            original_text = self.haystack.text(start, end)
+        if unchanged:
+            traduction = original_text
+        return Section(position=position, original_text=original_text, expected_bit=expected_bit, traduction=traduction, algo=algo, hash=h)
+
     def get_section_by_position(self, position: int) -> Section:
         cursor = self.db.cursor()
         try:
-            row = cursor.execute('SELECT "idx", "position", "original_text", "expected_bit", "traduction", "algo", "hash" FROM t WHERE "position"=?', (position,)).fetchone()
+            row = cursor.execute('SELECT {} FROM t WHERE "position"=?'.format(self.select), (position,)).fetchone()
             if row is None:
                 raise ValueError("Invalid position: {}".format(position))
         finally:
             cursor.close()
-        return Section(position=row[1], original_text=row[2], expected_bit=row[3], traduction=row[4], algo=row[5], hash=row[6])
+        return self.to_section(row)
 
     def __len__(self) -> int:
         cursor = self.db.cursor()
@@ -99,10 +178,46 @@ class SteganoDb:
             cursor.close()
         return count
 
-    def get_sections(self) -> Generator[Section, None, None]:
+    def get_sections(self, end: Optional[int] = None) -> Generator[Section, None, None]:
+        """Yield the sections by position (only the sections before the position "end", if given)."""
+        cursor = self.db.cursor()
+        try:
+            if end is None:
+                rows = cursor.execute('SELECT {} FROM t ORDER BY "position"'.format(self.select))
+            else:
+                rows = cursor.execute('SELECT {} FROM t WHERE "position"<? ORDER BY "position"'.format(self.select), (end,))
+            for row in rows:
+                yield self.to_section(row)
+        finally:
+            cursor.close()
+
+    def get_output(self) -> Generator[Union[bytes, memoryview], None, None]:
+        """Yield the bytes of the murmur: each section followed by SEPARATOR ("-" for a section without traduction).
+
+        The consecutive unchanged sections of the mapped haystack that are already separated by SEPARATOR in the
+        haystack are yielded as a single range of the haystack, without copy."""
+        run: Optional[list[int]] = None
         cursor = self.db.cursor()
         try:
-            for row in cursor.execute('SELECT "idx", "position", "original_text", "expected_bit", "traduction", "algo", "hash" FROM t ORDER BY "position"'):
-                yield Section(position=row[1], original_text=row[2], expected_bit=row[3], traduction=row[4], algo=row[5], hash=row[6])
+            for original_text, traduction, start, end, unchanged in cursor.execute(
+                    'SELECT "original_text", "traduction", "start", "end", "unchanged" FROM t ORDER BY "position"'):
+                if unchanged and start is not None and self.haystack is not None:
+                    if run is not None and start == run[1] + len(SEPARATOR) and self.haystack.map[run[1]:start] == SEPARATOR:
+                        run[1] = end
+                        continue
+                    if run is not None:
+                        yield self.haystack.view(run[0], run[1])
+                        yield SEPARATOR
+                    run = [start, end]
+                    continue
+                if run is not None:
+                    yield self.haystack.view(run[0], run[1])
+                    yield SEPARATOR
+                    run = None
+                text: Optional[str] = original_text if unchanged else traduction
+                yield (text if text is not None else '-').encode(ENCODING) + SEPARATOR
+            if run is not None:
+                yield self.haystack.view(run[0], run[1])
+                yield SEPARATOR
         finally:
             cursor.close()
@@ -0,0 +1,149 @@
+import json
+import dataclasses
+from pathlib import Path
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, TYPE_CHECKING
+from .config import Config
+from .hash_pool import HashPool
+from .message import Message
+from .params import FORMATS, MATRIX_GROUP_SIZE
+from .revealer import Revealer
+from .rewriter import Rewriter, create_rewriter
+from .whisperer import Whisperer, Params
+
+if TYPE_CHECKING:
+    from .cassette import RecordingRewriter
+
+# Striped hide: the needle is split into N stripes, and each stripe is hidden in its own haystack, with its own key
+# (see stripe_key). Each stripe is a complete murmur (with its own length header), so that the stripes are hidden
+# and revealed concurrently, and independently of each other. A manifest (JSON) lists the murmurs of the stripes:
+#
+#   {"version": 1, "format": 1, "group_size": 7, "length": 1234, "stripes": ["murmur.0.txt", "murmur.1.txt"]}
+#
+# The paths of the murmurs are relative to the manifest. The secret key is never written in the manifest.
+
+MANIFEST_VERSION: int = 1
+
+# Maximum length (in bytes) of a stripe (the length header of a murmur is 16 bits long).
+MAX_STRIPE_LENGTH: int = 2 ** 16 - 1
+
+@dataclass
+class StripeManifest:
+    format_version: int
+    group_size: int
+    length: int
+    stripes: list[str]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'version': MANIFEST_VERSION, 'format': self.format_version, 'group_size': self.group_size,
+                'length': self.length, 'stripes': self.stripes}
+
+def stripe_key(secret_key: str, index: int) -> str:
+    """Return the key of a stripe: each stripe has its own chain of algorithms."""
+    return '{}#stripe-{}'.format(secret_key, index)
+
+def split_needle(data: bytes, count: int) -> list[bytes]:
+    """Split the needle into "count" stripes of (almost) the same length."""
+    if count < 1:
+        raise ValueError("Invalid number of stripes: {} (must be at least 1).".format(count))
+    size: int = -(-len(data) // count)
+    if size > MAX_STRIPE_LENGTH:
+        raise ValueError("The needle is too long ({} bytes): a stripe cannot exceed {} bytes.".format(len(data), MAX_STRIPE_LENGTH))
+    return [data[i * size:(i + 1) * size] for i in range(count)]
+
+def stripe_paths(manifest_path: str, count: int) -> list[str]:
+    """Return the paths of the murmurs of the stripes: "<manifest>.<index>.txt", next to the manifest."""
+    manifest: Path = Path(manifest_path)
+    return [str(manifest.with_name('{}.{}.txt'.format(manifest.stem, i))) for i in range(count)]
+
+def load_manifest(manifest_path: str) -> StripeManifest:
+    with open(manifest_path) as f:
+        d: Any = json.load(f)
+    if not isinstance(d, dict) or d.get('version') != MANIFEST_VERSION:
+        raise ValueError('Invalid stripe manifest "{}" (unknown version).'.format(manifest_path))
+    if d.get('format') not in FORMATS:
+        raise ValueError('Invalid stripe manifest "{}" (invalid format: {}).'.format(manifest_path, d.get('format')))
+    stripes: Any = d.get('stripes')
+    if not isinstance(stripes, list) or len(stripes) == 0 or not all(isinstance(s, str) for s in stripes):
+        raise ValueError('Invalid stripe manifest "{}" ("stripes" must be a non-empty list of paths).'.format(manifest_path))
+    base: Path = Path(manifest_path).parent
+    return StripeManifest(d['format'], int(d.get('group_size', MATRIX_GROUP_SIZE)), int(d.get('length', 0)),
+                          [str(base.joinpath(s)) for s in stripes])
+
+def hide_stripe(params: Params, config: Config, rewriter: Optional[Rewriter], hash_pool: HashPool, index: int, needle: bytes,
+                haystack: str, secret_key: str, output_path: str) -> int:
+    """Hide a stripe, and return the number of calls to the rewriter. The debug files of the stripe are written in
+    the subdirectory "stripe-<index>" of the debug directory."""
+    if params.debug_path is not None:
+        debug_path: Path = Path(params.debug_path).joinpath('stripe-{}'.format(index))
+        debug_path.mkdir(parents=True, exist_ok=True)
+        params = dataclasses.replace(params, debug_path=str(debug_path))
+    w: Whisperer = Whisperer(params, config, rewriter=rewriter, hash_pool=hash_pool)
+    try:
+        w.hide_sections(Message.bytes_to_vector(needle, length=16), w.db.attach(haystack), Path(haystack).stat().st_size,
+                        stripe_key(secret_key, index), None, 'stripe {}'.format(index), haystack)
+        w.write_murmur(output_path)
+        return w.call_count
+    finally:
+        w.close()
+        if params.debug_path is None:
+            w.db.destroy()
+
+def hide_striped(needle: bytes, haystacks: list[str], secret_key: str, manifest_path: str, params: Params, config: Config,
+                 rewriter: Optional[Rewriter] = None, hash_pool: Optional[HashPool] = None) -> int:
+    """Split the needle across the haystacks, hide all the stripes concurrently, and write their murmurs (see
+    stripe_paths) and the manifest. Return the total number of calls to the rewriter.
+
+    The rewriter (and the pool of hashing workers) is shared by the stripes: it is created from the parameters
+    if not given. The responses of all the stripes are recorded in the same cassette."""
+    stripes: list[bytes] = split_needle(needle, len(haystacks))
+    outputs: list[str] = stripe_paths(manifest_path, len(haystacks))
+    recorder: Optional['RecordingRewriter'] = None
+    if params.replay_path is None:
+        if rewriter is None:
+            rewriter = create_rewriter(params.backend, config.model, params.token, config.structured_output,
+                                       config.endpoints, config.routing)
+        if params.record_path is not None:
+            from .cassette import RecordingRewriter
+            recorder = RecordingRewriter(rewriter, params.record_path)
+            rewriter = recorder
+            params = dataclasses.replace(params, record_path=None)
+    owned_pool: bool = hash_pool is None
+    pool: HashPool = hash_pool if hash_pool is not None else HashPool()
+    try:
+        with ThreadPoolExecutor(max_workers=len(stripes), thread_name_prefix='stripe') as executor:
+            calls: list[int] = list(executor.map(
+                lambda i: hide_stripe(params, config, rewriter, pool, i, stripes[i], haystacks[i], secret_key, outputs[i]),
+                range(len(stripes))))
+    finally:
+        if owned_pool:
+            pool.close()
+        if recorder is not None:
+            recorder.close()
+
+    manifest: StripeManifest = StripeManifest(params.format_version, params.group_size, len(needle),
+                                              [Path(output).name for output in outputs])
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest.to_dict(), f, indent=2)
+        f.write('\n')
+    return sum(calls)
+
+def reveal_striped(manifest_path: str, secret_key: str, hash_pool: Optional[HashPool] = None, verbose: bool = False) -> bytes:
+    """Reveal all the stripes of a manifest concurrently, and return the needle."""
+    manifest: StripeManifest = load_manifest(manifest_path)
+    owned_pool: bool = hash_pool is None
+    pool: HashPool = hash_pool if hash_pool is not None else HashPool()
+    try:
+        with ThreadPoolExecutor(max_workers=len(manifest.stripes), thread_name_prefix='stripe') as executor:
+            stripes: list[bytes] = list(executor.map(
+                lambda i: Revealer(manifest.stripes[i], None, stripe_key(secret_key, i), verbose, hash_pool=pool,
+                                   format_version=manifest.format_version, group_size=manifest.group_size).reveal_file(),
+                range(len(manifest.stripes))))
+    finally:
+        if owned_pool:
+            pool.close()
+    needle: bytes = b''.join(stripes)
+    if len(needle) != manifest.length:
+        raise ValueError('Invalid stripes: {} bytes revealed instead of {} (wrong key?).'.format(len(needle), manifest.length))
+    return needle
@@ -0,0 +1,168 @@
+import time
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, Any, Iterator
+
+# Status of a task.
+PENDING: str = 'pending'
+LEASED: str = 'leased'
+DONE: str = 'done'
+FAILED: str = 'failed'
+
+# Default delay (in seconds) after which a coordinator stops waiting for tasks that make no progress.
+STALL_TIMEOUT: float = 600.0
+
+@dataclass
+class Task:
+    """A section to rewrite: the worker must find a reformulation of "text" whose hash (computed
+    with "algorithm") has the parity "expected_bit"."""
+    id: int
+    hide_id: str
+    position: int
+    algorithm: str
+    expected_bit: int
+    text: str
+    priority: int = 0
+    attempts: int = 0
+
+@dataclass
+class TaskResult:
+    id: int
+    status: str
+    text: Optional[str]
+    hash: Optional[bytes]
+    error: Optional[str]
+
+class TaskStore:
+    """Rewrite tasks shared by a coordinator (that creates the tasks and waits for their results) and by
+    workers (that lease the tasks, rewrite the sections and report the results), possibly in different
+    processes or on different hosts (the SQLite file must then be on a shared file system).
+
+    A leased task is only assigned to one worker until its lease expires: if the worker dies (or does not
+    renew the lease), the task is leased again by another worker. A task whose rewrite fails "max_attempts"
+    times is marked as failed. Tasks with a higher priority are leased first.
+
+    Each operation uses its own connection, so that a store can be used by several threads.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3) -> None:
+        self.path: str = path
+        self.max_attempts: int = max_attempts
+        with self.connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS tasks ("id" INTEGER PRIMARY KEY,
+                                                            "hide_id" TEXT NOT NULL,
+                                                            "position" INTEGER NOT NULL,
+                                                            "algorithm" TEXT NOT NULL,
+                                                            "expected_bit" INTEGER NOT NULL,
+                                                            "text" TEXT NOT NULL,
+                                                            "priority" INTEGER NOT NULL DEFAULT 0,
+                                                            "status" TEXT NOT NULL,
+                                                            "worker" TEXT DEFAULT NULL,
+                                                            "lease_expires" REAL DEFAULT NULL,
+                                                            "attempts" INTEGER NOT NULL DEFAULT 0,
+                                                            "result" TEXT DEFAULT NULL,
+                                                            "hash" TEXT DEFAULT NULL,
+                                                            "error" TEXT DEFAULT NULL)""")
+            db.execute('CREATE INDEX IF NOT EXISTS "tasks_status" ON tasks ("status", "priority")')
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode: the transactions that must be atomic are explicit.
+        db: sqlite3.Connection = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            yield db
+        finally:
+            db.close()
+
+    def add(self, hide_id: str, items: list[tuple[int, str, int, str]], priority: int = 0) -> list[int]:
+        """Add the tasks (position, algorithm, expected_bit, text) of a hide, and return their identifiers."""
+        ids: list[int] = []
+        with self.connect() as db:
+            db.execute('BEGIN IMMEDIATE')
+            for position, algorithm, expected_bit, text in items:
+                cursor = db.execute('INSERT INTO tasks ("hide_id", "position", "algorithm", "expected_bit", "text", "priority", "status") '
+                                    'VALUES (?, ?, ?, ?, ?, ?, ?)', (hide_id, position, algorithm, expected_bit, text, priority, PENDING))
+                ids.append(cursor.lastrowid)
+            db.execute('COMMIT')
+        return ids
+
+    def lease(self, worker: str, duration: float, limit: int = 1) -> list[Task]:
+        """Lease at most "limit" tasks (pending tasks, or tasks whose lease has expired) for "duration" seconds."""
+        now: float = time.time()
+        with self.connect() as db:
+            db.execute('BEGIN IMMEDIATE')
+            rows: list[Any] = db.execute('SELECT "id", "hide_id", "position", "algorithm", "expected_bit", "text", "priority", "attempts" FROM tasks '
+                                         'WHERE "status"=? OR ("status"=? AND "lease_expires"<?) '
+                                         'ORDER BY "priority" DESC, "id" LIMIT ?', (PENDING, LEASED, now, limit)).fetchall()
+            for row in rows:
+                db.execute('UPDATE tasks SET "status"=?, "worker"=?, "lease_expires"=? WHERE "id"=?', (LEASED, worker, now + duration, row[0]))
+            db.execute('COMMIT')
+        return [Task(*row) for row in rows]
+
+    def renew(self, ids: list[int], worker: str, duration: float) -> None:
+        """Extend the leases of the given tasks (only the ones that are still leased by the worker)."""
+        with self.connect() as db:
+            db.executemany('UPDATE tasks SET "lease_expires"=? WHERE "id"=? AND "status"=? AND "worker"=?',
+                           [(time.time() + duration, i, LEASED, worker) for i in ids])
+
+    def complete(self, task_id: int, text: str, h: bytes) -> None:
+        """Record the result of a task. A valid result is accepted even if the lease has expired."""
+        with self.connect() as db:
+            db.execute('UPDATE tasks SET "status"=?, "result"=?, "hash"=?, "lease_expires"=NULL WHERE "id"=? AND "status"!=?',
+                       (DONE, text, h.hex(), task_id, DONE))
+
+    def fail(self, task_id: int, error: str) -> None:
+        """Record a failed attempt: the task is pending again, or failed after "max_attempts" attempts."""
+        with self.connect() as db:
+            db.execute('UPDATE tasks SET "attempts"="attempts"+1, "error"=?, "lease_expires"=NULL, '
+                       '"status"=CASE WHEN "attempts"+1>=? THEN ? ELSE ? END WHERE "id"=? AND "status"=?',
+                       (error, self.max_attempts, FAILED, PENDING, task_id, LEASED))
+
+    def results(self, ids: list[int]) -> list[TaskResult]:
+        """Return the results of the given tasks (in the same order)."""
+        with self.connect() as db:
+            rows: dict[int, Any] = {row[0]: row for row in db.execute(
+                'SELECT "id", "status", "result", "hash", "error" FROM tasks WHERE "id" IN ({})'.format(','.join('?' * len(ids))), ids)}
+        return [TaskResult(i, rows[i][1], rows[i][2], bytes.fromhex(rows[i][3]) if rows[i][3] is not None else None, rows[i][4])
+                for i in ids]
+
+    def states(self, ids: list[int]) -> list[tuple[str, Optional[float]]]:
+        """Return the status and the end of the lease of the given tasks (in the same order)."""
+        with self.connect() as db:
+            rows: dict[int, Any] = {row[0]: row for row in db.execute(
+                'SELECT "id", "status", "lease_expires" FROM tasks WHERE "id" IN ({})'.format(','.join('?' * len(ids))), ids)}
+        return [(rows[i][1], rows[i][2]) for i in ids]
+
+    def wait(self, ids: list[int], poll_interval: float = 0.5, stall_timeout: Optional[float] = STALL_TIMEOUT) -> list[TaskResult]:
+        """Wait until the given tasks are done (or failed), and return their results.
+
+        The tasks make progress when one of them is leased, renewed or finished. If they make no progress
+        for "stall_timeout" seconds (no worker is running, or the workers are stuck), a RuntimeError reports
+        the number of pending and leased tasks. None: wait forever."""
+        if len(ids) == 0:
+            return []
+        last: Optional[list[tuple[str, Optional[float]]]] = None
+        deadline: float = 0.0
+        while True:
+            states: list[tuple[str, Optional[float]]] = self.states(ids)
+            if all(status in (DONE, FAILED) for status, _ in states):
+                return self.results(ids)
+            if states != last:
+                last = states
+                deadline = time.monotonic() + (stall_timeout if stall_timeout is not None else 0.0)
+            elif stall_timeout is not None and time.monotonic() >= deadline:
+                statuses: list[str] = [status for status, _ in states]
+                raise RuntimeError("The tasks made no progress for {} seconds: {} pending and {} leased (is a worker running?).".format(
+                    stall_timeout, statuses.count(PENDING), statuses.count(LEASED)))
+            time.sleep(poll_interval)
+
+    def remove(self, hide_id: str) -> None:
+        """Remove the tasks of a hide."""
+        with self.connect() as db:
+            db.execute('DELETE FROM tasks WHERE "hide_id"=?', (hide_id,))
+
+    def counts(self) -> dict[str, int]:
+        with self.connect() as db:
+            return {row[0]: row[1] for row in db.execute('SELECT "status", COUNT(*) FROM tasks GROUP BY "status"')}
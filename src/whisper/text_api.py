@@ -0,0 +1,47 @@
+import asyncio
+import dataclasses
+from typing import Optional, TYPE_CHECKING
+from .config import Config
+from .whisperer import Whisperer, Params
+from .revealer import Revealer
+from .rewriter import Rewriter
+from .stegano_db import MEMORY_DB
+from .incremental import PreviousSection
+from .params import FORMAT_CHAINED, MATRIX_GROUP_SIZE
+
+if TYPE_CHECKING:
+    from .hash_pool import HashPool
+
+# In-memory API: the needle, the haystack and the murmur are given and returned as values, and no file is
+# created (the database of the sections is held in memory, and nothing is spilled to disk). The debug trace
+# and the cassettes of the parameters are still written, if requested.
+#
+# The async variants run the hide or the reveal in a thread of the default executor of the event loop, so that
+# the loop is never blocked. The Whisperer and the Revealer are created in that thread.
+
+def hide_text(needle: bytes, haystack: str, secret_key: str, params: Params, config: Config, rewriter: Optional[Rewriter] = None,
+              hash_pool: Optional['HashPool'] = None, previous: Optional[dict[int, PreviousSection]] = None) -> str:
+    """Hide the needle (ASCII text) in the haystack, and return the murmur (see Whisperer.hide)."""
+    w: Whisperer = Whisperer(dataclasses.replace(params, memory_budget=None), config, db_path=MEMORY_DB, rewriter=rewriter,
+                             hash_pool=hash_pool)
+    try:
+        return w.hide_text(needle, haystack, secret_key, previous)
+    finally:
+        w.close()
+        w.db.close()
+
+def reveal_text(murmur: str, secret_key: str, format_version: int = FORMAT_CHAINED, group_size: int = MATRIX_GROUP_SIZE,
+                hash_pool: Optional['HashPool'] = None, verbose: bool = False) -> bytes:
+    """Return the message hidden in the murmur (see Revealer.reveal)."""
+    revealer: Revealer = Revealer(None, None, secret_key, verbose, hash_pool=hash_pool, format_version=format_version,
+                                  group_size=group_size, memory_budget=None)
+    return revealer.reveal_text(murmur)
+
+async def hide_text_async(needle: bytes, haystack: str, secret_key: str, params: Params, config: Config,
+                          rewriter: Optional[Rewriter] = None, hash_pool: Optional['HashPool'] = None,
+                          previous: Optional[dict[int, PreviousSection]] = None) -> str:
+    return await asyncio.to_thread(hide_text, needle, haystack, secret_key, params, config, rewriter, hash_pool, previous)
+
+async def reveal_text_async(murmur: str, secret_key: str, format_version: int = FORMAT_CHAINED, group_size: int = MATRIX_GROUP_SIZE,
+                            hash_pool: Optional['HashPool'] = None, verbose: bool = False) -> bytes:
+    return await asyncio.to_thread(reveal_text, murmur, secret_key, format_version, group_size, hash_pool, verbose)
@@ -1,5 +1,5 @@
 from typing import Tuple, Optional, cast, Literal
-from typing import Generator
+from typing import Generator, Iterable
 from .types import Char
 
 class SectionDetector:
@@ -39,3 +39,18 @@ def read_sections_from_file(path: str) -> Generator[str, None, None]:
             found, section = detector.detect(character=cast(Char, character))
             if found:
                 yield section
+
+def read_sections_from_text(text: str) -> Generator[str, None, None]:
+    """Same as read_sections_from_file, for a text held in memory."""
+    detector = SectionDetector()
+    for character in text:
+        found, section = detector.detect(character=cast(Char, character))
+        if found:
+            yield section
+    found, section = detector.detect(character=None, last=True)
+    if found:
+        yield section
+
+def join_sections(sections: Iterable[str]) -> str:
+    """Return the text of a murmur (each section is followed by an empty line)."""
+    return ''.join(section + '\n\n' for section in sections)
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+# Default maximum size of a trace file before rotation (in bytes).
+MAX_BYTES: int = 16 * 1024 * 1024
+
+class TraceWriter:
+    """Buffered JSONL trace writer.
+
+    Records are queued by the caller and written by a background thread, one JSON document
+    per line. The file is flushed every "flush_interval" seconds, and rotated when its size
+    exceeds "max_bytes": "trace.jsonl" becomes "trace.jsonl.1", "trace.jsonl.1" becomes
+    "trace.jsonl.2"... and only "backup_count" old files are kept.
+
+    Every record contains the key "event" (the type of record) and the key "time" (the
+    number of seconds since the creation of the writer).
+
+    If the background thread fails (for example, if a record cannot be written), the error is
+    raised again by flush and close.
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES, backup_count: int = 3, flush_interval: float = 1.0) -> None:
+        self.path: Path = Path(path)
+        self.max_bytes: int = max_bytes
+        self.backup_count: int = backup_count
+        self.flush_interval: float = flush_interval
+        self.start: float = time.monotonic()
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.file: TextIO = open(self.path, 'a', encoding='utf-8', buffering=1024 * 1024)
+        self.size: int = self.file.tell()
+        self.closed: bool = False
+        self.error: Optional[BaseException] = None
+        self.thread: threading.Thread = threading.Thread(target=self.run, name='trace-writer', daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, event: str, **fields: Any) -> None:
+        """Queue a record. This method does not perform any I/O."""
+        record: dict[str, Any] = {'event': event, 'time': round(time.monotonic() - self.start, 6)}
+        record.update(fields)
+        self.queue.put(record)
+
+    def flush(self) -> None:
+        """Wait until all the queued records are written to the disk."""
+        done: threading.Event = threading.Event()
+        self.queue.put(done)
+        # The event is never set if the background thread has stopped.
+        while not done.wait(self.flush_interval):
+            if not self.thread.is_alive():
+                break
+        self.check()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        self.closed = True
+        self.check()
+
+    def check(self) -> None:
+        """Raise the error of the background thread, if any."""
+        if self.error is not None:
+            raise RuntimeError('Unable to write the trace "{}": {}'.format(self.path, str(self.error))) from self.error
+
+    def rotate(self) -> None:
+        self.file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source: Path = Path('{}.{}'.format(self.path, i))
+            if source.exists():
+                os.replace(source, '{}.{}'.format(self.path, i + 1))
+        if self.backup_count > 0:
+            os.replace(self.path, '{}.1'.format(self.path))
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'a', encoding='utf-8', buffering=1024 * 1024)
+        self.size = 0
+
+    def write(self, record: dict[str, Any]) -> None:
+        line: str = json.dumps(record, ensure_ascii=False) + '\n'
+        self.file.write(line)
+        self.size += len(line.encode('utf-8'))
+        if self.size >= self.max_bytes:
+            self.rotate()
+
+    def run(self) -> None:
+        try:
+            self.loop()
+        except BaseException as e:
+            self.error = e
+
+    def loop(self) -> None:
+        last_flush: float = time.monotonic()
+        while True:
+            try:
+                item: Optional[Any] = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+            if item is None:
+                self.file.flush()
+                return
+            if isinstance(item, threading.Event):
+                self.file.flush()
+                last_flush = time.monotonic()
+                item.set()
+                continue
+            if item is not False:
+                self.write(item)
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.file.flush()
+                last_flush = time.monotonic()
@@ -1,27 +1,68 @@
 import json
+import time
+import uuid
 import string
 import random
-from typing import Optional, cast
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from collections import deque
+from typing import Any, Callable, Iterable, Optional, Tuple, Union, TYPE_CHECKING
 from pathlib import Path
 from .hasher import Hasher
 from .types import Vector, MessageType, Role
-from .chat_gpt import ChatGPT
-from .stegano_db import SteganoDb
-from .text_file_tool import read_sections_from_file
-from .config import Config
+from .rewriter import Rewriter, NoReformulationError, LLM_BACKENDS, create_rewriter
+from .stegano_db import SteganoDb, Section, MEMORY_DB
+from .hash_pool import HashPool
+from .params import FORMAT_CHAINED, FORMAT_COUNTER, FORMAT_MATRIX, MATRIX_GROUP_SIZE
+from .text_file_tool import read_sections_from_text, join_sections
+from .mapped_haystack import MappedHaystack
+from .config import Config, DEFAULT_BATCH_REQUEST
 from .prompt_builder import PromptBuilder
-from .conversion import Conversion
-from .types import Bit, Int16
+from .json_repair import extract_result, extract_result_list
+from .types import Bit
+from .revealer import Revealer, read_blocks
+from . import matrix
+from .recombination import combinations
+from .incremental import PreviousSection
+from .task_store import TaskStore, TaskResult, FAILED, STALL_TIMEOUT
+from .disk_list import DiskList, MEMORY_BUDGET, release
+from .prompt_governor import PromptGovernor
+from .candidates import CandidateHistory, NEW, DUPLICATE
 
 import whisper.message
 from dataclasses import dataclass
 
+if TYPE_CHECKING:
+    from .trace import TraceWriter
+    from .cassette import RecordingRewriter
+    from .hedging import HedgedRewriter
+
+# Default maximum number of reformulations of a section (each one has the expected parity with a probability of 1/2).
+MAX_ATTEMPTS: int = 64
+
 @dataclass
 class Params:
     token: str = None
     debug_path: Optional[str] = None
     verbose: bool = False
     dry_run: bool = False
+    backend: str = 'chatgpt'
+    hedge_percentile: Optional[float] = None
+    format_version: int = FORMAT_CHAINED
+    concurrency: int = 8
+    parse_retries: int = 1
+    batch_size: int = 1
+    group_size: int = MATRIX_GROUP_SIZE
+    recombination: bool = True
+    boundary_concurrency: int = 3
+    record_path: Optional[str] = None
+    replay_path: Optional[str] = None
+    replay_latency: bool = False
+    task_store: Optional[str] = None
+    task_timeout: Optional[float] = STALL_TIMEOUT
+    memory_budget: Optional[int] = MEMORY_BUDGET
+    batch_tokens: Optional[int] = None
+    max_attempts: Optional[int] = MAX_ATTEMPTS
 
 REQ_TEMPERATURE: float = 0.7
 
@@ -92,21 +133,99 @@ class Request:
 
 class Whisperer:
 
-    def __init__(self, params: Params, config: Config, db_path: Optional[str]=None) -> None:
+    def __init__(self, params: Params, config: Config, db_path: Optional[str]=None, rewriter: Optional[Rewriter]=None,
+                 hash_pool: Optional[HashPool]=None) -> None:
         """Initializes the Whisperer.
         The parameters are:
           - token: the token to use for the LLM. Set to None for testing using the dry-run mode.
           - debug_path: the path to the directory where the debug files will be stored.
           - verbose: whether to print verbose output.
           - dry_run: whether to use the dry-run mode.
-
-        Note: the parameter "debug_path" is only used for DEBUG purposes.
+          - backend: the name of the rewriter to use (see whisper.rewriter.BACKENDS).
+          - hedge_percentile: if not None, a duplicate request is sent to the rewriter when a request
+                              has not been answered within this percentile of the recently observed
+                              latencies (see whisper.hedging.HedgedRewriter).
+          - format_version: the format of the murmur (see whisper.params.FORMATS).
+          - concurrency: the maximum number of sections rewritten concurrently (1 to rewrite the sections
+                         one by one).
+          - parse_retries: the number of times a request is sent again when the response of the
+                           rewriter cannot be parsed (see whisper.json_repair.extract_result).
+          - batch_size: the maximum number of sections sent to the rewriter in a single request. The
+                        sections of a batch belong to the same key block (FORMAT_CHAINED).
+          - group_size: the number of sections of a group (FORMAT_MATRIX only, see whisper.matrix).
+          - recombination: whether the texts obtained by mixing the sentences of a section and of a
+                           reformulation are tried before sending another request (see whisper.recombination).
+          - boundary_concurrency: the number of concurrent requests sent for the last section of a key block
+                                  (FORMAT_CHAINED), since the next block cannot start before this section
+                                  is rewritten (see hide_chained_blocks).
+          - record_path: if not None, the responses of the rewriter are recorded in this cassette.
+          - replay_path: if not None, the responses are served by this cassette instead of the rewriter
+                         (see whisper.cassette).
+          - replay_latency: whether the replayed responses are delayed by their recorded latencies.
+          - task_store: if not None, the path to a shared store of tasks (see whisper.task_store). The sections
+                        are not rewritten by this process, but by workers (see whisper.worker): the Whisperer
+                        only hashes the original sections, advances the key schedule and assembles the murmur.
+          - task_timeout: the delay (in seconds) after which the hide fails if the tasks given to the workers
+                          make no progress (see TaskStore.wait). None: wait forever.
+          - memory_budget: the size (in bytes) above which the sections of a haystack held in memory (see
+                           hide_text) are spilled to disk (see whisper.disk_list.DiskList).
+                           None: no limit. A haystack file is mapped in memory (see SteganoDb.attach).
+          - batch_tokens: if not None, the maximum number of tokens of the sections of a batch (see batch_size).
+          - max_attempts: the maximum number of reformulations (duplicates included) received for a section.
+                          When it is reached, the hide fails (see check_attempts). None: no limit.
+
+        The requests are measured and bounded by a PromptGovernor (see whisper.prompt_governor), configured
+        by the configuration ("max_previous_tokens" and "output_token_ratio").
+
+        The rewriter used to reformulate the text sections can be given explicitly. In this case,
+        the parameter "backend" is ignored. Likewise, a pool of hashing workers (shared between several
+        Whisperers) can be given.
+
+        Note: the parameter "debug_path" is only used for DEBUG purposes. In debug mode, the requests,
+              the responses, the timings and the parities are recorded in the file "trace.jsonl".
         """
-        self.chat_gpt: ChatGPT = ChatGPT(config.model, params.token)
+        if params.batch_size < 1:
+            raise ValueError("Invalid batch size: {} (must be at least 1).".format(params.batch_size))
+        if params.concurrency < 1 or params.boundary_concurrency < 1:
+            raise ValueError("Invalid concurrency: {} / {} (must be at least 1).".format(params.concurrency, params.boundary_concurrency))
+        if params.group_size < matrix.COLUMNS:
+            raise ValueError("Invalid group size: {} (must be at least {}).".format(params.group_size, matrix.COLUMNS))
+        self.recorder: Optional['RecordingRewriter'] = None
+        if params.replay_path is not None:
+            from .cassette import ReplayRewriter
+            rewriter = ReplayRewriter(params.replay_path, params.replay_latency)
+        elif rewriter is None:
+            rewriter = create_rewriter(params.backend, config.model, params.token, config.structured_output,
+                                       config.endpoints, config.routing)
+        if params.record_path is not None:
+            from .cassette import RecordingRewriter
+            self.recorder = RecordingRewriter(rewriter, params.record_path)
+            rewriter = self.recorder
+        self.hedged: Optional['HedgedRewriter'] = None
+        if params.hedge_percentile is not None:
+            from .hedging import HedgedRewriter
+            # A request and its duplicate for each concurrent caller (the workers and the boundary requests).
+            self.hedged = HedgedRewriter(rewriter, params.hedge_percentile,
+                                         max_workers=2 * (params.concurrency + params.boundary_concurrency))
+            rewriter = self.hedged
+        self.rewriter: Rewriter = rewriter
         self.debug_path: Optional[Path] = Path(params.debug_path) if params.debug_path is not None else None
         self.params: Params = params
         self.config: Config = config
+        self.hash_pool: Optional[HashPool] = hash_pool
         self.call_count: int = 0
+        self.reused_count: int = 0
+        self.duplicate_count: int = 0
+        self.variant_count: int = 0
+        self.governor: PromptGovernor = PromptGovernor(config.model, config.max_previous_tokens, config.output_token_ratio)
+        self.previous: dict[int, str] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.trace: Optional['TraceWriter'] = None
+        self.task_store: Optional[TaskStore] = TaskStore(params.task_store) if params.task_store is not None else None
+        self.hide_id: str = uuid.uuid4().hex
+        if self.debug_path is not None:
+            from .trace import TraceWriter
+            self.trace = TraceWriter(self.debug_path.joinpath('trace.jsonl').__str__())
 
         # Create or open the database.
         if db_path is None:
@@ -115,14 +234,18 @@ class Whisperer:
                 stegano_db_path = self.debug_path.joinpath('stegano-db.sqlite')
             self.db: SteganoDb = SteganoDb(stegano_db_path.__str__() if stegano_db_path is not None else None)
         else:
-            self.db: SteganoDb = SteganoDb(db_path, init=False)
+            # An in-memory database is always empty.
+            self.db: SteganoDb = SteganoDb(db_path, init=db_path == MEMORY_DB)
 
-    def generate_single_message_request(self, text: str, last_reformulation: Optional[str]) -> Request:
-        if last_reformulation is None:
+    def generate_single_message_request(self, text: str, reformulations: list[str]) -> Request:
+        """Generate a request for a reformulation of the text. The rejected reformulations (see
+        whisper.candidates.CandidateHistory.history) are given to the LLM, so that it does not produce them again."""
+        if len(reformulations) == 0:
             req_system: str = self.config.system['first_request']
         else:
             prompt_builder: PromptBuilder = PromptBuilder(self.config.system['next_requests'])
-            req_system = prompt_builder.generate_prompt({'__PREVIOUS__': last_reformulation})
+            previous: str = '\n\n'.join(self.governor.previous(reformulation) for reformulation in reformulations)
+            req_system = prompt_builder.generate_prompt({'__PREVIOUS__': previous})
 
         messages: list[Message] = [
             Message(MessageType.SYSTEM, req_system),
@@ -130,145 +253,610 @@ class Whisperer:
         ]
         return Request(messages)
 
-    def save_request_for_debug(self, request: Request, call_count: int) -> None:
-        if self.debug_path is None:
-            return
-        debug_path: Path = self.debug_path.joinpath('request-{}.json'.format(call_count))
-        with open(debug_path, 'w') as f:
-            f.write('REQUEST:\n\n')
-            f.write(json.dumps(request.to_dict(), indent=2, ensure_ascii=False))
+    def generate_conversation_request(self, text: str, reformulations: list[str]) -> Request:
+        """Generate a request that continues the first request: each rejected reformulation (only the most
+        recent ones, see whisper.candidates.CandidateHistory.history) is given back as an answer of the
+        assistant, followed by a request for another one, so that the size of the requests is bounded.
+        The reformulations are given back in full, so that the LLM is not taught to produce truncated answers."""
+        messages: list[Message] = [
+            Message(MessageType.SYSTEM, self.config.system['first_request']),
+            Message(MessageType.USER, text)
+        ]
+        for reformulation in reformulations:
+            messages.append(Message(MessageType.ASSISTANT, json.dumps({'result': reformulation}, ensure_ascii=False)))
+            messages.append(Message(MessageType.USER, self.config.retry_request))
+        return Request(messages)
 
-    def save_response_for_debug(self, response: str,  call_count: int) -> None:
-        if self.debug_path is None:
-            return
-        debug_path: Path = self.debug_path.joinpath('request-{}.json'.format(call_count))
-        with open(debug_path, 'a') as f:
-            f.write('\n\nRESPONSE:\n\n')
-            f.write(json.dumps(response, indent=2, ensure_ascii=False))
+    def generate_batch_request(self, texts: list[str]) -> Request:
+        messages: list[Message] = [
+            Message(MessageType.SYSTEM, self.config.system.get('batch_request', DEFAULT_BATCH_REQUEST)),
+            Message(MessageType.USER, json.dumps(texts, ensure_ascii=False))
+        ]
+        return Request(messages)
 
-    def exec_request(self, request: Request) -> str:
-        self.save_request_for_debug(request, self.call_count)
+    def close(self) -> None:
+        """Release the resources held by the Whisperer (the hedging threads, the debug trace, the cassette and the tasks of the hide)."""
+        if self.task_store is not None:
+            self.task_store.remove(self.hide_id)
+        if self.hedged is not None:
+            # Before the cassette, which records the responses of the running requests.
+            self.hedged.close()
+            self.hedged = None
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def trace_parity(self, position: int, algorithm: str, h: bytes, bit: int, expected_bit: Optional[Bit], duration: Optional[float] = None) -> None:
+        if self.trace is not None:
+            self.trace.record('parity', position=position, algo=algorithm, hash=h.hex(), bit=bit, expected_bit=expected_bit,
+                              duration=round(duration, 6) if duration is not None else None)
+
+    def get_parity(self, hasher: Hasher, algorithm: str, text: str, position: int, expected_bit: Optional[Bit]) -> Tuple[bytes, int]:
+        start: float = time.monotonic()
+        h, bit = hasher.get_parity(algorithm, text)
+        self.trace_parity(position, algorithm, h, bit, expected_bit, time.monotonic() - start)
+        return h, bit
+
+    def exec_request(self, request: Request, position: Union[int, list[int], None] = None,
+                     parse: Callable[[str], Any] = extract_result, max_tokens: Optional[int] = None) -> Any:
+        """Send the request to the rewriter and return the reformulation (as returned by "parse").
+        Unparsable responses are repaired if possible, otherwise the request is sent again
+        (at most "parse_retries" times). The tokens of the requests and of the responses are counted
+        by the governor, unless the backend is not an LLM (see whisper.rewriter.LLM_BACKENDS)."""
         d: list[dict[str, str]] = request.to_dict()
-        try:
-            response: str = self.chat_gpt.call(d)
-        except Exception as e:
-            raise RuntimeError("Error calling the LLM: {}".format(str(e)))
-        self.save_response_for_debug(response, self.call_count)
-        result: str = json.loads(response)['result']
-        self.call_count += 1
-        return result
+        accounting: bool = self.params.backend in LLM_BACKENDS
+        input_tokens: Optional[int] = self.governor.count_messages(d) if accounting else None
+        attempt: int = 0
+        while True:
+            if self.trace is not None:
+                self.trace.record('request', call=self.call_count, position=position, messages=d, input_tokens=input_tokens,
+                                  max_tokens=max_tokens)
+            start: float = time.monotonic()
+            try:
+                response: str = self.rewriter.call(d, max_tokens)
+            except NoReformulationError:
+                raise
+            except Exception as e:
+                raise RuntimeError("Error calling the LLM: {}".format(str(e)))
+            output_tokens: Optional[int] = None
+            if accounting:
+                output_tokens = self.governor.count(response)
+                self.governor.record(input_tokens, output_tokens)
+            if self.trace is not None:
+                self.trace.record('response', call=self.call_count, position=position, response=response,
+                                  latency=round(time.monotonic() - start, 6), output_tokens=output_tokens)
+            try:
+                return parse(response)
+            except ValueError as e:
+                if self.trace is not None:
+                    self.trace.record('invalid_response', call=self.call_count, position=position, attempt=attempt)
+                if attempt >= self.params.parse_retries:
+                    raise RuntimeError("Invalid response from the LLM: {}".format(str(e)))
+                attempt += 1
+
+    def hide(self, needle: str, haystack: str, secret_key: str, output_path: str,
+             previous: Optional[dict[int, PreviousSection]] = None) -> None:
+        """Hide the needle in the haystack.
+
+        If the sections of a previous hide of the same haystack are given (see whisper.incremental.load_previous),
+        the previous text of a section is tried before asking the rewriter for a reformulation. With the same key,
+        all the sections that carry the same bits as before are reused without any request.
+        """
+        m: Vector = whisper.message.Message.load_text_file_as_vector(needle, length=16)
+        self.hide_sections(m, self.db.attach(haystack), Path(haystack).stat().st_size, secret_key, previous, needle, haystack)
+        self.write_murmur(output_path)
 
-    def hide(self, needle: str, haystack: str, secret_key: str, output_path: str) -> None:
-        # Load the input text.
-        position: int = 0
-        for section in read_sections_from_file(haystack):
-            self.db.add_original_text(position, section)
-            position += 1
+        # self.db.destroy()
 
-        # Load the message to hide.
-        m: Vector = whisper.message.Message.load_text_file_as_vector(needle, length=16)
-        position = 0
-        for b in m:
-            self.db.set_expected_bit(position, b)
-            position += 1
+    def write_murmur(self, output_path: str) -> None:
+        """Create the output file, once the sections have been rewritten (the unchanged sections of a
+        haystack file are copied from the mapped haystack, see SteganoDb.get_output)."""
+        with open(output_path, 'wb') as f:
+            for chunk in self.db.get_output():
+                f.write(chunk)
+
+        if self.trace is not None:
+            self.trace.flush()
+
+    def hide_text(self, needle: bytes, haystack: str, secret_key: str,
+                  previous: Optional[dict[int, PreviousSection]] = None) -> str:
+        """Hide the needle (ASCII text) in the haystack, and return the murmur (see hide).
+        No file is read or written, except the database of the Whisperer (see whisper.text_api)."""
+        m: Vector = whisper.message.Message.bytes_to_vector(needle, length=16)
+        self.hide_sections(m, read_sections_from_text(haystack), len(haystack), secret_key, previous)
+        if self.trace is not None:
+            self.trace.flush()
+        return join_sections(section.traduction if section.traduction is not None else '-' for section in self.db.get_sections())
+
+    def hide_sections(self, vector: Vector, sections: Union[Iterable[str], MappedHaystack], size: int, secret_key: str,
+                      previous: Optional[dict[int, PreviousSection]], needle: str = 'needle', haystack: str = 'haystack') -> None:
+        """Hide the bits of the message in the sections of the haystack, whose size (in bytes) is given.
+        The sections of a mapped haystack are already in the database (see SteganoDb.attach).
+        The names of the needle and of the haystack are only used by the error messages."""
+        budget: Optional[int] = self.params.memory_budget
+        if isinstance(sections, MappedHaystack):
+            self.load_previous(previous, haystack, sections)
+        else:
+            # Load the input text (large haystacks are spilled to disk).
+            position: int = 0
+            originals: Union[list[str], DiskList] = [] if budget is None or size <= budget else DiskList()
+            try:
+                for section in sections:
+                    self.db.add_original_text(position, section)
+                    originals.append(section)
+                    position += 1
+                self.load_previous(previous, haystack, originals)
+            finally:
+                release(originals)
+
+        # Hide the message. It is not spilled to disk: it is already in memory, and it is much smaller than the haystack.
+        # With the format FORMAT_MATRIX, the expected bits of the sections depend on their parities (see hide_counter).
+        self.hide_message(needle, haystack, secret_key, vector)
+
+    def load_previous(self, previous: Optional[dict[int, PreviousSection]], haystack: str,
+                      originals: Union[list[str], DiskList, MappedHaystack]) -> None:
+        """Keep the texts of the previous hide that can be tried (see try_previous)."""
+        self.previous = {}
+        if previous is not None:
+            if any(p.original_text is None for p in previous.values()) and len(previous) != len(originals):
+                raise ValueError('The previous murmur does not match the haystack "{}" ({} sections instead of {}).'.format(
+                    haystack, len(previous), len(originals)))
+            self.previous = {position: p.text for position, p in previous.items()
+                             if position < len(originals) and p.original_text in (None, originals[position])
+                             and p.text != originals[position]}
+
+    def hide_message(self, needle: str, haystack: str, secret_key: str, m: Vector) -> None:
+        """Rewrite the sections of the haystack (already loaded in the database) so that they carry the bits."""
+        needed: int = len(m)
+        if self.params.format_version == FORMAT_MATRIX:
+            needed = matrix.sections_needed(len(m), self.params.group_size)
+        else:
+            position: int = 0
+            for b in m:
+                self.db.set_expected_bit(position, b)
+                position += 1
 
         # Sanity checks.
-        if len(m) > len(self.db):
-            raise ValueError('The message to hide ({}) is too long (needs {} text sections, but if haystack "{}" is only {} text sections)'.format(needle, len(m), haystack, len(self.db)))
+        if needed > len(self.db):
+            raise ValueError('The message to hide ({}) is too long (needs {} text sections, but if haystack "{}" is only {} text sections)'.format(needle, needed, haystack, len(self.db)))
 
-        # Initialize the hasher.
-        hasher: Hasher = Hasher(secret_key)
+        if self.params.format_version == FORMAT_MATRIX:
+            self.hide_counter(secret_key, needed, m)
+        elif self.params.format_version == FORMAT_COUNTER:
+            self.hide_counter(secret_key, needed)
+        else:
+            self.hide_chained(secret_key, needed)
+        # The extra sections carry no bit: they are kept without being hashed.
+        self.db.set_unchanged_from(needed)
+
+    def print_section(self, section: Section, h: bytes, bit: int) -> None:
+        print("%s" % ('-' * 80))
+        print("=== %d ===\n\n%s\n\n" % (section.position, section.original_text))
+        print("   bit:   {} / {}".format(bit, section.expected_bit))
+        print("   hash:  %s\n" % (h.hex()))
+
+    def reuse_previous(self, hasher: Hasher, items: list[Tuple[Section, str]]) -> Tuple[list[Tuple[Section, str, str, bytes]], list[Tuple[Section, str]]]:
+        """Try the texts of the previous hide for the given (section, algorithm).
+        Return the (section, algorithm, text, hash) of the reused sections, and the remaining (section, algorithm)."""
+        candidates: list[Tuple[Section, str]] = [item for item in items if item[0].position in self.previous]
+        if len(candidates) == 0:
+            return [], items
+        hashes: list[bytes] = hasher.hash_many([(algorithm, self.previous[section.position]) for section, algorithm in candidates])
+        reused: list[Tuple[Section, str, str, bytes]] = []
+        for (section, algorithm), h in zip(candidates, hashes):
+            if Hasher.parity(h) == section.expected_bit:
+                reused.append((section, algorithm, self.previous[section.position], h))
+                self.trace_parity(section.position, algorithm, h, section.expected_bit, section.expected_bit)
+                if self.trace is not None:
+                    self.trace.record('reuse', position=section.position)
+        positions: set[int] = {section.position for section, _, _, _ in reused}
+        with self.lock:
+            self.reused_count += len(reused)
+        if self.params.verbose and len(reused) > 0:
+            print("Reused sections: {}".format(sorted(positions)))
+        return reused, [item for item in items if item[0].position not in positions]
+
+    def check_candidate(self, history: CandidateHistory, section: Section, text: str) -> bool:
+        """Add a reformulation to the candidates of the section. Return False if it has already been tried
+        (its parity is known to be wrong, so it is not hashed again)."""
+        kind: str = history.add(text)
+        if kind == NEW:
+            return True
+        with self.lock:
+            if kind == DUPLICATE:
+                self.duplicate_count += 1
+            else:
+                self.variant_count += 1
+        if self.trace is not None:
+            self.trace.record('duplicate', position=section.position, kind=kind)
+        if self.params.verbose:
+            print("-> ({})\n\n{}\n\n".format(kind, text))
+        if kind == DUPLICATE:
+            # The same request would probably get the same answer.
+            history.repeat(text)
+        return kind != DUPLICATE
+
+    def check_attempts(self, history: CandidateHistory, section: Section) -> None:
+        """Raise an error if the maximum number of reformulations of the section has been reached."""
+        if self.params.max_attempts is not None and history.attempts >= self.params.max_attempts:
+            raise RuntimeError("Unable to rewrite the section {}: no reformulation with the expected parity after {} attempts "
+                               "({} duplicates).".format(section.position, history.attempts, history.duplicates))
+
+    def recombine(self, hasher: Hasher, section: Section, algorithm: str, reformulation: str) -> Optional[Tuple[str, bytes]]:
+        """Look for a combination of the sentences of the section and of the (unsuitable) reformulation that has the
+        expected parity. Return the combination and its hash, or None. No request is sent to the rewriter."""
+        if not self.params.recombination:
+            return None
+        texts: list[str] = combinations(section.original_text, reformulation)
+        if len(texts) == 0:
+            return None
+        hashes: list[bytes] = hasher.hash_many([(algorithm, text) for text in texts])
+        if self.trace is not None:
+            self.trace.record('recombination', position=section.position, candidates=len(texts))
+        for text, h in zip(texts, hashes):
+            bit: int = Hasher.parity(h)
+            if bit == section.expected_bit:
+                self.trace_parity(section.position, algorithm, h, bit, section.expected_bit)
+                if self.params.verbose:
+                    print("-> (recombination)\n\n%s\n\n" % text)
+                return text, h
+        return None
+
+    def request_reformulations(self, request: Request, position: int, count: int, max_tokens: Optional[int] = None) -> list[str]:
+        """Send the same request "count" times concurrently, and return the reformulations."""
+        if self.params.dry_run:
+            return [''.join(random.choice(string.ascii_letters + string.digits) for _ in range(30)) for _ in range(count)]
+        if count == 1:
+            return [self.exec_request(request, position, max_tokens=max_tokens)]
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            return list(executor.map(lambda _: self.exec_request(request, position, max_tokens=max_tokens), range(count)))
+
+    def rewrite_section(self, hasher: Hasher, section: Section, algorithm: str, width: int = 1,
+                        history: Optional[CandidateHistory] = None) -> Tuple[str, bytes]:
+        """Ask for reformulations of a section until one of them (or one of their combinations with
+        the section, see recombine) has the expected parity. Return the reformulation and its hash.
+        At each attempt, "width" requests are sent concurrently. The candidates already tried (for example
+        in a batch) can be given.
+
+        The reformulations already tried are neither hashed again nor given twice to the LLM (see check_candidate).
+        A RuntimeError is raised after "max_attempts" reformulations (see check_attempts), or as soon as the
+        rewriter has no new reformulation of the section (see whisper.rewriter.NoReformulationError).
+
+        This method does not access the database, so that several sections can be rewritten concurrently.
+        """
+        if history is None:
+            history = CandidateHistory(section.original_text)
+        max_tokens: Optional[int] = self.governor.max_output_tokens([section.original_text])
+        while True:
+            request: Request
+            if self.config.retry_strategy == 'conversation':
+                request = self.generate_conversation_request(section.original_text, history.history())
+            else:
+                request = self.generate_single_message_request(section.original_text, history.history())
+
+            try:
+                reformulations: list[str] = self.request_reformulations(request, section.position, width, max_tokens)
+            except NoReformulationError as e:
+                raise RuntimeError("Unable to rewrite the section {}: {} ({} attempts).".format(section.position, str(e), history.attempts))
+            for reformulation in reformulations:
+                with self.lock:
+                    self.call_count += 1
+                if not self.check_candidate(history, section, reformulation):
+                    self.check_attempts(history, section)
+                    continue
+                h, bit = self.get_parity(hasher, algorithm, reformulation, section.position, section.expected_bit)
 
-        # Call the LLM.
-        last_hash: Optional[bytes] = None
-        for section in self.db.get_sections():
-            algorithm: str = hasher.next_hash_algorithm(last_hash)
-            h, bit = (hasher.get_parity(algorithm, section.original_text))
+                if self.params.verbose:
+                    print("-> \n\n%s\n\n" % reformulation)
+                    print("   bit:   {} / {}".format(bit, section.expected_bit))
+                    print("   hash:  %s\n" % (h.hex()))
 
+                if bit == section.expected_bit:
+                    return reformulation, h
+                found: Optional[Tuple[str, bytes]] = self.recombine(hasher, section, algorithm, reformulation)
+                if found is not None:
+                    return found
+                history.reject(reformulation)
+                self.check_attempts(history, section)
+
+    def distribute(self, hasher: Hasher, items: list[Tuple[Section, str]], priority: int = 0) -> list[Tuple[Section, str, str, bytes]]:
+        """Add the given (section, algorithm) to the task store, and wait until the workers have rewritten them.
+        Return the (section, algorithm, reformulation, hash) of all the items. The hashes given by the workers
+        are computed again, so that an invalid result cannot corrupt the murmur."""
+        if len(items) == 0:
+            return []
+        ids: list[int] = self.task_store.add(self.hide_id, [(section.position, algorithm, section.expected_bit, section.original_text)
+                                                            for section, algorithm in items], priority)
+        if self.trace is not None:
+            self.trace.record('distribute', positions=[section.position for section, _ in items], priority=priority)
+        results: list[TaskResult] = self.task_store.wait(ids, stall_timeout=self.params.task_timeout)
+        for (section, _), result in zip(items, results):
+            if result.status == FAILED:
+                raise RuntimeError("Unable to rewrite the section {}: {}".format(section.position, result.error))
+        hashes: list[bytes] = hasher.hash_many([(algorithm, result.text) for (_, algorithm), result in zip(items, results)])
+        done: list[Tuple[Section, str, str, bytes]] = []
+        for (section, algorithm), result, h in zip(items, results, hashes):
+            bit: int = Hasher.parity(h)
+            self.trace_parity(section.position, algorithm, h, bit, section.expected_bit)
+            if bit != section.expected_bit:
+                raise RuntimeError("Invalid result of a worker for the section {} (bit {} instead of {}).".format(
+                    section.position, bit, section.expected_bit))
+            if self.params.verbose:
+                print("-> (worker, section {})\n\n{}\n\n".format(section.position, result.text))
+            done.append((section, algorithm, result.text, h))
+        return done
+
+    def rewrite_sections(self, hasher: Hasher, items: list[Tuple[Section, str]]) -> list[Tuple[Section, str, str, bytes]]:
+        """Rewrite the given (section, algorithm) one by one (or by batches, see rewrite_batches).
+        With a task store, the sections are rewritten by the workers (see distribute).
+        Return the (section, algorithm, reformulation, hash) of all the items."""
+        if self.task_store is not None:
+            return self.distribute(hasher, items)
+        if self.params.batch_size > 1:
+            return self.rewrite_batches(hasher, items)
+        return [(section, algorithm) + self.rewrite_section(hasher, section, algorithm) for section, algorithm in items]
+
+    def rewrite_batch(self, hasher: Hasher, items: list[Tuple[Section, str]],
+                      histories: Optional[dict[int, CandidateHistory]] = None) -> list[Optional[Tuple[str, bytes]]]:
+        """Ask for a reformulation of each of the given (section, algorithm) in a single request.
+        Return, for each item, the reformulation and its hash, or None if the reformulation does not have
+        the expected parity (or is missing from the response, or has already been tried according to the
+        histories of the sections)."""
+        texts: list[str] = [section.original_text for section, _ in items]
+        positions: list[int] = [section.position for section, _ in items]
+        if self.params.dry_run:
+            reformulations: list[Optional[str]] = [''.join(random.choice(string.ascii_letters + string.digits) for _ in range(30))
+                                                   for _ in items]
+        else:
+            reformulations = self.exec_request(self.generate_batch_request(texts), positions, extract_result_list,
+                                               self.governor.max_output_tokens(texts))
+        reformulations = (reformulations + [None] * len(items))[:len(items)]
+        with self.lock:
+            self.call_count += 1
+
+        if histories is None:
+            histories = {}
+        candidates: list[int] = []
+        for i, reformulation in enumerate(reformulations):
+            history: CandidateHistory = histories.setdefault(items[i][0].position, CandidateHistory(texts[i]))
+            if reformulation is None:
+                # A missing reformulation counts as an attempt.
+                history.attempts += 1
+            elif self.check_candidate(history, items[i][0], reformulation):
+                candidates.append(i)
+        hashes: list[bytes] = hasher.hash_many([(items[i][1], reformulations[i]) for i in candidates])
+        results: list[Optional[Tuple[str, bytes]]] = [None] * len(items)
+        for i, h in zip(candidates, hashes):
+            section, algorithm = items[i]
+            bit: int = Hasher.parity(h)
+            self.trace_parity(section.position, algorithm, h, bit, section.expected_bit)
             if self.params.verbose:
-                print("%s" % ('-' * 80))
-                print("=== %d ===\n\n%s\n\n" % (section.position, section.original_text))
+                print("-> \n\n%s\n\n" % reformulations[i])
                 print("   bit:   {} / {}".format(bit, section.expected_bit))
                 print("   hash:  %s\n" % (h.hex()))
+            if bit == section.expected_bit:
+                results[i] = (reformulations[i], h)
+            else:
+                results[i] = self.recombine(hasher, section, algorithm, reformulations[i])
+                if results[i] is None:
+                    histories[section.position].reject(reformulations[i])
+        for (section, _), result in zip(items, results):
+            if result is None:
+                self.check_attempts(histories[section.position], section)
+        return results
+
+    def batch_full(self, batch: list[Tuple[Section, str]], item: Tuple[Section, str]) -> bool:
+        """Return True if the item cannot be added to the batch without exceeding "batch_tokens" (a batch
+        contains at least one item)."""
+        if self.params.batch_tokens is None or len(batch) == 0:
+            return False
+        tokens: int = sum(self.governor.count(section.original_text) for section, _ in batch + [item])
+        return tokens > self.params.batch_tokens
+
+    def rewrite_batches(self, hasher: Hasher, items: list[Tuple[Section, str]]) -> list[Tuple[Section, str, str, bytes]]:
+        """Rewrite the given (section, algorithm) by batches of "batch_size" sections (and at most "batch_tokens"
+        tokens), using "concurrency" workers.
+        The sections of a batch that do not get the expected parity are kept in the next batch of the same
+        worker, which is completed with sections that have not been submitted yet. The batch requests do not
+        contain the rejected reformulations: once a section gets a duplicate, it is rewritten alone (see
+        rewrite_section), with its history.
+        Return the (section, algorithm, reformulation, hash) of all the items.
+
+        This method does not access the database.
+        """
+        queue: deque[Tuple[Section, str]] = deque(items)
+        queue_lock: threading.Lock = threading.Lock()
+        # A section is only in the batch of a single worker at a time.
+        histories: dict[int, CandidateHistory] = {section.position: CandidateHistory(section.original_text) for section, _ in items}
+
+        def work() -> list[Tuple[Section, str, str, bytes]]:
+            done: list[Tuple[Section, str, str, bytes]] = []
+            batch: list[Tuple[Section, str]] = []
+            while True:
+                with queue_lock:
+                    while len(batch) < self.params.batch_size and len(queue) > 0 and not self.batch_full(batch, queue[0]):
+                        batch.append(queue.popleft())
+                if len(batch) == 0:
+                    return done
+                results: list[Optional[Tuple[str, bytes]]] = self.rewrite_batch(hasher, batch, histories)
+                done += [(section, algorithm) + result for (section, algorithm), result in zip(batch, results) if result is not None]
+                batch = [item for item, result in zip(batch, results) if result is None]
+                for section, algorithm in [item for item in batch if histories[item[0].position].duplicates > 0]:
+                    done.append((section, algorithm) + self.rewrite_section(hasher, section, algorithm,
+                                                                            history=histories[section.position]))
+                batch = [item for item in batch if histories[item[0].position].duplicates == 0]
+
+        workers: int = min(self.params.concurrency, -(-len(items) // self.params.batch_size))
+        if workers <= 1:
+            return work()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures: list[Future] = [executor.submit(work) for _ in range(workers)]
+            return [result for future in futures for result in future.result()]
+
+    def hide_chained(self, secret_key: str, needed: int) -> None:
+        """Rewrite the "needed" first sections using the format FORMAT_CHAINED. The sections are processed one by one,
+        unless the sections can be rewritten concurrently, by batches or by workers (see hide_chained_blocks)."""
+        if self.params.concurrency > 1 or self.params.batch_size > 1 or self.task_store is not None:
+            self.hide_chained_blocks(secret_key, needed)
+            return
+        hasher: Hasher = Hasher(secret_key, hash_pool=self.hash_pool)
+        last_hash: Optional[bytes] = None
+        for section in self.db.get_sections(needed):
+            algorithm: str = hasher.next_hash_algorithm(last_hash)
+            h, bit = self.get_parity(hasher, algorithm, section.original_text, section.position, section.expected_bit)
+
+            if self.params.verbose:
+                self.print_section(section, h, bit)
 
             if section.expected_bit is None or bit == section.expected_bit:
                 # The original text section is already suitable for the expected bit, or is an extra text section.
-                self.db.set_traduction(section.position, section.original_text, algorithm, h)
+                self.db.set_unchanged(section.position, algorithm, h)
                 last_hash = h
                 continue
 
             # The original text is not suitable for the expected bit. It needs to be reformatted.
-            last_reformulation: Optional[str] = None
-            while True:
-                request: Request = self.generate_single_message_request(section.original_text, last_reformulation)
-                if self.debug_path is not None:
-                    self.save_request_for_debug(request, self.call_count)
-
-                if self.params.dry_run:
-                    reformulation: str = ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(30))
-                else:
-                    reformulation: str = self.exec_request(request)
-
-                self.call_count += 1
-                h, bit = hasher.get_parity(algorithm, reformulation)
-
-                if self.params.verbose:
-                    print("-> \n\n%s\n\n" % reformulation)
-                    print("   bit:   {} / {}".format(bit, section.expected_bit))
-                    print("   hash:  %s\n" % (h.hex()))
-
-                if bit == section.expected_bit:
-                    self.db.set_traduction(section.position, reformulation, algorithm, h)
-                    last_hash = h
-                    break
-                last_reformulation = reformulation
-
-        # Create the output file.
-        with open(output_path, 'w') as f:
-            for section in self.db.get_sections():
-                f.write((section.traduction if section.traduction is not None else '-') + '\n\n')
-
-        # self.db.destroy()
+            reused, _ = self.reuse_previous(hasher, [(section, algorithm)])
+            if len(reused) > 0:
+                _, _, reformulation, h = reused[0]
+            else:
+                reformulation, h = self.rewrite_section(hasher, section, algorithm)
+            self.db.set_traduction(section.position, reformulation, algorithm, h)
+            last_hash = h
 
-class Revealer:
+    def hide_chained_blocks(self, secret_key: str, needed: int) -> None:
+        """Rewrite the "needed" first sections using the format FORMAT_CHAINED, block by block.
 
-    def __init__(self, murmur: str, reveal_path: str, secret_key: str, verbose: bool = False) -> None:
-        self.murmur: str = murmur
-        self.reveal_path: str = reveal_path
-        self.verbose: bool = verbose
-        self.secret_key: str = secret_key
+        The algorithms of a block of KEY_LENGTH sections only depend on the hash of the last section of the
+        previous block (the boundary section). Thus, the boundary sections are the critical path: once the
+        boundary section of a block is rewritten (with "boundary_concurrency" concurrent requests), the next
+        block is processed, while the other sections of the block are rewritten in the background
+        ("concurrency" workers, by batches if "batch_size" is greater than 1).
 
-    def reveal(self) -> None:
-        hasher: Hasher = Hasher(self.secret_key)
+        With a task store, all the sections are rewritten by the workers, and the boundary sections are
+        leased first.
+        """
+        hash_pool: HashPool = self.hash_pool if self.hash_pool is not None else HashPool(self.params.concurrency)
+        hasher: Hasher = Hasher(secret_key, hash_pool=hash_pool)
         last_hash: Optional[bytes] = None
-        bits: list[Bit] = []
+        background: list[Future] = []
+
+        def collect(wait: bool) -> list[Future]:
+            # The database is only accessed by this thread.
+            pending: list[Future] = []
+            for future in background:
+                if not wait and not future.done():
+                    pending.append(future)
+                    continue
+                for section, algorithm, reformulation, h in future.result():
+                    self.db.set_traduction(section.position, reformulation, algorithm, h)
+            return pending
 
-        count: int = 0
-        for text in read_sections_from_file(self.murmur):
-            count += 1
-            algorithm: str = hasher.next_hash_algorithm(last_hash)
-            h, bit = hasher.get_parity(algorithm, text)
-            if self.verbose:
-                print("%-4d algorithm: %s" % (count, algorithm))
-                print("     hash: {}".format(h.hex()))
-                print("     bit:  {}\n\n".format(bit))
-                print("{}\n\n".format(text))
+        try:
+            with ThreadPoolExecutor(max_workers=self.params.concurrency) as executor:
+                for block in read_blocks(self.db.get_sections(needed)):
+                    algorithms: list[str] = [hasher.next_hash_algorithm(last_hash) for _ in block]
+                    hashes: list[bytes] = hasher.hash_many([(algorithm, section.original_text) for algorithm, section in zip(algorithms, block)])
+
+                    mismatches: list[Tuple[Section, str]] = []
+                    for section, algorithm, h in zip(block, algorithms, hashes):
+                        bit: int = Hasher.parity(h)
+                        self.trace_parity(section.position, algorithm, h, bit, section.expected_bit)
+                        if self.params.verbose:
+                            self.print_section(section, h, bit)
+                        if section.expected_bit is None or bit == section.expected_bit:
+                            self.db.set_unchanged(section.position, algorithm, h)
+                        else:
+                            mismatches.append((section, algorithm))
+
+                    last_hash = hashes[-1]
+                    reused, mismatches = self.reuse_previous(hasher, mismatches)
+                    for section, algorithm, text, h in reused:
+                        self.db.set_traduction(section.position, text, algorithm, h)
+                        if section is block[-1]:
+                            last_hash = h
+                    boundary: Optional[Tuple[Section, str]] = None
+                    if len(mismatches) > 0 and mismatches[-1][0] is block[-1]:
+                        boundary = mismatches.pop()
+                    if self.params.batch_size > 1 or self.task_store is not None:
+                        if len(mismatches) > 0:
+                            background.append(executor.submit(self.rewrite_sections, hasher, mismatches))
+                    else:
+                        background += [executor.submit(self.rewrite_sections, hasher, [item]) for item in mismatches]
+                    if boundary is not None:
+                        section, algorithm = boundary
+                        if self.task_store is not None:
+                            _, _, reformulation, last_hash = self.distribute(hasher, [boundary], priority=1)[0]
+                        else:
+                            reformulation, last_hash = self.rewrite_section(hasher, section, algorithm, self.params.boundary_concurrency)
+                        self.db.set_traduction(section.position, reformulation, algorithm, last_hash)
+                    background = collect(False)
+                collect(True)
+        finally:
+            if hash_pool is not self.hash_pool:
+                hash_pool.close()
+
+    def set_matrix_bits(self, sections: list[Section], hashes: list[bytes], message: Vector) -> list[Section]:
+        """Set the expected bits of the sections that carry the message (FORMAT_MATRIX).
+        In each group, at most one section (the shortest suitable one) must change its parity."""
+        size: int = self.params.group_size
+        for g, bits in enumerate(matrix.split_bits(list(message))):
+            group: list[Section] = sections[g * size:(g + 1) * size]
+            parities: list[int] = [Hasher.parity(h) for h in hashes[g * size:(g + 1) * size]]
+            expected: list[Bit] = matrix.encode(parities, bits, [len(section.original_text) for section in group])
+            for section, bit in zip(group, expected):
+                self.db.set_expected_bit(section.position, bit)
+                section.expected_bit = bit
+        return sections
+
+    def hide_counter(self, secret_key: str, needed: int, message: Optional[Vector] = None) -> None:
+        """Rewrite the "needed" first sections using the format FORMAT_COUNTER (or FORMAT_MATRIX, if a message is given).
+
+        Since the algorithm of a section only depends on the key and on its position, all these sections are
+        hashed at once, and all the unsuitable sections are rewritten concurrently ("concurrency" workers).
+        With the format FORMAT_MATRIX, the expected bits are derived from the message and from the hashes
+        of the original sections (see set_matrix_bits). With a task store, the sections are rewritten by the workers.
+        """
+        hash_pool: HashPool = self.hash_pool if self.hash_pool is not None else HashPool(self.params.concurrency)
+        try:
+            hasher: Hasher = Hasher(secret_key, hash_pool=hash_pool, format_version=self.params.format_version)
+            sections: list[Section] = list(self.db.get_sections(needed))
+            algorithms: list[str] = [hasher.algorithm_at(section.position) for section in sections]
+            hashes: list[bytes] = hasher.hash_many([(algorithm, section.original_text) for algorithm, section in zip(algorithms, sections)])
+            if message is not None:
+                sections = self.set_matrix_bits(sections, hashes, message)
+
+            mismatches: list[Tuple[Section, str]] = []
+            for section, algorithm, h in zip(sections, algorithms, hashes):
+                bit: int = Hasher.parity(h)
+                self.trace_parity(section.position, algorithm, h, bit, section.expected_bit)
+                if self.params.verbose:
+                    self.print_section(section, h, bit)
+                if section.expected_bit is None or bit == section.expected_bit:
+                    self.db.set_unchanged(section.position, algorithm, h)
+                else:
+                    mismatches.append((section, algorithm))
 
+            reused, mismatches = self.reuse_previous(hasher, mismatches)
+            for section, algorithm, text, h in reused:
+                self.db.set_traduction(section.position, text, algorithm, h)
 
-            last_hash = h
-            bits.append(cast(Bit, bit))
-
-        # Make sure that the number of bits is greater than 64.
-        if len(bits) < 16:
-            raise ValueError("The murmur must contain at least 16 sentences!")
-        length_vector: list[Bit] = bits[:16]
-        if self.verbose:
-            print("Number of bits: {}".format(len(bits)))
-            print("Length vector: {}".format(length_vector))
-
-
-        length: Int16 = Conversion.bit_list_to_int16(length_vector)
-        body_vector: list[Bit] = bits[16:16+length*8]
-        body = Conversion.bit_list_to_bytes(body_vector)
-        with open(self.reveal_path, 'w') as f:
-            f.write(str(body, 'ascii'))
+            if self.params.batch_size > 1 or self.task_store is not None:
+                for section, algorithm, reformulation, h in self.rewrite_sections(hasher, mismatches):
+                    self.db.set_traduction(section.position, reformulation, algorithm, h)
+                return
+
+            with ThreadPoolExecutor(max_workers=self.params.concurrency) as executor:
+                futures: dict[Future, Tuple[Section, str]] = {
+                    executor.submit(self.rewrite_section, hasher, section, algorithm): (section, algorithm)
+                    for section, algorithm in mismatches
+                }
+                for future in as_completed(futures):
+                    section, algorithm = futures[future]
+                    reformulation, h = future.result()
+                    self.db.set_traduction(section.position, reformulation, algorithm, h)
+        finally:
+            if hash_pool is not self.hash_pool:
+                hash_pool.close()
@@ -0,0 +1,102 @@
+import os
+import socket
+import threading
+from typing import Optional
+from .hasher import Hasher
+from .stegano_db import Section
+from .task_store import TaskStore, Task
+from .whisperer import Whisperer
+
+# Default duration of a lease (in seconds). The leases of the tasks in progress are renewed every third of this duration.
+LEASE_DURATION: float = 120.0
+
+class Worker:
+    """Rewrite the sections leased from a task store (see whisper.task_store), for any number of hides.
+
+    A worker does not need the secret key of the hides: the algorithm and the expected bit of each section
+    are given by the task. The sections are rewritten by the given Whisperer ("concurrency" sections at a
+    time, see Whisperer.rewrite_section), which defines the rewriter, the prompts and the retry strategy.
+    The tasks with a priority (the boundary sections of the format FORMAT_CHAINED) are rewritten with
+    "boundary_concurrency" concurrent requests.
+
+    While a task is in progress, its lease is renewed. If the worker dies, the lease expires and the task
+    is leased by another worker.
+    """
+
+    def __init__(self, store: TaskStore, whisperer: Whisperer, name: Optional[str] = None,
+                 lease_duration: float = LEASE_DURATION, poll_interval: float = 1.0) -> None:
+        self.store: TaskStore = store
+        self.whisperer: Whisperer = whisperer
+        self.name: str = name if name is not None else '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.lease_duration: float = lease_duration
+        self.poll_interval: float = poll_interval
+        self.hasher: Hasher = Hasher(None, hash_pool=whisperer.hash_pool)
+        self.active: set[int] = set()
+        self.completed: int = 0
+        self.failed: int = 0
+        self.lock: threading.Lock = threading.Lock()
+        self.stopping: threading.Event = threading.Event()
+
+    def stop(self) -> None:
+        """Stop leasing tasks. The tasks in progress are completed."""
+        self.stopping.set()
+
+    def process(self, task: Task) -> None:
+        section: Section = Section(task.position, task.text, task.expected_bit, None)
+        width: int = self.whisperer.params.boundary_concurrency if task.priority > 0 else 1
+        try:
+            text, h = self.whisperer.rewrite_section(self.hasher, section, task.algorithm, width)
+        except Exception as e:
+            self.store.fail(task.id, str(e))
+            with self.lock:
+                self.failed += 1
+            return
+        self.store.complete(task.id, text, h)
+        with self.lock:
+            self.completed += 1
+
+    def work(self, stop_when_idle: bool) -> None:
+        while not self.stopping.is_set():
+            tasks: list[Task] = self.store.lease(self.name, self.lease_duration)
+            if len(tasks) == 0:
+                if stop_when_idle:
+                    return
+                self.stopping.wait(self.poll_interval)
+                continue
+            task: Task = tasks[0]
+            with self.lock:
+                self.active.add(task.id)
+            try:
+                self.process(task)
+            finally:
+                with self.lock:
+                    self.active.discard(task.id)
+
+    def renew(self) -> None:
+        while not self.stopping.wait(self.lease_duration / 3):
+            with self.lock:
+                ids: list[int] = list(self.active)
+            if len(ids) > 0:
+                self.store.renew(ids, self.name, self.lease_duration)
+
+    def run(self, stop_when_idle: bool = False) -> None:
+        """Process the tasks until stop is called (or until there is no task left, if "stop_when_idle" is set)."""
+        heartbeat: threading.Thread = threading.Thread(target=self.renew, name='lease-renewal', daemon=True)
+        heartbeat.start()
+        threads: list[threading.Thread] = [threading.Thread(target=self.work, args=(stop_when_idle,), name='worker-{}'.format(i))
+                                           for i in range(self.whisperer.params.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self.stopping.set()
+            heartbeat.join()
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {'completed': self.completed, 'failed': self.failed, 'active': len(self.active),
+                    'calls': self.whisperer.call_count, 'input_tokens': self.whisperer.governor.input_tokens,
+                    'output_tokens': self.whisperer.governor.output_tokens, 'duplicates': self.whisperer.duplicate_count,
+                    'variants': self.whisperer.variant_count}
@@ -0,0 +1,89 @@
+# Usage:
+# python3 -m unittest -v test_batch.py
+
+import unittest
+import tempfile
+import json
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.batch import load_manifest, run_batch, dependencies
+from whisper.config import Config
+from whisper.jobs import JobManager
+from whisper.whisperer import Params
+
+HAYSTACK_PATH: str = os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'test-data', 'haystack.txt'))
+
+class TestBatch(unittest.TestCase):
+
+    def test_load_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'manifest.jsonl')
+            with open(path, 'w') as f:
+                f.write(json.dumps({'type': 'hide', 'key': 'k', 'needle': 'n.txt', 'haystack': '/h.txt', 'output': 'o.txt'}) + '\n\n')
+                f.write(json.dumps({'type': 'reveal', 'key': 'k', 'murmur': 'o.txt', 'output': 'r.txt'}) + '\n')
+            jobs = load_manifest(path)
+            self.assertEqual(len(jobs), 2)
+            self.assertEqual(jobs[0]['needle'], os.path.join(directory, 'n.txt'))
+            self.assertEqual(jobs[0]['haystack'], '/h.txt')
+            self.assertEqual(jobs[1]['type'], 'reveal')
+
+    def test_load_yaml(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'manifest.yaml')
+            with open(path, 'w') as f:
+                f.write("jobs:\n  - type: reveal\n    key: 1234\n    murmur: o.txt\n    output: r.txt\n")
+            jobs = load_manifest(path)
+            self.assertEqual(len(jobs), 1)
+            self.assertEqual(jobs[0]['key'], '1234')
+
+    def test_invalid(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'manifest.jsonl')
+            with open(path, 'w') as f:
+                f.write(json.dumps({'type': 'reveal', 'key': 'k', 'output': 'r.txt'}) + '\n')
+            self.assertRaises(ValueError, load_manifest, path)
+            with open(path, 'w') as f:
+                f.write(json.dumps({'type': 'unknown'}) + '\n')
+            self.assertRaises(ValueError, load_manifest, path)
+
+    def test_dependencies(self):
+        jobs: list[dict] = [{'type': 'hide', 'key': 'k', 'needle': 'n.txt', 'haystack': 'h.txt', 'output': 'a.txt'},
+                            {'type': 'hide', 'key': 'k', 'needle': 'n.txt', 'haystack': 'h.txt', 'output': 'b.txt'},
+                            {'type': 'reveal', 'key': 'k', 'murmur': './a.txt', 'output': 'm.txt'},
+                            {'type': 'hide', 'key': 'k', 'needle': 'n.txt', 'haystack': 'h.txt', 'output': 'a.txt'}]
+        # The reveal reads the output of the first hide, which is written again by the last hide.
+        self.assertEqual(dependencies(jobs), [[], [], [0], [0, 2]])
+
+    def test_run_batch(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'needle.txt'), 'w') as f:
+                f.write('Hi')
+            path: str = os.path.join(directory, 'manifest.jsonl')
+            # Each reveal reads the murmur of the previous hide, in the same manifest.
+            with open(path, 'w') as f:
+                f.write(json.dumps({'type': 'hide', 'key': 'k', 'needle': 'needle.txt', 'haystack': HAYSTACK_PATH, 'output': 'murmur.txt'}) + '\n')
+                f.write(json.dumps({'type': 'reveal', 'key': 'k', 'murmur': 'murmur.txt', 'output': 'message.txt'}) + '\n')
+                f.write(json.dumps({'type': 'hide', 'key': 'k', 'needle': 'needle.txt', 'haystack': 'missing.txt', 'output': 'other.txt'}) + '\n')
+                f.write(json.dumps({'type': 'reveal', 'key': 'k', 'murmur': 'other.txt', 'output': 'other-message.txt'}) + '\n')
+            config: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.', 'next_requests': 'Reformule.'}, None, '')
+            manager: JobManager = JobManager(Params(backend='local'), config, max_jobs=4)
+            try:
+                jobs, summary = run_batch(manager, load_manifest(path))
+            finally:
+                manager.close()
+            self.assertEqual([job.status for job in jobs], ['done', 'done', 'failed', 'failed'])
+            self.assertIn('job(s) 3 failed', jobs[3].error)
+            self.assertEqual((summary['jobs'], summary['done'], summary['failed']), (4, 2, 2))
+            self.assertEqual(summary['calls'], jobs[0].calls)
+            # The requests sent to the local backend are not counted.
+            self.assertEqual(summary['input_tokens'], 0)
+            with open(os.path.join(directory, 'message.txt')) as f:
+                self.assertEqual(f.read(), 'Hi')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# Usage:
+# python3 -m unittest -v test_candidates.py
+
+from typing import Optional
+import unittest
+import json
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.candidates import CandidateHistory, NEW, VARIANT, DUPLICATE, MAX_HISTORY, normalize
+from whisper.config import Config
+from whisper.hasher import Hasher
+from whisper.rewriter import Rewriter
+from whisper.stegano_db import Section, MEMORY_DB
+from whisper.whisperer import Whisperer, Params
+
+class ConstantRewriter(Rewriter):
+    """Always returns the same reformulation (one per text for the batch requests)."""
+
+    def __init__(self, text: str) -> None:
+        self.text: str = text
+        self.requests: list[list[dict[str, str]]] = []
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        self.requests.append(messages)
+        try:
+            batch: object = json.loads(messages[-1]['content'])
+        except ValueError:
+            batch = None
+        if isinstance(batch, list):
+            return json.dumps({'result': [self.text] * len(batch)})
+        return json.dumps({'result': self.text})
+
+class TestCandidates(unittest.TestCase):
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  Le chat\n dort.\t'), 'Le chat dort.')
+
+    def test_add(self):
+        history: CandidateHistory = CandidateHistory('Le chat dort.')
+        self.assertEqual(history.add('Le chat dort.'), DUPLICATE)
+        self.assertEqual(history.add('Le  chat dort.'), VARIANT)
+        self.assertEqual(history.add('Le chat sommeille.'), NEW)
+        self.assertEqual(history.add('Le chat sommeille.'), DUPLICATE)
+        self.assertEqual(history.add('Le chat sommeille. '), VARIANT)
+
+    def test_history(self):
+        history: CandidateHistory = CandidateHistory('Le chat dort.')
+        history.reject('Le  chat dort.')
+        self.assertEqual(history.history(), [])
+        for i in range(7):
+            history.reject('Reformulation {}.'.format(i))
+            history.reject('Reformulation {}. '.format(i))
+        self.assertEqual(len(history.rejected), 7)
+        self.assertEqual(history.history(2), ['Reformulation 5.', 'Reformulation 6.'])
+
+    def test_repeat(self):
+        history: CandidateHistory = CandidateHistory('Le chat dort.')
+        history.reject('Le chat sommeille.')
+        history.reject('Le chat se repose.')
+        self.assertEqual(history.add('Le chat dort.'), DUPLICATE)
+        self.assertEqual((history.attempts, history.duplicates), (1, 1))
+        # The duplicates (even of the original text) are given back to the LLM.
+        history.repeat('Le chat dort.')
+        history.repeat('Le chat sommeille.')
+        self.assertEqual(history.history(), ['Le chat sommeille.', 'Le chat se repose.', 'Le chat dort.', 'Le chat sommeille.'])
+
+class TestDuplicates(unittest.TestCase):
+
+    TEXT: str = 'Toujours la même reformulation.'
+
+    def rewrite(self, strategy: str, batch_size: int = 1) -> ConstantRewriter:
+        rewriter: ConstantRewriter = ConstantRewriter(self.TEXT)
+        config: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.', 'next_requests': 'Reformule: {__PREVIOUS__}'},
+                                None, '', retry_strategy=strategy)
+        w: Whisperer = Whisperer(Params(backend='local', batch_size=batch_size, max_attempts=10, recombination=False), config,
+                                 db_path=MEMORY_DB, rewriter=rewriter)
+        hasher: Hasher = Hasher('key')
+        algorithm: str = 'sha256'
+        # The constant reformulation never has the expected parity.
+        section: Section = Section(0, 'Le chat dort.', 1 - Hasher.parity(Hasher.hash(algorithm, self.TEXT)), None)
+        try:
+            with self.assertRaisesRegex(RuntimeError, 'after 10 attempts'):
+                if batch_size > 1:
+                    w.rewrite_batches(hasher, [(section, algorithm)])
+                else:
+                    w.rewrite_section(hasher, section, algorithm)
+        finally:
+            w.close()
+            w.db.close()
+        self.assertEqual(w.duplicate_count, 9)
+        return rewriter
+
+    def test_prompt(self):
+        rewriter: ConstantRewriter = self.rewrite('prompt')
+        self.assertEqual(len(rewriter.requests), 10)
+        # The request changes after the first duplicate.
+        self.assertNotEqual(rewriter.requests[1], rewriter.requests[2])
+
+    def test_conversation(self):
+        requests: list[list[dict[str, str]]] = self.rewrite('conversation').requests
+        self.assertEqual(len(requests), 10)
+        # Only the most recent reformulations are given back.
+        self.assertEqual(max(len(messages) for messages in requests), 2 + 2 * MAX_HISTORY)
+
+    def test_conversation_request(self):
+        config: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.'}, None, '', retry_request='Encore.')
+        w: Whisperer = Whisperer(Params(backend='local'), config, db_path=MEMORY_DB)
+        messages: list[dict[str, str]] = w.generate_conversation_request('Le chat dort.', ['Le chat sommeille.', 'Le félin dort.']).to_dict()
+        w.close()
+        w.db.close()
+        self.assertEqual([(m['role'], m['content']) for m in messages],
+                         [('system', 'Reformule.'), ('user', 'Le chat dort.'),
+                          ('assistant', '{"result": "Le chat sommeille."}'), ('user', 'Encore.'),
+                          ('assistant', '{"result": "Le félin dort."}'), ('user', 'Encore.')])
+
+    def test_batch(self):
+        self.assertEqual(len(self.rewrite('prompt', batch_size=2).requests), 10)
+
+if __name__ == '__main__':
+    unittest.main()
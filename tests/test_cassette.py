@@ -0,0 +1,99 @@
+# Usage:
+# python3 -m unittest -v test_cassette.py
+
+import unittest
+import tempfile
+import json
+import os
+import sys
+from typing import Optional
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.cassette import RecordingRewriter, ReplayRewriter, request_key
+from whisper.rewriter import Rewriter
+
+def messages(text: str) -> list[dict[str, str]]:
+    return [{'role': 'system', 'content': 'system'}, {'role': 'user', 'content': text}]
+
+class CountingRewriter(Rewriter):
+
+    def __init__(self) -> None:
+        self.count: int = 0
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        self.count += 1
+        return '{}-{}'.format(messages[-1]['content'], self.count)
+
+class FailingRewriter(CountingRewriter):
+    """Fails the first call."""
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        if self.count == 0:
+            self.count += 1
+            raise OSError('Connection reset')
+        return super().call(messages, max_tokens)
+
+class TestCassette(unittest.TestCase):
+
+    def record_and_replay(self, name: str) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, name)
+            recorder: RecordingRewriter = RecordingRewriter(CountingRewriter(), path)
+            self.assertEqual(recorder.call(messages('a')), 'a-1')
+            self.assertEqual(recorder.call(messages('b')), 'b-2')
+            self.assertEqual(recorder.call(messages('a')), 'a-3')
+            recorder.close()
+
+            player: ReplayRewriter = ReplayRewriter(path)
+            self.assertEqual(len(player), 3)
+            self.assertEqual(player.call(messages('b')), 'b-2')
+            self.assertEqual(player.call(messages('a')), 'a-1')
+            self.assertEqual(player.call(messages('a')), 'a-3')
+            # The request "a" was only recorded twice.
+            self.assertRaisesRegex(KeyError, '2 times', player.call, messages('a'))
+            self.assertRaises(KeyError, player.call, messages('c'))
+
+    def test_jsonl(self):
+        self.record_and_replay('cassette.jsonl')
+
+    def test_gzip(self):
+        self.record_and_replay('cassette.jsonl.gz')
+
+    def test_occurrences(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'cassette.jsonl')
+            key: str = request_key(messages('a'))
+            # The response of the second request arrived first.
+            with open(path, 'w') as f:
+                f.write(json.dumps({'key': key, 'occurrence': 1, 'response': 'second'}) + '\n')
+                f.write(json.dumps({'key': key, 'occurrence': 0, 'response': 'first'}) + '\n')
+            # A new recording continues the occurrences of the cassette.
+            recorder: RecordingRewriter = RecordingRewriter(CountingRewriter(), path)
+            recorder.call(messages('a'))
+            recorder.close()
+
+            player: ReplayRewriter = ReplayRewriter(path)
+            self.assertEqual([player.call(messages('a')) for _ in range(3)], ['first', 'second', 'a-1'])
+
+    def test_failure(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'cassette.jsonl')
+            recorder: RecordingRewriter = RecordingRewriter(FailingRewriter(), path)
+            self.assertRaises(OSError, recorder.call, messages('a'))
+            self.assertEqual(recorder.call(messages('a')), 'a-2')
+            recorder.close()
+
+            # The failed request did not use an occurrence.
+            player: ReplayRewriter = ReplayRewriter(path)
+            self.assertEqual(len(player), 1)
+            self.assertEqual(player.call(messages('a')), 'a-2')
+
+    def test_request_key(self):
+        self.assertEqual(request_key(messages('a')), request_key(messages('a')))
+        self.assertNotEqual(request_key(messages('a')), request_key(messages('b')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,7 @@ SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
 INPUT_PATH: str = os.path.join(tempfile.gettempdir(), 'config.yaml')
 sys.path.insert(0, SEARCH_PATH)
 
-from whisper.config import Config, load_config
+from whisper.config import Config, load_config, DEFAULT_RETRY_REQUEST, DEFAULT_MAX_PREVIOUS_TOKENS, DEFAULT_OUTPUT_TOKEN_RATIO
 
 def set_input_file(path: str, content: str) -> None:
     with open(path, 'w') as f:
@@ -106,6 +106,96 @@ class TestConfig(unittest.TestCase):
             if os.path.exists(INPUT_PATH):
                 os.remove(INPUT_PATH)
 
+    def test_retry_strategy(self):
+        input_text = """
+        model: gpt-3.5-turbo
+        temperature: 0.7
+        top_p: 0.9
+        system:
+            first_request: "first request"
+            next_requests: "next request"
+        assistant: null
+        user: |
+            {TEXT}
+        """
+        try:
+            set_input_file(INPUT_PATH, input_text)
+            config: Config = load_config(INPUT_PATH)
+            self.assertEqual(config.retry_strategy, "conversation")
+            self.assertEqual(config.retry_request, DEFAULT_RETRY_REQUEST)
+
+            set_input_file(INPUT_PATH, input_text.rstrip(" ") + "        retry_strategy: prompt\n        retry_request: again\n")
+            config = load_config(INPUT_PATH)
+            self.assertEqual(config.retry_strategy, "prompt")
+            self.assertEqual(config.retry_request, "again")
+
+            set_input_file(INPUT_PATH, input_text.rstrip(" ") + "        retry_strategy: toto\n")
+            self.assertRaises(ValueError, load_config, INPUT_PATH)
+        finally:
+            if os.path.exists(INPUT_PATH):
+                os.remove(INPUT_PATH)
+
+    def test_token_limits(self):
+        input_text = """
+        model: gpt-3.5-turbo
+        temperature: 0.7
+        top_p: 0.9
+        system:
+            first_request: "first request"
+            next_requests: "next request"
+        assistant: null
+        user: "{TEXT}"
+        """
+        try:
+            set_input_file(INPUT_PATH, input_text)
+            config: Config = load_config(INPUT_PATH)
+            self.assertEqual(config.max_previous_tokens, DEFAULT_MAX_PREVIOUS_TOKENS)
+            self.assertEqual(config.output_token_ratio, DEFAULT_OUTPUT_TOKEN_RATIO)
+
+            set_input_file(INPUT_PATH, input_text.rstrip(" ") + "        max_previous_tokens: null\n        output_token_ratio: 3\n")
+            config = load_config(INPUT_PATH)
+            self.assertIsNone(config.max_previous_tokens)
+            self.assertEqual(config.output_token_ratio, 3.0)
+
+            set_input_file(INPUT_PATH, input_text.rstrip(" ") + "        max_previous_tokens: 0\n")
+            self.assertRaises(ValueError, load_config, INPUT_PATH)
+        finally:
+            if os.path.exists(INPUT_PATH):
+                os.remove(INPUT_PATH)
+
+    def test_endpoints(self):
+        input_text = """
+        model: gpt-3.5-turbo
+        temperature: 0.7
+        top_p: 0.9
+        system:
+            first_request: "first request"
+            next_requests: "next request"
+        assistant: null
+        user: "{TEXT}"
+        routing: latency
+        endpoints:
+            - base_url: "http://localhost:8000/v1"
+              token_file: local.token
+            - name: openai
+              model: gpt-4o-mini
+        """
+        try:
+            set_input_file(INPUT_PATH, input_text)
+            config: Config = load_config(INPUT_PATH)
+            self.assertEqual(config.routing, "latency")
+            self.assertEqual(len(config.endpoints), 2)
+            self.assertEqual(config.endpoints[0].name, "http://localhost:8000/v1")
+            self.assertEqual(config.endpoints[0].token_file, os.path.join(os.path.dirname(INPUT_PATH), "local.token"))
+            self.assertEqual(config.endpoints[1].model, "gpt-4o-mini")
+            self.assertIsNone(config.endpoints[1].base_url)
+
+            set_input_file(INPUT_PATH, input_text.replace("model: gpt-4o-mini", "port: 8000"))
+            self.assertRaises(ValueError, load_config, INPUT_PATH)
+        finally:
+            if os.path.exists(INPUT_PATH):
+                os.remove(INPUT_PATH)
+
 if __name__ == '__main__':
     unittest.main()
 
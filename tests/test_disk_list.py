@@ -10,7 +10,7 @@ CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
 SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
 sys.path.insert(0, SEARCH_PATH)
 
-from whisper.disk_list import DiskList
+from whisper.disk_list import DiskList, spill, release
 
 class TestDiskList(unittest.TestCase):
 
@@ -36,5 +36,45 @@ class TestDiskList(unittest.TestCase):
             self.assertEqual(dl[i], replacements[i])
         dl.destroy()
 
+    def test_buffer_and_cache(self):
+        # Small buffers and pages: the values are written and read by several groups.
+        with DiskList(buffer_size=3, page_size=2, cache_pages=2) as dl:
+            dl.extend('v{}'.format(i) for i in range(10))
+            self.assertEqual(len(dl), 10)
+            self.assertEqual(dl[-1], 'v9')
+            self.assertEqual(dl[2:7:2], ['v2', 'v4', 'v6'])
+            self.assertEqual(dl[1], 'v1')
+            dl[1] = 'r1'
+            dl[8] = 'r8'
+            self.assertEqual(dl[0:2], ['v0', 'r1'])
+            dl.flush()
+            self.assertEqual(list(dl), ['v0', 'r1'] + ['v{}'.format(i) for i in range(2, 8)] + ['r8', 'v9'])
+            self.assertRaises(IndexError, dl.__getitem__, 10)
+            self.assertRaises(IndexError, dl.__setitem__, -11, 'x')
+            dl.reset()
+            self.assertEqual(len(dl), 0)
+            self.assertEqual(list(dl), [])
+            path = dl.db_file_path
+        self.assertFalse(path.exists())
+
+    def test_partial_page(self):
+        # A partial page read before a flush is read again once the page is complete.
+        with DiskList(buffer_size=2, page_size=4) as dl:
+            dl.extend(['a', 'b'])
+            self.assertEqual(dl[0], 'a')
+            dl.extend(['c', 'd'])
+            self.assertEqual(dl[3], 'd')
+            self.assertEqual(dl[0:4], ['a', 'b', 'c', 'd'])
+
+    def test_spill(self):
+        values: list[int] = [0, 1, 1, 0]
+        self.assertIs(spill(values, 4, None), values)
+        self.assertEqual(spill(iter(values), 4, 4), values)
+        spilled = spill(iter(values), 4, 3)
+        self.assertIsInstance(spilled, DiskList)
+        self.assertEqual(list(spilled), values)
+        release(spilled)
+        self.assertFalse(spilled.db_file_path.exists())
+
 if __name__ == '__main__':
     unittest.main()
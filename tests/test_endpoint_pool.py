@@ -0,0 +1,126 @@
+# Usage:
+# python3 -m unittest -v test_endpoint_pool.py
+
+import unittest
+import os
+import sys
+from typing import Optional
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.endpoint_pool import Endpoint, EndpointPool, is_endpoint_error
+from whisper.rewriter import Rewriter
+
+MESSAGES: list[dict[str, str]] = [{'role': 'system', 'content': 'system'}, {'role': 'user', 'content': 'text'}]
+
+class NamedRewriter(Rewriter):
+    """Rewriter that answers its name, or fails."""
+
+    def __init__(self, name: str, fail: bool = False) -> None:
+        self.name: str = name
+        self.fail: bool = fail
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        if self.fail:
+            raise ConnectionError("{} is down".format(self.name))
+        return self.name
+
+class StatusError(Exception):
+    """Error of an HTTP API (such as openai.APIStatusError)."""
+
+    def __init__(self, status_code: int) -> None:
+        super().__init__('HTTP {}'.format(status_code))
+        self.status_code: int = status_code
+
+class StatusRewriter(Rewriter):
+
+    def __init__(self, status_code: int) -> None:
+        self.status_code: int = status_code
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        raise StatusError(self.status_code)
+
+class TestEndpointPool(unittest.TestCase):
+
+    def test_least_outstanding(self):
+        a: Endpoint = Endpoint('a', NamedRewriter('a'))
+        b: Endpoint = Endpoint('b', NamedRewriter('b'))
+        pool: EndpointPool = EndpointPool([a, b])
+        a.outstanding = 2
+        self.assertEqual(pool.call(MESSAGES), 'b')
+        self.assertEqual(b.requests, 1)
+        self.assertEqual(b.outstanding, 0)
+        self.assertIsNotNone(b.latency)
+
+    def test_latency(self):
+        a: Endpoint = Endpoint('a', NamedRewriter('a'))
+        b: Endpoint = Endpoint('b', NamedRewriter('b'))
+        a.latency = 1.0
+        b.latency = 5.0
+        pool: EndpointPool = EndpointPool([a, b], routing='latency')
+        self.assertEqual(pool.call(MESSAGES), 'a')
+        # 2 requests in progress on "a" (3 x 1.0) are still faster than 1 request on "b" (1 x 5.0).
+        a.outstanding = 2
+        self.assertEqual(pool.select([]), a)
+
+    def test_ejection(self):
+        a: Endpoint = Endpoint('a', NamedRewriter('a', fail=True))
+        b: Endpoint = Endpoint('b', NamedRewriter('b'))
+        b.outstanding = 1
+        pool: EndpointPool = EndpointPool([a, b], cooldown=60.0)
+        self.assertEqual(pool.call(MESSAGES), 'b')
+        self.assertEqual(a.errors, 1)
+        stats = {s['name']: s for s in pool.stats()}
+        self.assertFalse(stats['a']['healthy'])
+        self.assertTrue(stats['b']['healthy'])
+        # "a" is ejected, even though it has no outstanding request.
+        self.assertEqual(pool.call(MESSAGES), 'b')
+        self.assertEqual(a.requests, 1)
+
+    def test_all_failed(self):
+        pool: EndpointPool = EndpointPool([Endpoint('a', NamedRewriter('a', fail=True)), Endpoint('b', NamedRewriter('b', fail=True))])
+        self.assertRaises(RuntimeError, pool.call, MESSAGES)
+        self.assertRaises(ValueError, EndpointPool, [])
+
+    def test_endpoint_error(self):
+        self.assertTrue(is_endpoint_error(ConnectionError()))
+        self.assertTrue(is_endpoint_error(StatusError(429)))
+        self.assertTrue(is_endpoint_error(StatusError(503)))
+        self.assertTrue(is_endpoint_error(StatusError(401)))
+        self.assertTrue(is_endpoint_error(StatusError(404)))
+        self.assertFalse(is_endpoint_error(StatusError(400)))
+        self.assertFalse(is_endpoint_error(ValueError()))
+
+    def test_invalid_request(self):
+        a: Endpoint = Endpoint('a', StatusRewriter(400))
+        b: Endpoint = Endpoint('b', NamedRewriter('b'))
+        b.outstanding = 1
+        pool: EndpointPool = EndpointPool([a, b])
+        # An invalid request is not sent to the other endpoints, and does not eject the endpoint.
+        self.assertRaises(StatusError, pool.call, MESSAGES)
+        self.assertEqual((a.errors, a.outstanding, b.requests), (1, 0, 0))
+        self.assertEqual(a.ejected_until, 0.0)
+        # A rate limit ejects the endpoint.
+        a.rewriter = StatusRewriter(429)
+        self.assertEqual(pool.call(MESSAGES), 'b')
+        self.assertGreater(a.ejected_until, 0.0)
+
+    def test_unauthorized(self):
+        # The key of "a" is invalid: the request is sent to "b", and "a" is ejected.
+        a: Endpoint = Endpoint('a', StatusRewriter(401))
+        b: Endpoint = Endpoint('b', NamedRewriter('b'))
+        b.outstanding = 1
+        pool: EndpointPool = EndpointPool([a, b])
+        self.assertEqual(pool.call(MESSAGES), 'b')
+        self.assertEqual((a.errors, a.outstanding), (1, 0))
+        self.assertGreater(a.ejected_until, 0.0)
+        # The error is only raised when all the endpoints have failed.
+        b.rewriter = StatusRewriter(403)
+        with self.assertRaisesRegex(RuntimeError, 'All the endpoints failed'):
+            pool.call(MESSAGES)
+        self.assertEqual((a.errors, b.errors), (2, 1))
+
+if __name__ == '__main__':
+    unittest.main()
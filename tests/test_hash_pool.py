@@ -0,0 +1,46 @@
+# Usage:
+# python3 -m unittest -v test_hash_pool.py
+
+import unittest
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.hash_pool import HashPool
+from whisper.hasher import Hasher
+
+class TestHashPool(unittest.TestCase):
+
+    def test_hash_many(self):
+        items: list[tuple[str, str]] = [('md5', 'a'), ('sha256', 'b'), ('md5', 'a')]
+        with HashPool(workers=2) as pool:
+            hashes: list[bytes] = pool.hash_many(items)
+            for (algo, text), h in zip(items, hashes):
+                self.assertEqual(h, Hasher.hash(algo, text))
+
+    def test_cache(self):
+        with HashPool(workers=1, cache_size=1) as pool:
+            h: bytes = pool.hash('md5', 'a')
+            self.assertEqual(pool.hash('md5', 'a'), h)
+            self.assertEqual(pool.stats()['hits'], 1)
+            pool.hash('md5', 'b')
+            self.assertEqual(pool.stats()['cached'], 1)
+            self.assertIsNone(pool.lookup('md5', 'a'))
+
+    def test_hasher(self):
+        with HashPool(workers=1) as pool:
+            hasher: Hasher = Hasher('password', hash_pool=pool)
+            h, p = hasher.get_parity('md5', 'a')
+            self.assertEqual(h, Hasher.hash('md5', 'a'))
+            self.assertEqual(p, Hasher.parity(h))
+            self.assertEqual(pool.stats()['misses'], 1)
+
+    def test_hash_function(self):
+        with HashPool(workers=1, hash_function=lambda algo, text: (algo + text).encode()) as pool:
+            self.assertEqual(Hasher(None, hash_pool=pool).hash_many([('md5', 'a'), ('sha256', 'b')]), [b'md5a', b'sha256b'])
+
+if __name__ == '__main__':
+    unittest.main()
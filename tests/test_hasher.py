@@ -11,6 +11,7 @@ SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
 sys.path.insert(0, SEARCH_PATH)
 
 from whisper.hasher import Hasher, KEY_LENGTH, ALGORITHMS
+from whisper.params import FORMAT_COUNTER
 
 class TestDiskList(unittest.TestCase):
 
@@ -33,5 +34,27 @@ class TestDiskList(unittest.TestCase):
             self.assertEqual(len(h), KEY_LENGTH)
             counter += 1
 
+    def test_counter_mode(self):
+        hasher: Hasher = Hasher('password', format_version=FORMAT_COUNTER)
+        algorithms: list[str] = [hasher.algorithm_at(position) for position in range(3 * KEY_LENGTH)]
+        for algo in algorithms:
+            self.assertIn(algo, ALGORITHMS)
+        self.assertGreater(len(set(algorithms)), 1)
+
+        # The algorithms do not depend on the previous hashes, nor on the order of the computation.
+        for position in reversed(range(3 * KEY_LENGTH)):
+            self.assertEqual(hasher.algorithm_at(position), algorithms[position])
+        other: Hasher = Hasher('password', format_version=FORMAT_COUNTER)
+        for position in range(3 * KEY_LENGTH):
+            self.assertEqual(other.next_hash_algorithm(None), algorithms[position])
+
+        # The algorithms depend on the key.
+        other = Hasher('other password', format_version=FORMAT_COUNTER)
+        self.assertNotEqual([other.algorithm_at(position) for position in range(3 * KEY_LENGTH)], algorithms)
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, Hasher, 'password', format_version=0)
+        self.assertRaises(ValueError, Hasher('password').algorithm_at, 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+# Usage:
+# python3 -m unittest -v test_hedging.py
+
+import unittest
+import threading
+import time
+import os
+import sys
+from typing import Optional
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.hedging import LatencyTracker, HedgedRewriter
+from whisper.rewriter import Rewriter
+
+MESSAGES: list[dict[str, str]] = [{'role': 'system', 'content': 'system'}, {'role': 'user', 'content': 'text'}]
+
+class ScriptedRewriter(Rewriter):
+    """Rewriter that answers after the given delays (one delay per call)."""
+
+    def __init__(self, delays: list[float]) -> None:
+        self.delays: list[float] = delays
+        self.count: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        with self.lock:
+            index: int = self.count
+            self.count += 1
+        time.sleep(self.delays[index])
+        return 'response-{}'.format(index)
+
+class TestHedging(unittest.TestCase):
+
+    def test_percentile(self):
+        tracker: LatencyTracker = LatencyTracker(window=5)
+        self.assertIsNone(tracker.percentile(50))
+        for latency in [10.0, 1.0, 2.0, 3.0, 4.0, 5.0]:
+            tracker.add(latency)
+        self.assertEqual(len(tracker), 5)
+        self.assertEqual(tracker.percentile(0), 1.0)
+        self.assertEqual(tracker.percentile(50), 3.0)
+        self.assertEqual(tracker.percentile(100), 5.0)
+
+    def test_no_hedge_before_min_samples(self):
+        backend: ScriptedRewriter = ScriptedRewriter([0.0, 0.0])
+        rewriter: HedgedRewriter = HedgedRewriter(backend, percentile=50, min_samples=5)
+        self.assertEqual(rewriter.call(MESSAGES), 'response-0')
+        self.assertEqual(rewriter.call(MESSAGES), 'response-1')
+        self.assertEqual(rewriter.hedge_count, 0)
+
+    def test_hedge(self):
+        # The first 3 calls calibrate the latency, the 4th call is slow and gets hedged.
+        backend: ScriptedRewriter = ScriptedRewriter([0.01, 0.01, 0.01, 0.5, 0.01])
+        rewriter: HedgedRewriter = HedgedRewriter(backend, percentile=90, min_samples=3)
+        for _ in range(3):
+            rewriter.call(MESSAGES)
+        start: float = time.monotonic()
+        self.assertEqual(rewriter.call(MESSAGES), 'response-4')
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(rewriter.hedge_count, 1)
+
+        # The response of the slow request is kept and returned by the next call.
+        time.sleep(0.6)
+        self.assertEqual(rewriter.call(MESSAGES), 'response-3')
+        self.assertEqual(rewriter.spare_count, 1)
+        self.assertEqual(backend.count, 5)
+    def test_concurrent_callers(self):
+        # The pool is sized for the callers: their requests are not queued behind each other.
+        backend: ScriptedRewriter = ScriptedRewriter([0.2] * 8)
+        rewriter: HedgedRewriter = HedgedRewriter(backend, percentile=50, min_samples=100, max_workers=16)
+        threads: list[threading.Thread] = [threading.Thread(target=rewriter.call, args=(MESSAGES,)) for _ in range(8)]
+        start: float = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(time.monotonic() - start, 0.35)
+        self.assertEqual(rewriter.call_count, 8)
+        rewriter.close()
+        with self.assertRaises(RuntimeError):
+            rewriter.call(MESSAGES)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+# Usage:
+# python3 -m unittest -v test_incremental.py
+
+import unittest
+import tempfile
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.incremental import PreviousSection, load_previous
+from whisper.stegano_db import SteganoDb
+
+class TestIncremental(unittest.TestCase):
+
+    def test_murmur(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'output.txt')
+            with open(path, 'w') as f:
+                f.write('T1\n\nT2\n\n')
+            self.assertEqual(load_previous(path), {0: PreviousSection(None, 'T1'), 1: PreviousSection(None, 'T2')})
+
+    def test_db(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'stegano-db.sqlite')
+            db: SteganoDb = SteganoDb(path)
+            db.add_original_text(0, 'V1')
+            db.add_original_text(1, 'V2')
+            db.set_traduction(1, 'T2', 'md5', b'abc')
+            db.close()
+            self.assertEqual(load_previous(path), {1: PreviousSection('V2', 'T2')})
+            # The database is not destroyed.
+            self.assertTrue(os.path.exists(path))
+
+    def test_missing(self):
+        self.assertRaises(FileNotFoundError, load_previous, os.path.join(CURRENT_DIR, 'missing.txt'))
+
+if __name__ == '__main__':
+    unittest.main()
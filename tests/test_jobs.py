@@ -0,0 +1,83 @@
+# Usage:
+# python3 -m unittest -v test_jobs.py
+
+from typing import Optional
+import unittest
+import tempfile
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.config import Config
+from whisper.jobs import Job, JobManager
+from whisper.params import FORMAT_COUNTER
+from whisper.whisperer import Params
+
+HAYSTACK_PATH: str = os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'test-data', 'haystack.txt'))
+CONFIG: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.', 'next_requests': 'Reformule.'}, None, '')
+
+class TestJobManager(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.needle: str = os.path.join(self.directory.name, 'needle.txt')
+        with open(self.needle, 'w') as f:
+            f.write('Hi')
+        self.manager: JobManager = JobManager(Params(backend='local'), CONFIG, max_jobs=2)
+
+    def tearDown(self):
+        self.manager.close()
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_hide_reveal(self):
+        hide: Job = self.manager.submit('hide', {'key': 'k', 'needle': self.needle, 'haystack': HAYSTACK_PATH,
+                                                 'output': self.path('murmur.txt'), 'format': FORMAT_COUNTER})
+        self.assertIn(hide.status, ['queued', 'running'])
+        self.manager.wait()
+        job: Optional[Job] = self.manager.get(hide.id)
+        self.assertEqual((job.status, job.error), ('done', None))
+        self.assertGreater(job.calls, 0)
+        self.assertIsNotNone(job.duration())
+        # The secret key is never reported.
+        self.assertNotIn('key', job.to_dict()['arguments'])
+
+        reveal: Job = self.manager.submit('reveal', {'key': 'k', 'murmur': self.path('murmur.txt'), 'output': self.path('message.txt'),
+                                                     'format': FORMAT_COUNTER})
+        self.manager.wait()
+        self.assertEqual(reveal.status, 'done')
+        with open(self.path('message.txt')) as f:
+            self.assertEqual(f.read(), 'Hi')
+        self.assertEqual(self.manager.stats()['jobs'], {'done': 2})
+
+    def test_failure(self):
+        job: Job = self.manager.submit('hide', {'key': 'k', 'needle': self.needle, 'haystack': self.path('missing.txt'),
+                                                'output': self.path('murmur.txt')})
+        self.manager.wait()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('missing.txt', job.error)
+        self.assertIsNone(self.manager.get(job.id + 1))
+        self.assertEqual([j.id for j in self.manager.list()], [job.id])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, self.manager.submit, 'unknown', {})
+        self.assertRaises(ValueError, self.manager.submit, 'reveal', {'key': 'k', 'murmur': 'm.txt'})
+        self.assertRaises(ValueError, self.manager.submit, 'reveal', {'key': 'k', 'murmur': 'm.txt', 'output': 'o.txt', 'format': 9})
+        self.assertEqual(self.manager.list(), [])
+
+    def test_hedging(self):
+        manager: JobManager = JobManager(Params(backend='local', hedge_percentile=95.0, concurrency=2, boundary_concurrency=1),
+                                         CONFIG, max_jobs=3)
+        self.assertEqual(manager.hedged.max_workers, 2 * 3 * (2 + 1))
+        manager.close()
+        # The threads of the hedging are released.
+        with self.assertRaises(RuntimeError):
+            manager.hedged.call([{'role': 'user', 'content': 'Le chat dort.'}])
+
+if __name__ == '__main__':
+    unittest.main()
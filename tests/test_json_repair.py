@@ -0,0 +1,50 @@
+# Usage:
+# python3 -m unittest -v test_json_repair.py
+
+import unittest
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.json_repair import extract_result, extract_result_list
+
+class TestJsonRepair(unittest.TestCase):
+
+    def test_valid(self):
+        self.assertEqual(extract_result('{"result": "Bonjour."}'), 'Bonjour.')
+
+    def test_fences(self):
+        self.assertEqual(extract_result('```json\n{"result": "Bonjour."}\n```'), 'Bonjour.')
+
+    def test_surrounding_text(self):
+        response: str = 'Voici la reformulation : {"result": "Il a dit \\"oui\\" {ici}."} Bonne journée !'
+        self.assertEqual(extract_result(response), 'Il a dit "oui" {ici}.')
+
+    def test_missing_brace(self):
+        self.assertEqual(extract_result('{"result": "Bonjour. Au revoir."'), 'Bonjour. Au revoir.')
+
+    def test_invalid(self):
+        for response in ['', 'Bonjour.', '{"text": "Bonjour."}', '{"result": "Bonjour', '{"result": ""']:
+            with self.assertRaises(ValueError):
+                extract_result(response)
+
+    def test_blank_or_multiline(self):
+        # The same values are rejected by the strict path and by the repair of a broken document.
+        for value in ['""', '"   "', '"Bonjour.\\nAu revoir."', '"Bonjour.\\r\\nAu revoir."']:
+            for response in ['{"result": ' + value + '}', 'Voici : {"result": ' + value + '}', '{"result": ' + value]:
+                with self.assertRaises(ValueError):
+                    extract_result(response)
+
+    def test_list(self):
+        self.assertEqual(extract_result_list('{"result": ["a", "b"]}'), ['a', 'b'])
+        self.assertEqual(extract_result_list('```json\n["a", 1, "", "   ", "b\\nc"]\n```'), ['a', None, None, None, None])
+        self.assertEqual(extract_result_list('Voici : {"result": ["a"]}.'), ['a'])
+        for response in ['', '{"result": "a"}', '{"result": ["a"']:
+            with self.assertRaises(ValueError):
+                extract_result_list(response)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+# Usage:
+# python3 -m unittest -v test_library.py
+
+import unittest
+import tempfile
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.hasher import ALGORITHMS
+from whisper.library import HaystackLibrary, IndexedHaystack
+from whisper.params import FORMAT_COUNTER
+
+class TestLibrary(unittest.TestCase):
+
+    def test_plan(self):
+        # Section 0 has an odd parity with md5 only, section 1 with sha224 only.
+        haystack: IndexedHaystack = IndexedHaystack('h.txt', '', [0b01, 0b10], [10, 20], {})
+        self.assertEqual(haystack.parity(0, 'md5'), 1)
+        self.assertEqual(haystack.parity(1, 'md5'), 0)
+        p = haystack.plan([1, 1], 'key', FORMAT_COUNTER, algorithms=['md5', 'md5'])
+        self.assertEqual((p.rewrites, p.sections, p.available, p.exact), (1, 2, 2, True))
+        p = haystack.plan([1, 1], 'key', FORMAT_COUNTER, algorithms=['md5', 'sha224'])
+        self.assertEqual((p.rewrites, p.tokens), (0, 0))
+
+    def test_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            haystack: str = os.path.join(directory, 'haystack.txt')
+            with open(haystack, 'w') as f:
+                f.write('First section.\n\nSecond section.\n\n')
+            with HaystackLibrary(os.path.join(directory, 'library.sqlite')) as library:
+                self.assertTrue(library.index(haystack))
+                self.assertFalse(library.index(haystack))
+                [indexed] = library.load()
+                self.assertEqual(indexed.lengths, [len('First section.'), len('Second section.')])
+                self.assertTrue(all(mask < 2 ** len(ALGORITHMS) for mask in indexed.masks))
+                [(path, p)] = library.rank([1, 0, 1], 'key', FORMAT_COUNTER)
+                self.assertFalse(p.feasible())
+                library.remove(haystack)
+                self.assertEqual(library.load(), [])
+
+if __name__ == '__main__':
+    unittest.main()
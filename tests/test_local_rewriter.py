@@ -0,0 +1,74 @@
+# Usage:
+# python3 -m unittest -v test_local_rewriter.py
+
+import unittest
+import json
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.local_rewriter import LocalRewriter
+from whisper.rewriter import Rewriter, NoReformulationError
+
+FR_TEXT: str = "Le récit installe immédiatement une atmosphère pesante et inquiétante. Cependant, le lecteur découvre un monde familier."
+EN_TEXT: str = "However, the story shows a heavy and disturbing world. The reader quickly discovers a familiar place."
+
+class TestLocalRewriter(unittest.TestCase):
+
+    def test_detect_language(self):
+        self.assertEqual(LocalRewriter.detect_language(FR_TEXT), 'fr')
+        self.assertEqual(LocalRewriter.detect_language(EN_TEXT), 'en')
+
+    def test_rewrite(self):
+        rewriter: LocalRewriter = LocalRewriter(seed=1)
+        for text in [FR_TEXT, EN_TEXT]:
+            variants: set[str] = set()
+            for _ in range(20):
+                variant: str = rewriter.rewrite(text)
+                self.assertNotEqual(variant, text)
+                variants.add(variant)
+            self.assertGreater(len(variants), 10)
+
+    def test_match_case(self):
+        rewriter: LocalRewriter = LocalRewriter(seed=1)
+        # The text has 15 variants (each one is returned once).
+        for _ in range(15):
+            variant: str = rewriter.rewrite("Cependant, tout va bien.")
+            self.assertTrue(variant[0].isupper())
+
+    def test_call(self):
+        rewriter: Rewriter = LocalRewriter(seed=1)
+        response: str = rewriter.call([{'role': 'system', 'content': 'Reformule.'},
+                                       {'role': 'user', 'content': FR_TEXT}])
+        result: str = json.loads(response)['result']
+        self.assertNotEqual(result, FR_TEXT)
+
+    def test_call_batch(self):
+        rewriter: Rewriter = LocalRewriter(seed=1)
+        response: str = rewriter.call([{'role': 'system', 'content': 'Reformule.'},
+                                       {'role': 'user', 'content': json.dumps([FR_TEXT, FR_TEXT])}])
+        results: list[str] = json.loads(response)['result']
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertNotEqual(result, FR_TEXT)
+
+    def test_no_reformulation(self):
+        rewriter: LocalRewriter = LocalRewriter(seed=1)
+        self.assertRaises(NoReformulationError, rewriter.rewrite, "Bonjour")
+
+    def test_distinct(self):
+        rewriter: LocalRewriter = LocalRewriter(seed=1)
+        # "très" -> "extrêmement", and a non-breaking space: 3 variants.
+        variants: set[str] = {rewriter.rewrite("Très bien.") for _ in range(3)}
+        self.assertEqual(len(variants), 3)
+        self.assertNotIn("Très bien.", variants)
+        self.assertRaises(NoReformulationError, rewriter.rewrite, "Très bien.")
+        # In a batch, a text without any new variant is returned unchanged.
+        response: str = rewriter.call([{'role': 'user', 'content': json.dumps(["Très bien."])}])
+        self.assertEqual(json.loads(response)['result'], ["Très bien."])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# Usage:
+# python3 -m unittest -v test_locator.py
+
+import unittest
+import tempfile
+import hashlib
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.config import Config
+from whisper.hash_pool import HashPool
+from whisper.whisperer import Params
+from whisper.params import FORMATS, FORMAT_COUNTER, KEY_LENGTH
+from whisper.text_api import hide_text
+from whisper.text_file_tool import read_sections_from_text, join_sections
+from whisper.library import HaystackLibrary
+from whisper.locator import MurmurLocator, header_algorithms
+
+HAYSTACK_PATH: str = os.path.join(CURRENT_DIR, os.path.pardir, 'test-data', 'haystack.txt')
+
+PREFIX: list[str] = ['Un paragraphe cité avant le murmure.', 'Un autre paragraphe.', 'Encore un paragraphe.']
+
+def cheap_hash(algo: str, text: str) -> bytes:
+    """Replaces Hasher.hash (Argon2, 64 MiB): the locator hashes every (algorithm, section) pair of the document."""
+    return hashlib.blake2b(hashlib.new(algo, text.encode()).digest(), digest_size=KEY_LENGTH).digest()
+
+class TestLocator(unittest.TestCase):
+
+    def setUp(self):
+        with open(HAYSTACK_PATH) as f:
+            self.haystack: str = f.read()
+        self.config: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.', 'next_requests': 'Reformule.'}, None, '')
+        self.pool: HashPool = HashPool(hash_function=cheap_hash)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def document(self, format_version: int) -> list[str]:
+        murmur: str = hide_text(b'Hi', self.haystack, 'key', Params(backend='local', format_version=format_version), self.config,
+                                hash_pool=self.pool)
+        return PREFIX + list(read_sections_from_text(murmur))
+
+    def test_header_algorithms(self):
+        self.assertEqual(len(header_algorithms('key', FORMAT_COUNTER)), 16)
+
+    def test_locate(self):
+        for format_version in FORMATS:
+            texts: list[str] = self.document(format_version)
+            locations = MurmurLocator('key', format_version, hash_pool=self.pool).locate(texts)
+            self.assertIn((len(PREFIX), b'Hi'), [(location.offset, location.message) for location in locations])
+
+    def test_expected_length(self):
+        texts: list[str] = self.document(FORMAT_COUNTER)
+        self.assertEqual(MurmurLocator('key', FORMAT_COUNTER, hash_pool=self.pool, expected_length=3).locate(texts), [])
+
+    def test_library(self):
+        texts: list[str] = self.document(FORMAT_COUNTER)
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'document.txt')
+            with open(path, 'w') as f:
+                f.write(join_sections(texts))
+            with HaystackLibrary(os.path.join(directory, 'library.sqlite')) as library:
+                library.index(path, hash_pool=self.pool)
+                indexed = library.get(path)
+            self.assertIsNotNone(indexed)
+            locations = MurmurLocator('key', FORMAT_COUNTER, hash_pool=self.pool).locate(texts, indexed)
+            self.assertIn(len(PREFIX), [location.offset for location in locations])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# Usage:
+# python3 -m unittest -v test_mapped_haystack.py
+
+import unittest
+import tempfile
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.mapped_haystack import MappedHaystack
+from whisper.text_file_tool import read_sections_from_file
+
+HAYSTACK_PATH: str = os.path.join(CURRENT_DIR, os.path.pardir, 'test-data', 'haystack.txt')
+
+class TestMappedHaystack(unittest.TestCase):
+
+    def test_haystack(self):
+        with MappedHaystack(HAYSTACK_PATH) as haystack:
+            self.assertEqual(list(haystack), list(read_sections_from_file(HAYSTACK_PATH)))
+
+    def test_line_breaks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'haystack.txt')
+            with open(path, 'wb') as f:
+                f.write('\n\nÉté 1\r\n\r\nS2\nS3\rS4\n\n\n'.encode('utf-8'))
+            with MappedHaystack(path) as haystack:
+                self.assertEqual(list(haystack), list(read_sections_from_file(path)))
+                self.assertEqual(list(haystack.offsets()), [(0, 2, 9), (1, 13, 15), (2, 16, 18), (3, 19, 21)])
+                self.assertEqual(bytes(haystack.view(13, 15)), b'S2')
+
+    def test_empty(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'haystack.txt')
+            open(path, 'w').close()
+            with MappedHaystack(path) as haystack:
+                self.assertEqual(len(haystack), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# Usage:
+# python3 -m unittest -v test_matrix.py
+
+import unittest
+import itertools
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper import matrix
+
+class TestMatrix(unittest.TestCase):
+
+    def test_encode_decode(self):
+        for parities in itertools.product([0, 1], repeat=7):
+            for bits in itertools.product([0, 1], repeat=3):
+                expected: list[int] = matrix.encode(list(parities), list(bits))
+                self.assertEqual(matrix.decode(expected), list(bits))
+                self.assertLessEqual(sum(1 for a, b in zip(parities, expected) if a != b), 1)
+
+    def test_cheapest(self):
+        # Sections 2 and 9 share the same column: the shortest one is changed.
+        parities: list[int] = [0] * 14
+        bits: list[int] = [0, 1, 1]
+        self.assertEqual(matrix.encode(parities, bits, [10] * 14)[2], 1)
+        costs: list[int] = [10] * 14
+        costs[9] = 1
+        expected: list[int] = matrix.encode(parities, bits, costs)
+        self.assertEqual(expected[9], 1)
+        self.assertEqual(sum(expected), 1)
+        self.assertEqual(matrix.decode(expected), bits)
+
+    def test_sizes(self):
+        self.assertEqual(matrix.sections_needed(16), 42)
+        self.assertEqual(matrix.sections_needed(16, 14), 84)
+        self.assertEqual(matrix.split_bits([1, 1, 1, 1]), [[1, 1, 1], [1, 0, 0]])
+        self.assertRaises(ValueError, matrix.encode, [0] * 6, [0, 0, 0])
+
+if __name__ == '__main__':
+    unittest.main()
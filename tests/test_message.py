@@ -41,6 +41,10 @@ class TestMessage(unittest.TestCase):
         expected: list[Bit] = length_bits + a_bits + b_bits + c_bits
         self.assertEqual(vector, expected)
 
+    def test_bytes_to_vector(self):
+        self.assertEqual(Message.bytes_to_vector(b'abc', 16), Message.string_to_vector('abc', 16))
+        self.assertRaises(ValueError, Message.bytes_to_vector, 'é'.encode(), 16)
+
 
 if __name__ == '__main__':
     unittest.main()
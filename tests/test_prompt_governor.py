@@ -0,0 +1,81 @@
+# Usage:
+# python3 -m unittest -v test_prompt_governor.py
+
+import unittest
+import types
+import math
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.prompt_governor import PromptGovernor, RESPONSE_OVERHEAD
+from whisper.llm import calculate_tokens, count_message_tokens, count_tokens, get_encoding, CHARS_PER_TOKEN
+from whisper.config import Config
+from whisper.stegano_db import MEMORY_DB
+from whisper.whisperer import Whisperer, Params
+
+TEXT: str = 'Le chat dort sur le canapé pendant que la pluie tombe. ' * 20
+
+class TestPromptGovernor(unittest.TestCase):
+
+    def test_previous(self):
+        governor: PromptGovernor = PromptGovernor('gpt-4o', max_previous_tokens=10)
+        previous: str = governor.previous(TEXT)
+        self.assertTrue(TEXT.startswith(previous))
+        self.assertLessEqual(governor.count(previous), 10)
+        self.assertEqual(governor.previous('Court.'), 'Court.')
+        self.assertEqual(PromptGovernor('gpt-4o').previous(TEXT), TEXT)
+
+    def test_max_output_tokens(self):
+        governor: PromptGovernor = PromptGovernor('gpt-4o', output_ratio=2.0)
+        single: int = governor.max_output_tokens([TEXT])
+        self.assertGreaterEqual(single, 2 * governor.count(TEXT) + RESPONSE_OVERHEAD)
+        self.assertGreater(governor.max_output_tokens([TEXT, TEXT]), single)
+        self.assertIsNone(PromptGovernor('gpt-4o').max_output_tokens([TEXT]))
+
+    def test_record(self):
+        governor: PromptGovernor = PromptGovernor('gpt-4o')
+        messages: list[dict[str, str]] = [{'role': 'system', 'content': 'Reformule.'}, {'role': 'user', 'content': TEXT}]
+        governor.record(governor.count_messages(messages), 12)
+        governor.record(3, 4)
+        self.assertEqual(governor.stats(), {'requests': 2, 'input_tokens': count_message_tokens(messages, 'gpt-4o') + 3,
+                                            'output_tokens': 16})
+        self.assertEqual(calculate_tokens('[{"role": "user", "content": "abc"}]', 'gpt-4o'),
+                         count_message_tokens([{'role': 'user', 'content': 'abc'}], 'gpt-4o'))
+
+    def test_unavailable_encoding(self):
+        # tiktoken is installed, but its encodings cannot be downloaded.
+        def offline(name: str):
+            raise OSError('Network is unreachable')
+        tiktoken = types.ModuleType('tiktoken')
+        tiktoken.encoding_for_model = offline
+        tiktoken.get_encoding = offline
+        installed = sys.modules.get('tiktoken')
+        sys.modules['tiktoken'] = tiktoken
+        get_encoding.cache_clear()
+        count_tokens.cache_clear()
+        try:
+            self.assertIsNone(get_encoding('offline-model'))
+            self.assertEqual(count_tokens(TEXT, 'offline-model'), math.ceil(len(TEXT) / CHARS_PER_TOKEN))
+        finally:
+            if installed is not None:
+                sys.modules['tiktoken'] = installed
+            else:
+                del sys.modules['tiktoken']
+            get_encoding.cache_clear()
+            count_tokens.cache_clear()
+
+    def test_local_backend(self):
+        # The requests sent to a backend that is not an LLM are not counted.
+        config: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.'}, None, '')
+        w: Whisperer = Whisperer(Params(backend='local'), config, db_path=MEMORY_DB)
+        w.exec_request(w.generate_single_message_request(TEXT, []))
+        w.close()
+        w.db.close()
+        self.assertEqual(w.governor.stats(), {'requests': 0, 'input_tokens': 0, 'output_tokens': 0})
+
+if __name__ == '__main__':
+    unittest.main()
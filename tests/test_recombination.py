@@ -0,0 +1,42 @@
+# Usage:
+# python3 -m unittest -v test_recombination.py
+
+import unittest
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.recombination import split_sentences, combinations
+
+ORIGINAL: str = "Il pleut. Le chat dort ! Fin ?"
+REFORMULATION: str = "Il tombe des cordes. Le matou sommeille ! Terminé ?"
+
+class TestRecombination(unittest.TestCase):
+
+    def test_split_sentences(self):
+        self.assertEqual(split_sentences(ORIGINAL), ["Il pleut.", "Le chat dort !", "Fin ?"])
+        self.assertEqual(split_sentences("Une seule phrase"), ["Une seule phrase"])
+
+    def test_combinations(self):
+        texts: list[str] = combinations(ORIGINAL, REFORMULATION)
+        self.assertEqual(len(texts), 6)
+        self.assertEqual(len(set(texts)), 6)
+        self.assertNotIn(ORIGINAL, texts)
+        self.assertNotIn(REFORMULATION, texts)
+        # The combinations with the most reformulated sentences come first.
+        self.assertEqual(texts[0], "Il pleut. Le matou sommeille ! Terminé ?")
+
+    def test_no_combination(self):
+        self.assertEqual(combinations("Il pleut.", "Il tombe des cordes."), [])
+        self.assertEqual(combinations(ORIGINAL, "Il tombe des cordes."), [])
+
+    def test_limit(self):
+        original: str = ' '.join('A{}.'.format(i) for i in range(20))
+        reformulation: str = ' '.join('B{}.'.format(i) for i in range(20))
+        self.assertEqual(len(combinations(original, reformulation, limit=10)), 10)
+
+if __name__ == '__main__':
+    unittest.main()
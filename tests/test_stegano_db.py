@@ -3,6 +3,7 @@
 
 from typing import Union, cast, Optional
 import unittest
+import tempfile
 import os
 import sys
 
@@ -50,5 +51,43 @@ class TestSteganoDb(unittest.TestCase):
                 self.assertEqual(section.hash, inputs[position][4].hex())
                 position += 1
 
+    def test_mapped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            haystack_path: str = os.path.join(directory, 'haystack.txt')
+            with open(haystack_path, 'w') as f:
+                f.write('V1\n\nV2\n\nV3\nV4\n')
+            db_path: str = os.path.join(directory, 'db.sqlite3')
+            db: SteganoDb = SteganoDb(db_path)
+            self.assertEqual(len(db.attach(haystack_path)), 4)
+            db.set_unchanged(0, 'md5', b'abc')
+            db.set_unchanged(1, 'md5', b'abc')
+            db.set_traduction(2, 'T3', 'md5', b'abc')
+            db.set_unchanged(3, 'md5', b'abc')
+            # The original texts are not stored.
+            self.assertEqual(db.db.execute('SELECT COUNT(*) FROM t WHERE "original_text" IS NOT NULL').fetchone()[0], 0)
+            self.assertEqual([(s.original_text, s.traduction) for s in db.get_sections()],
+                             [('V1', 'V1'), ('V2', 'V2'), ('V3', 'T3'), ('V4', 'V4')])
+            # The first two sections are copied as a single range of the haystack.
+            output: list[bytes] = [bytes(chunk) for chunk in db.get_output()]
+            self.assertEqual(b''.join(output), b'V1\n\nV2\n\nT3\n\nV4\n\n')
+            self.assertEqual(output[0], b'V1\n\nV2')
+            db.close()
+            # The haystack is mapped again when the database is opened.
+            db = SteganoDb(db_path, init=False)
+            self.assertEqual(db.get_section_by_position(3).traduction, 'V4')
+            db.close()
+    def test_extra_sections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db: SteganoDb = SteganoDb(os.path.join(directory, 'db.sqlite3'))
+            for i in range(5):
+                db.add_original_text(i, 'V{}'.format(i))
+            self.assertEqual([s.position for s in db.get_sections(2)], [0, 1])
+            db.set_traduction(0, 'T0', 'md5', b'abc')
+            db.set_unchanged(1, 'md5', b'abc')
+            db.set_unchanged_from(2)
+            self.assertEqual([(s.traduction, s.algo) for s in db.get_sections()],
+                             [('T0', 'md5'), ('V1', 'md5'), ('V2', None), ('V3', None), ('V4', None)])
+            db.close()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,77 @@
+# Usage:
+# python3 -m unittest -v test_striping.py
+
+import unittest
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.config import Config
+from whisper.hash_pool import HashPool
+from whisper.whisperer import Params
+from whisper.params import FORMAT_COUNTER, KEY_LENGTH
+from whisper.striping import (split_needle, stripe_key, stripe_paths, load_manifest, hide_striped, reveal_striped,
+                              MAX_STRIPE_LENGTH)
+
+HAYSTACK_PATH: str = os.path.join(CURRENT_DIR, os.path.pardir, 'test-data', 'haystack.txt')
+
+def cheap_hash(algo: str, text: str) -> bytes:
+    """Replaces Hasher.hash (Argon2, 64 MiB): every stripe hashes the sections of a whole haystack."""
+    return hashlib.blake2b(hashlib.new(algo, text.encode()).digest(), digest_size=KEY_LENGTH).digest()
+
+class TestStriping(unittest.TestCase):
+
+    def test_split_needle(self):
+        self.assertEqual(split_needle(b'abcdefg', 3), [b'abc', b'def', b'g'])
+        self.assertEqual(split_needle(b'ab', 3), [b'a', b'b', b''])
+        self.assertEqual(split_needle(b'abc', 1), [b'abc'])
+        with self.assertRaises(ValueError):
+            split_needle(b'abc', 0)
+        with self.assertRaises(ValueError):
+            split_needle(b'a' * (MAX_STRIPE_LENGTH + 1), 1)
+
+    def test_stripe_key(self):
+        self.assertEqual(stripe_key('key', 0), 'key#stripe-0')
+        self.assertNotEqual(stripe_key('key', 0), stripe_key('key', 1))
+
+    def test_stripe_paths(self):
+        self.assertEqual(stripe_paths(os.path.join('out', 'manifest.json'), 2),
+                         [os.path.join('out', 'manifest.0.txt'), os.path.join('out', 'manifest.1.txt')])
+
+    def test_load_manifest(self):
+        with tempfile.TemporaryDirectory() as d:
+            path: str = os.path.join(d, 'manifest.json')
+            with open(path, 'w') as f:
+                json.dump({'version': 1, 'format': 2, 'group_size': 7, 'length': 3, 'stripes': ['a.txt', 'b.txt']}, f)
+            manifest = load_manifest(path)
+            self.assertEqual(manifest.format_version, 2)
+            self.assertEqual(manifest.length, 3)
+            # The paths are relative to the manifest.
+            self.assertEqual(manifest.stripes, [os.path.join(d, 'a.txt'), os.path.join(d, 'b.txt')])
+            for invalid in ({'version': 2, 'format': 1, 'stripes': ['a.txt']},
+                            {'version': 1, 'format': 9, 'stripes': ['a.txt']},
+                            {'version': 1, 'format': 1, 'stripes': []}):
+                with open(path, 'w') as f:
+                    json.dump(invalid, f)
+                with self.assertRaises(ValueError):
+                    load_manifest(path)
+
+    def test_hide_reveal(self):
+        params: Params = Params(backend='local', format_version=FORMAT_COUNTER)
+        config: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.', 'next_requests': 'Reformule.'}, None, '')
+        pool: HashPool = HashPool(hash_function=cheap_hash)
+        with tempfile.TemporaryDirectory() as d:
+            manifest_path: str = os.path.join(d, 'manifest.json')
+            hide_striped(b'Hey', [HAYSTACK_PATH, HAYSTACK_PATH], 'key', manifest_path, params, config, hash_pool=pool)
+            self.assertTrue(all(Path(path).exists() for path in stripe_paths(manifest_path, 2)))
+            self.assertEqual(reveal_striped(manifest_path, 'key', hash_pool=pool), b'Hey')
+            with self.assertRaises(ValueError):
+                reveal_striped(manifest_path, 'wrong-key', hash_pool=pool)
+        pool.close()
@@ -0,0 +1,75 @@
+# Usage:
+# python3 -m unittest -v test_task_store.py
+
+import unittest
+import tempfile
+import time
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.task_store import TaskStore, Task, TaskResult, PENDING, DONE, FAILED
+
+class TestTaskStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store: TaskStore = TaskStore(os.path.join(self.directory.name, 'tasks.sqlite'), max_attempts=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lease(self):
+        ids: list[int] = self.store.add('h1', [(0, 'md5', 1, 'a'), (1, 'sha256', 0, 'b')])
+        boundary: list[int] = self.store.add('h1', [(31, 'md5', 1, 'c')], priority=1)
+        tasks: list[Task] = self.store.lease('w1', 60.0, 2)
+        self.assertEqual([t.id for t in tasks], [boundary[0], ids[0]])
+        self.assertEqual((tasks[1].position, tasks[1].algorithm, tasks[1].expected_bit, tasks[1].text), (0, 'md5', 1, 'a'))
+        # Leased tasks are not leased again.
+        self.assertEqual([t.id for t in self.store.lease('w2', 60.0, 10)], [ids[1]])
+        self.assertEqual(self.store.lease('w3', 60.0), [])
+
+    def test_expiry(self):
+        ids: list[int] = self.store.add('h1', [(0, 'md5', 1, 'a')])
+        self.assertEqual(len(self.store.lease('w1', 0.05)), 1)
+        time.sleep(0.1)
+        tasks: list[Task] = self.store.lease('w2', 60.0)
+        self.assertEqual([t.id for t in tasks], ids)
+        # The renewal of an expired lease (taken by another worker) is ignored.
+        self.store.renew(ids, 'w1', 60.0)
+        self.assertEqual(self.store.lease('w3', 60.0), [])
+
+    def test_complete(self):
+        ids: list[int] = self.store.add('h1', [(0, 'md5', 1, 'a'), (1, 'md5', 0, 'b')])
+        task: Task = self.store.lease('w1', 60.0)[0]
+        self.store.complete(task.id, 'x', b'\x01\x02')
+        results: list[TaskResult] = self.store.results(ids)
+        self.assertEqual((results[0].status, results[0].text, results[0].hash), (DONE, 'x', b'\x01\x02'))
+        self.assertEqual(results[1].status, PENDING)
+        self.assertEqual(self.store.counts(), {DONE: 1, PENDING: 1})
+        self.store.remove('h1')
+        self.assertEqual(self.store.counts(), {})
+
+    def test_fail(self):
+        ids: list[int] = self.store.add('h1', [(0, 'md5', 1, 'a')])
+        self.store.fail(self.store.lease('w1', 60.0)[0].id, 'error 1')
+        self.assertEqual(self.store.results(ids)[0].status, PENDING)
+        task: Task = self.store.lease('w1', 60.0)[0]
+        self.assertEqual(task.attempts, 1)
+        self.store.fail(task.id, 'error 2')
+        result: TaskResult = self.store.wait(ids)[0]
+        self.assertEqual((result.status, result.error), (FAILED, 'error 2'))
+        self.assertEqual(self.store.lease('w1', 60.0), [])
+
+    def test_stall(self):
+        ids: list[int] = self.store.add('h1', [(0, 'md5', 1, 'a'), (1, 'md5', 0, 'b')])
+        self.store.lease('w1', 60.0)
+        # No worker makes any progress.
+        with self.assertRaisesRegex(RuntimeError, '1 pending and 1 leased'):
+            self.store.wait(ids, poll_interval=0.01, stall_timeout=0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# Usage:
+# python3 -m unittest -v test_text_api.py
+
+import unittest
+import asyncio
+import hashlib
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.config import Config
+from whisper.hash_pool import HashPool
+from whisper.whisperer import Params
+from whisper.params import FORMAT_CHAINED, FORMAT_COUNTER, KEY_LENGTH
+from whisper.text_file_tool import read_sections_from_text
+from whisper.text_api import hide_text, reveal_text, hide_text_async, reveal_text_async
+
+HAYSTACK_PATH: str = os.path.join(CURRENT_DIR, os.path.pardir, 'test-data', 'haystack.txt')
+
+def cheap_hash(algo: str, text: str) -> bytes:
+    """Replaces Hasher.hash (Argon2, 64 MiB): the rewritten sections of the whole haystack are hashed."""
+    return hashlib.blake2b(hashlib.new(algo, text.encode()).digest(), digest_size=KEY_LENGTH).digest()
+
+class TestTextApi(unittest.TestCase):
+
+    def setUp(self):
+        with open(HAYSTACK_PATH) as f:
+            self.haystack: str = f.read()
+        self.params: Params = Params(backend='local', format_version=FORMAT_COUNTER)
+        self.config: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.', 'next_requests': 'Reformule.'}, None, '')
+        self.pool: HashPool = HashPool(hash_function=cheap_hash)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_hide_reveal(self):
+        files: set[str] = set(os.listdir('.'))
+        murmur: str = hide_text(b'Hi', self.haystack, 'key', self.params, self.config, hash_pool=self.pool)
+        self.assertEqual(reveal_text(murmur, 'key', FORMAT_COUNTER, hash_pool=self.pool), b'Hi')
+        # No file is created.
+        self.assertEqual(set(os.listdir('.')), files)
+
+    def test_async(self):
+        async def run() -> bytes:
+            murmur: str = await hide_text_async(b'Hi', self.haystack, 'key', self.params, self.config, hash_pool=self.pool)
+            return await reveal_text_async(murmur, 'key', FORMAT_COUNTER, hash_pool=self.pool)
+        self.assertEqual(asyncio.run(run()), b'Hi')
+
+    def test_chained_blocks(self):
+        # 16 + 11 * 8 = 104 bits: 4 blocks of KEY_LENGTH sections, thus 3 boundary sections.
+        needle: bytes = b'Hello world'
+        carriers: int = 16 + len(needle) * 8
+        self.assertGreater(carriers, 3 * KEY_LENGTH)
+        for params in [Params(backend='local', format_version=FORMAT_CHAINED, concurrency=4),
+                       Params(backend='local', format_version=FORMAT_CHAINED, concurrency=2, batch_size=3)]:
+            murmur: str = hide_text(needle, self.haystack, 'key', params, self.config, hash_pool=self.pool)
+            self.assertEqual(reveal_text(murmur, 'key', FORMAT_CHAINED, hash_pool=self.pool), needle)
+            # The extra sections are kept.
+            self.assertEqual(list(read_sections_from_text(murmur))[carriers:], list(read_sections_from_text(self.haystack))[carriers:])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -91,5 +91,12 @@ class TestFileTool(unittest.TestCase):
         self.assertEqual(len(sections), 1)
         self.assertEqual(sections[0], 'Sentence1.')
 
+    def test_read_sections_from_text(self):
+        text: str = '\n\nSentence1.\n\n\nSentence2.\nSentence3.'
+        set_input_file(INPUT_PATH, text)
+        sections: list[str] = list(text_file_tool.read_sections_from_text(text))
+        self.assertEqual(sections, list(text_file_tool.read_sections_from_file(INPUT_PATH)))
+        self.assertEqual(list(text_file_tool.read_sections_from_text(text_file_tool.join_sections(sections))), sections)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+# Usage:
+# python3 -m unittest -v test_trace.py
+
+import unittest
+import tempfile
+import json
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.trace import TraceWriter
+
+def load_records(path: str) -> list[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+class TestTrace(unittest.TestCase):
+
+    def test_record(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'trace.jsonl')
+            with TraceWriter(path) as trace:
+                trace.record('request', call=0, messages=[{'role': 'user', 'content': 'élément'}])
+                trace.record('response', call=0, response='{"result": "r"}', latency=0.5)
+                trace.flush()
+                records: list[dict] = load_records(path)
+                self.assertEqual(len(records), 2)
+                self.assertEqual(records[0]['event'], 'request')
+                self.assertEqual(records[0]['messages'][0]['content'], 'élément')
+                self.assertEqual(records[1]['event'], 'response')
+                self.assertEqual(records[1]['latency'], 0.5)
+                trace.record('parity', position=1, bit=0)
+            self.assertEqual(len(load_records(path)), 3)
+
+    def test_rotation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'trace.jsonl')
+            with TraceWriter(path, max_bytes=200, backup_count=2) as trace:
+                for i in range(50):
+                    trace.record('parity', position=i, bit=i % 2)
+            self.assertTrue(os.path.exists(path + '.1'))
+            self.assertTrue(os.path.exists(path + '.2'))
+            self.assertFalse(os.path.exists(path + '.3'))
+            self.assertLessEqual(os.path.getsize(path + '.1'), 200 + 100)
+            records: list[dict] = load_records(path + '.2') + load_records(path + '.1') + load_records(path)
+            positions: list[int] = [r['position'] for r in records]
+            self.assertEqual(positions, sorted(positions))
+            self.assertEqual(positions[-1], 49)
+
+    def test_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            trace: TraceWriter = TraceWriter(os.path.join(directory, 'trace.jsonl'), flush_interval=0.05)
+            # The record cannot be serialized: the background thread stops.
+            trace.record('parity', hash=object())
+            with self.assertRaisesRegex(RuntimeError, 'Unable to write the trace'):
+                trace.flush()
+            self.assertRaises(RuntimeError, trace.close)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# Usage:
+# python3 -m unittest -v test_worker.py
+
+from typing import Optional
+import unittest
+import tempfile
+import threading
+import os
+import sys
+
+CURRENT_DIR=os.path.dirname(os.path.abspath(__file__))
+SEARCH_PATH=os.path.abspath(os.path.join(CURRENT_DIR, os.path.pardir, 'src'))
+sys.path.insert(0, SEARCH_PATH)
+
+from whisper.config import Config
+from whisper.hasher import Hasher
+from whisper.local_rewriter import LocalRewriter
+from whisper.rewriter import Rewriter
+from whisper.stegano_db import Section, MEMORY_DB
+from whisper.task_store import TaskStore, TaskResult, DONE, FAILED
+from whisper.whisperer import Whisperer, Params
+from whisper.worker import Worker
+
+TEXT: str = "Le récit installe immédiatement une atmosphère pesante et inquiétante. Cependant, le lecteur découvre un monde familier."
+CONFIG: Config = Config('model', 0.7, 1.0, {'first_request': 'Reformule.', 'next_requests': 'Reformule: {__PREVIOUS__}'}, None, '')
+
+class FlakyRewriter(Rewriter):
+    """Fails the first "failures" calls, then answers with the local rewriter."""
+
+    def __init__(self, failures: int) -> None:
+        self.failures: int = failures
+        self.rewriter: LocalRewriter = LocalRewriter(seed=1)
+        self.lock: threading.Lock = threading.Lock()
+
+    def call(self, messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        with self.lock:
+            self.failures -= 1
+            if self.failures >= 0:
+                raise OSError('Connection reset')
+        return self.rewriter.call(messages, max_tokens)
+
+class TestWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, 'tasks.sqlite')
+        self.store: TaskStore = TaskStore(self.path, max_attempts=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def worker(self, failures: int = 0) -> Worker:
+        w: Whisperer = Whisperer(Params(backend='local', concurrency=2, recombination=False), CONFIG,
+                                 db_path=MEMORY_DB, rewriter=FlakyRewriter(failures))
+        return Worker(self.store, w, 'w1', poll_interval=0.01)
+
+    def test_complete(self):
+        ids: list[int] = self.store.add('h1', [(0, 'sha256', 0, TEXT), (1, 'md5', 1, TEXT)])
+        worker: Worker = self.worker()
+        worker.run(stop_when_idle=True)
+        results: list[TaskResult] = self.store.results(ids)
+        for result, (algorithm, bit) in zip(results, [('sha256', 0), ('md5', 1)]):
+            self.assertEqual(result.status, DONE)
+            self.assertNotEqual(result.text, TEXT)
+            self.assertEqual(result.hash, Hasher.hash(algorithm, result.text))
+            self.assertEqual(Hasher.parity(result.hash), bit)
+        self.assertEqual((worker.stats()['completed'], worker.stats()['failed'], worker.stats()['active']), (2, 0, 0))
+
+    def test_retry(self):
+        # The first attempt fails: the task is pending again, and leased by the next iteration of the loop.
+        ids: list[int] = self.store.add('h1', [(0, 'sha256', 1, TEXT)])
+        worker: Worker = self.worker(failures=1)
+        worker.run(stop_when_idle=True)
+        self.assertEqual(self.store.results(ids)[0].status, DONE)
+        self.assertEqual((worker.completed, worker.failed), (1, 1))
+
+    def test_fail(self):
+        ids: list[int] = self.store.add('h1', [(0, 'sha256', 1, TEXT)])
+        worker: Worker = self.worker(failures=1000)
+        worker.run(stop_when_idle=True)
+        result: TaskResult = self.store.results(ids)[0]
+        self.assertEqual(result.status, FAILED)
+        self.assertIn('Connection reset', result.error)
+        self.assertEqual((worker.completed, worker.failed), (0, 2))
+
+    def test_distribute(self):
+        w: Whisperer = Whisperer(Params(backend='local', task_store=self.path, task_timeout=5.0), CONFIG, db_path=MEMORY_DB)
+        worker: Worker = self.worker()
+        thread: threading.Thread = threading.Thread(target=worker.run)
+        thread.start()
+        try:
+            items: list[tuple[Section, str]] = [(Section(0, TEXT, 1, None), 'sha256'), (Section(1, TEXT, 0, None), 'md5')]
+            done = w.distribute(Hasher('key'), items)
+        finally:
+            worker.stop()
+            thread.join()
+        self.assertEqual([(section.position, algorithm) for section, algorithm, _, _ in done], [(0, 'sha256'), (1, 'md5')])
+        for section, algorithm, text, h in done:
+            self.assertEqual(Hasher.parity(Hasher.hash(algorithm, text)), section.expected_bit)
+        w.close()
+        self.assertEqual(self.store.counts(), {})
+
+    def test_distribute_without_worker(self):
+        w: Whisperer = Whisperer(Params(backend='local', task_store=self.path, task_timeout=0.1), CONFIG, db_path=MEMORY_DB)
+        with self.assertRaisesRegex(RuntimeError, '1 pending and 0 leased'):
+            w.distribute(Hasher('key'), [(Section(0, TEXT, 1, None), 'sha256')])
+        w.close()
+
+if __name__ == '__main__':
+    unittest.main()